@@ -29,9 +29,21 @@ def createLogOrder(order):
     quantity = format_number(order['executedQty'], 6)  # Arredondando para 6 casas decimais
     asset = order['symbol']
     
-    # Pegando o primeiro fill e formatando os valores
-    price_per_unit = format_number(order['fills'][0]['price'], 6)
-    currency = order['fills'][0]['commissionAsset']
+    # Preço médio ponderado de todos os fills e comissão somada por moeda
+    fills = order.get('fills') or []
+    filled_qty = sum(float(fill['qty']) for fill in fills)
+    if filled_qty:
+        avg_price = sum(float(fill['price']) * float(fill['qty']) for fill in fills) / filled_qty
+    else:
+        executed = float(order['executedQty'])
+        avg_price = float(order['cummulativeQuoteQty']) / executed if executed else 0.0
+    commissions = {}
+    for fill in fills:
+        fee_asset = fill['commissionAsset']
+        commissions[fee_asset] = commissions.get(fee_asset, 0.0) + float(fill['commission'])
+    price_per_unit = format_number(avg_price, 6)
+    currency = ', '.join(commissions) if commissions else '-'
+    commission_text = ', '.join(f"{format_number(v, 8)} {k}" for k, v in commissions.items()) or '0'
     total_value = format_number(order['cummulativeQuoteQty'], 2)  # Para valores totais, 2 casas decimais
 
     timestamp = order['transactTime']
@@ -44,9 +56,10 @@ def createLogOrder(order):
         f"Side: {side}\n"
         f"Ativo: {asset}\n"
         f"Quantidade: {quantity}\n"
-        f"Valor por unidade: {price_per_unit}\n"
+        f"Valor por unidade (média de {len(fills)} fills): {price_per_unit}\n"
         f"Moeda: {currency}\n"
-        f"Valor total em {currency}: {total_value}\n"
+        f"Comissão: {commission_text}\n"
+        f"Valor total (moeda de cotação): {total_value}\n"
         f"Tipo de Ordem: {order_type}\n"
         f"Data/Hora: {datetime_transact}\n"
         "\nOrdem completa:\n"
@@ -61,9 +74,10 @@ def createLogOrder(order):
         f"Side: {side}\n"
         f"Ativo: {asset}\n"
         f"Quantidade: {quantity}\n"
-        f"Valor por unidade: {price_per_unit}\n"
+        f"Valor por unidade (média de {len(fills)} fills): {price_per_unit}\n"
         f"Moeda: {currency}\n"
-        f"Valor total em {currency}: {total_value}\n"
+        f"Comissão: {commission_text}\n"
+        f"Valor total (moeda de cotação): {total_value}\n"
         f"Tipo de Ordem: {order_type}\n"
         f"Data/Hora: {datetime_transact}\n"
     )
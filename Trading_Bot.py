@@ -9,6 +9,9 @@ from binance.enums import *
 
 # Importando a função createLogOrder do seu arquivo logger.py
 from Logger import createLogOrder
+from profiler import PROFILER
+from data_refresh import ConcurrentRefresher
+from ledger import PositionLedger
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -39,19 +42,49 @@ class BinanceTraderBot:
     Classe principal do seu robô trader na Binance.
     """
     last_trade_decision: bool  # Armazena a última decisão de posição (False = Venda, True = Compra)
+    settle_delay = 2  # Segundos de espera após uma ordem antes de atualizar os dados (0 no replay)
+    fetch_deadline = 5.0   # Prazo, em segundos, de cada requisição da atualização de dados
+    trade_on_stale = False  # Se False, não opera quando algum dado veio de uma rodada anterior
+    min_position_qty = 0.00005  # Metade do lote mínimo: a comissão em BTC reduz a quantidade comprada
 
-    def __init__(self, stock_code, operation_code, traded_quantity, trade_percentage, candle_period):
+    def __init__(self, stock_code, operation_code, traded_quantity, trade_percentage, candle_period,
+                 client_binance=None, position_sizer=None, audit_log=None, ledger=None):
         # Atributos básicos
         self.stock_code = stock_code                # Ex.: 'BTC'
         self.operation_code = operation_code        # Ex.: 'BTCBRL'
         self.traded_quantity = traded_quantity      # Ex.: 0.000001
-        self.trade_percentage = trade_percentage    # Porcentagem do total da carteira a ser negociada (futuro)
+        self.trade_percentage = trade_percentage    # Porcentagem máxima do patrimônio em uma posição
         self.candle_period = candle_period          # Periodicidade do candle (ex.: 1m, 5m, etc.)
 
         # Cliente da binance
         #self.client_binance = Client(api_key, secret_key)
         # Modo de teste (não executa ordens reais)
-        self.client_binance = Client(api_key, secret_key, testnet=False)
+        # Um client pode ser injetado (ex: RecordingClient/ReplayClient de recorder.py)
+        if client_binance is not None:
+            self.client_binance = client_binance
+        else:
+            self.client_binance = Client(api_key, secret_key, testnet=False)
+
+        # Dimensionamento por volatilidade (ATR) limitado por trade_percentage, opcional:
+        # sem PositionSizer o bot compra sempre traded_quantity.
+        # Um mesmo PositionSizer pode ser compartilhado por bots de pares diferentes.
+        self.position_sizer = position_sizer
+        self.sized_until = None   # open_time do último candle entregue ao sizer
+
+        # Conta e candles são buscados em paralelo, cada um com prazo próprio
+        self.refresher = ConcurrentRefresher(max_workers=2, default_deadline=self.fetch_deadline)
+        self.refresher.register('account', self.getUpdatedAccountData)
+        self.refresher.register('klines', self.getStockData_ClosePrice_OpenTime)
+        self.stale_inputs = []
+
+        # Log de auditoria das decisões (audit_log.DecisionAuditLog), opcional
+        self.audit_log = audit_log
+        self.audit_votes = {}        # Voto de cada estratégia avaliada na iteração
+        self.audit_indicators = {}   # Indicadores usados na iteração
+
+        # Livro de fills (ledger.PositionLedger): posição, preço médio e PnL sem get_account
+        self.ledger = ledger or PositionLedger()
+        self.ledger_seeded = False
 
         # Pega dados iniciais
         self.updateAllData()
@@ -66,11 +99,18 @@ class BinanceTraderBot:
         - Saldo do ativo principal.
         - Posição atual (comprado ou vendido).
         - DataFrame com preços (candles).
+        As requisições rodam em paralelo; a que perder o prazo é substituída
+        pelo último valor bom e listada em self.stale_inputs.
         """
-        self.acount_data = self.getUpdatedAccountData()          # Dados atualizados da conta
+        results = self.refresher.refresh()
+        self.stale_inputs = [name for name, result in results.items() if result.stale]
+
+        self.acount_data = results['account'].value                      # Dados atualizados da conta
         self.last_stock_account_balance = self.getStockAccountBalance()  # Saldo em estoque
+        self.stock_data = results['klines'].value                        # Dados de preços do ativo
+        self.ledger.on_price(self.operation_code, self.stock_data['close_price'].iloc[-1])
         self.actual_trade_position = self.getActualTradePosition()       # Posição atual (vendido ou comprado)
-        self.stock_data = self.getStockData_ClosePrice_OpenTime()        # Dados de preços do ativo
+        self.updatePositionSizer()                                       # ATR/covariância com os candles fechados
 
     # --------------------
     # Métodos auxiliares
@@ -94,13 +134,17 @@ class BinanceTraderBot:
 
     def getActualTradePosition(self):
         """
-        Checa se a posição atual está comprada ou vendida com base no saldo do ativo.
+        Checa se a posição atual está comprada ou vendida pelo livro de fills (self.ledger).
+        Na primeira chamada, um saldo já existente do ativo entra no livro ao preço atual
+        (o custo de entrada real é desconhecido).
         True = Comprado / False = Vendido.
         """
-        if self.last_stock_account_balance > 0.001:
-            return True  # Comprado
-        else:
-            return False # Vendido
+        if not self.ledger_seeded:
+            if self.ledger.position(self.operation_code).fills == 0:
+                self.ledger.seed(self.operation_code, self.last_stock_account_balance,
+                                 self.stock_data['close_price'].iloc[-1])
+            self.ledger_seeded = True
+        return self.ledger.is_long(self.operation_code, self.min_position_qty)
 
     def getStockData_ClosePrice_OpenTime(self):
         
@@ -121,7 +165,7 @@ class BinanceTraderBot:
         ]
 
         
-        prices = prices[['open_time', 'close_price']]
+        prices = prices[['open_time', 'high_price', 'low_price', 'close_price']]
 
         
         prices['open_time'] = pd.to_datetime(prices['open_time'], unit='ms')\
@@ -129,10 +173,55 @@ class BinanceTraderBot:
                                .dt.tz_convert('America/Sao_Paulo')
 
         
-        prices['close_price'] = prices['close_price'].astype(float)
+        prices[['high_price', 'low_price', 'close_price']] = \
+            prices[['high_price', 'low_price', 'close_price']].astype(float)
 
         return prices
     
+    def updatePositionSizer(self):
+        """
+        Entrega ao sizer os candles fechados ainda não vistos (o último candle
+        de stock_data está em andamento e fica de fora).
+        """
+        if self.position_sizer is None:
+            return
+        closed = self.stock_data.iloc[:-1]
+        if self.sized_until is not None:
+            closed = closed[closed['open_time'] > self.sized_until]
+        if closed.empty:
+            return
+        for open_time, high, low, close in zip(closed['open_time'], closed['high_price'],
+                                               closed['low_price'], closed['close_price']):
+            self.position_sizer.update_symbol(self.operation_code, high, low, close, open_time)
+        self.sized_until = closed['open_time'].iloc[-1]
+
+    def getTradeQuantity(self):
+        """
+        Quantidade a comprar: sem PositionSizer, traded_quantity. Com ele,
+        dimensionada a partir do patrimônio (USDT + ativo a preço atual), de
+        trade_percentage e do ATR; enquanto o ATR não tem candles suficientes,
+        usa traded_quantity.
+        """
+        if self.position_sizer is None:
+            return self.traded_quantity
+        price = self.stock_data['close_price'].iloc[-1]
+        usdt_balance = 0.0
+        for stock in self.acount_data['balances']:
+            if stock['asset'] == 'USDT':
+                usdt_balance = float(stock['free'])
+                break
+        equity = usdt_balance + self.last_stock_account_balance * price
+        quantity = self.position_sizer.size(self.operation_code, equity, price)
+        return self.traded_quantity if quantity is None else quantity
+
+    def auditVote(self, strategy_name, signal, **indicators):
+        """
+        Guarda o voto (True/False/None) e os indicadores de uma estratégia
+        para a linha do log de auditoria desta iteração.
+        """
+        self.audit_votes[strategy_name] = signal
+        self.audit_indicators.update(indicators)
+
     # -------------------------------------
     # Estratégia de RSI
     # -------------------------------------
@@ -180,13 +269,16 @@ class BinanceTraderBot:
 
         if last_rsi < rsi_buy_threshold:
             print("RSI Strategy => Sinal de COMPRA (RSI abaixo de 30)")
-            return True
+            rsi_signal = True
         elif last_rsi > rsi_sell_threshold:
             print("RSI Strategy => Sinal de VENDA (RSI acima de 70)")
-            return False
+            rsi_signal = False
         else:
             print("RSI Strategy => Nenhum sinal de trade (RSI entre 30 e 70)")
-            return None
+            rsi_signal = None
+
+        self.auditVote('rsi', rsi_signal, rsi=last_rsi)
+        return rsi_signal
 
     # -------------------------------------
     # Estratégia Combinada
@@ -255,6 +347,7 @@ class BinanceTraderBot:
         print(f"Decisão de posição: {'Compra' if ma_trade_decision else 'Venda'}")
         print("-----")
 
+        self.auditVote('moving_average', ma_trade_decision, ma_fast=last_ma_fast, ma_slow=last_ma_slow)
         return ma_trade_decision
     
     # -------------------------------------
@@ -286,12 +379,15 @@ class BinanceTraderBot:
 
         if last_close < last_lower:
             print("Bollinger => Sinal de COMPRA (fechou abaixo da banda inferior)")
-            return True
+            bb_signal = True
         elif last_close > last_upper:
             print("Bollinger => Sinal de VENDA (fechou acima da banda superior)")
-            return False
+            bb_signal = False
         else:
-            return None
+            bb_signal = None
+
+        self.auditVote('bollinger', bb_signal, bb_lower=last_lower, bb_upper=last_upper)
+        return bb_signal
     
 
     # ------------------------
@@ -305,7 +401,7 @@ class BinanceTraderBot:
         min_qty = 0.0001
 
         # Arredonda a quantidade para atender aos requisitos da Binance
-        quantity_to_buy = max(round(self.traded_quantity, 6), min_qty)
+        quantity_to_buy = max(round(self.getTradeQuantity(), 6), min_qty)
 
         # Verifica saldo disponível em USDT
         usdt_balance = 0.0
@@ -314,24 +410,19 @@ class BinanceTraderBot:
                 usdt_balance = float(stock['free'])
                 break
 
-        if usdt_balance < (self.traded_quantity * self.stock_data['close_price'].iloc[-1]):
+        if usdt_balance < (quantity_to_buy * self.stock_data['close_price'].iloc[-1]):
             print("Saldo insuficiente em USDT para comprar!")
             return False
 
         if not self.actual_trade_position:  # Se a posição atual está vendida
 
-            # Define a quantidade mínima permitida (exemplo: 0.0001 BTC)
-            min_qty = 0.0001
-
-            # Arredonda a quantidade para atender aos requisitos da Binance
-            quantity_to_buy = max(round(self.traded_quantity, 6), min_qty)
-
             order_buy = self.client_binance.create_order(
                 symbol=self.operation_code,
                 side=SIDE_BUY,
                 type=ORDER_TYPE_MARKET,
                 quantity=quantity_to_buy
             )
+            self.ledger.apply_order(order_buy, fallback_price=self.stock_data['close_price'].iloc[-1])
             self.actual_trade_position = True
             createLogOrder(order_buy)  # Cria log da ordem
             return order_buy
@@ -361,6 +452,7 @@ class BinanceTraderBot:
                 type=ORDER_TYPE_MARKET,
                 quantity=quantity_to_sell
             )
+            self.ledger.apply_order(order_sell, fallback_price=self.stock_data['close_price'].iloc[-1])
             self.actual_trade_position = False
             createLogOrder(order_sell)  # Cria log da ordem
             return order_sell
@@ -408,44 +500,71 @@ class BinanceTraderBot:
         - Decide se vai comprar ou vender.
         """
         # Atualiza os dados
-        self.updateAllData()
+        with PROFILER.stage('dados'):
+            self.updateAllData()
 
         print('-----------------------------------')
         print(f'Executando ({datetime.now().strftime("%Y-%m-%d %H:%M:%S")})')
         print(f'Posição Atual: {"Comprado" if self.actual_trade_position else "Vendido"}')
         print(f'Balanço Atual: {self.last_stock_account_balance} ({self.stock_code})')
+        position = self.ledger.position(self.operation_code)
+        print(f'Preço médio: {position.avg_price:.2f} | PnL realizado: {position.realized_pnl:.4f} | '
+              f'PnL não realizado: {position.unrealized_pnl:.4f}')
         print('-----------------------------------')
 
-        # 1 - Obtém decisão de trade via estratégia de médias
-        ma_trade_decision = self.getMovingAverageTradeStrategy()
-        # 2 - Obtém decisão de trade via estratégia de RSI
-        #ma_trade_decision = self.getRSITradeStrategy()
-        # 3 - Obtém a estrategia combinada RSI + MA
-        #ma_trade_decision = self.getCombinedTradeStrategy()
-        # 4 - Obtém a estrategia Bolling
-        #ma_trade_decision = self.getBollingerTradeStrategy()
+        if self.stale_inputs and not self.trade_on_stale:
+            logging.warning(f"Dados desatualizados ({', '.join(self.stale_inputs)}): sem operar nesta iteração.")
+            print(f"Dados desatualizados ({', '.join(self.stale_inputs)}): sem operar nesta iteração.")
+            if self.audit_log is not None:
+                # A iteração pulada também fica no log: estratégia 'skip_stale', decisão HOLD
+                self.audit_log.record(self.operation_code, 'skip_stale', None,
+                                      indicators={'close': self.stock_data['close_price'].iloc[-1],
+                                                  **{f'stale_{name}': 1.0 for name in self.stale_inputs}})
+            return
+
+        self.audit_votes = {}
+        self.audit_indicators = {}
+        evaluation_start = time.perf_counter()
+        with PROFILER.stage('estrategia'):
+            # 1 - Obtém decisão de trade via estratégia de médias
+            strategy_name = 'moving_average'
+            ma_trade_decision = self.getMovingAverageTradeStrategy()
+            # 2 - Obtém decisão de trade via estratégia de RSI
+            #strategy_name, ma_trade_decision = 'rsi', self.getRSITradeStrategy()
+            # 3 - Obtém a estrategia combinada RSI + MA
+            #strategy_name, ma_trade_decision = 'combined', self.getCombinedTradeStrategy()
+            # 4 - Obtém a estrategia Bolling
+            #strategy_name, ma_trade_decision = 'bollinger', self.getBollingerTradeStrategy()
 
         self.last_trade_decision = ma_trade_decision
 
-        # Caso a posição seja vendida (False) e a decisão seja compra (True), compra
-        if not self.actual_trade_position and self.last_trade_decision:
-            self.printStock()
-            self.printUSDT()
-            self.buyStock()
-            time.sleep(2)
-            self.updateAllData()
-            self.printStock()
-            self.printUSDT()
-
-        # Caso a posição seja comprada (True) e a decisão seja venda (False), vende
-        elif self.actual_trade_position and not self.last_trade_decision:
-            self.printStock()
-            self.printUSDT()
-            self.sellStock()
-            time.sleep(2)
-            self.updateAllData()
-            self.printStock()
-            self.printUSDT()
+        if self.audit_log is not None:
+            self.audit_log.record(self.operation_code, strategy_name, ma_trade_decision,
+                                  votes=self.audit_votes,
+                                  indicators={'close': self.stock_data['close_price'].iloc[-1],
+                                              **self.audit_indicators},
+                                  latency_ms=(time.perf_counter() - evaluation_start) * 1000)
+
+        with PROFILER.stage('ordens'):
+            # Caso a posição seja vendida (False) e a decisão seja compra (True), compra
+            if not self.actual_trade_position and self.last_trade_decision:
+                self.printStock()
+                self.printUSDT()
+                self.buyStock()
+                time.sleep(self.settle_delay)
+                self.updateAllData()
+                self.printStock()
+                self.printUSDT()
+
+            # Caso a posição seja comprada (True) e a decisão seja venda (False), vende
+            elif self.actual_trade_position and not self.last_trade_decision:
+                self.printStock()
+                self.printUSDT()
+                self.sellStock()
+                time.sleep(self.settle_delay)
+                self.updateAllData()
+                self.printStock()
+                self.printUSDT()
 
 
 if __name__ == "__main__":
@@ -454,7 +573,18 @@ if __name__ == "__main__":
     Aqui você instância a classe e define o loop de quanto em quanto tempo
     quer rodar a estratégia (no exemplo, a cada 60 segundos).
     """
-    MaTrader = BinanceTraderBot(STOCK_CODE, OPERATION_CODE, TRADED_QUANTITY, 100, CANDLE_PERIOD)
+    # Se BOT_RECORD_FILE estiver definido, grava todas as respostas da API (ver recorder.py)
+    client_binance = None
+    if os.environ.get('BOT_RECORD_FILE'):
+        from recorder import RecordingClient
+        client_binance = RecordingClient(Client(api_key, secret_key, testnet=False),
+                                         os.environ['BOT_RECORD_FILE'])
+
+    MaTrader = BinanceTraderBot(STOCK_CODE, OPERATION_CODE, TRADED_QUANTITY, 100, CANDLE_PERIOD,
+                                client_binance=client_binance)
+
+    # Profiling sob demanda: kill -USR1/-USR2 <pid> ou BOT_PROFILER_PORT (ver profiler.py)
+    PROFILER.install_from_env()
     
     # Loop infinito, execute a estratégia a cada 60 segundos (1 minuto).
     while True:
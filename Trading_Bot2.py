@@ -1,4 +1,5 @@
 import os
+import threading
 import time
 from datetime import datetime
 import logging
@@ -8,6 +9,7 @@ from binance.client import Client
 from binance.enums import *
 
 from Logger import createLogOrder
+from ledger import PositionLedger
 
 # Variáveis de ambiente (chaves de API)
 api_key = os.environ.get('binance_api')
@@ -28,7 +30,8 @@ logging.basicConfig(
 class BinanceTraderBot:
     last_trade_decision: str  # "BUY", "SELL" ou "HOLD"
 
-    def __init__(self, stock_code, operation_code, traded_quantity, candle_period):
+    def __init__(self, stock_code, operation_code, traded_quantity, candle_period, stop_engine=None,
+                 ledger=None):
         self.stock_code = stock_code
         self.operation_code = operation_code
         self.traded_quantity = traded_quantity
@@ -38,6 +41,17 @@ class BinanceTraderBot:
         self.last_buy_price = None  # Armazena o preço da última compra
         self.last_trade_time = None  # Armazena o tempo da última operação
 
+        # StopEngine opcional (stop_engine.py): stops checados a cada tick, não só a cada loop.
+        # As saídas disparadas pelo engine passam por onStopExit, que atualiza posição e livro.
+        self.stop_engine = stop_engine
+        if stop_engine is not None and stop_engine.on_exit is None:
+            stop_engine.on_exit = self.onStopExit
+        # Ordens podem partir do loop e da thread do websocket (stops) ao mesmo tempo
+        self._order_lock = threading.RLock()
+
+        # Livro de fills (ledger.py): preço médio real de entrada e PnL por símbolo
+        self.ledger = ledger or PositionLedger()
+
         self.updateAllData()
 
         print('-----------------------------------')
@@ -131,15 +145,19 @@ class BinanceTraderBot:
         min_qty = 0.0001
         quantity_to_buy = max(round(self.traded_quantity, 6), min_qty)
 
-        order_buy = self.client_binance.create_order(
-            symbol=self.operation_code,
-            side=SIDE_BUY,
-            type=ORDER_TYPE_MARKET,
-            quantity=quantity_to_buy
-        )
-        self.actual_trade_position = True
-        self.last_buy_price = self.stock_data['close_price'].iloc[-1]
-        self.last_trade_time = time.time()
+        with self._order_lock:
+            order_buy = self.client_binance.create_order(
+                symbol=self.operation_code,
+                side=SIDE_BUY,
+                type=ORDER_TYPE_MARKET,
+                quantity=quantity_to_buy
+            )
+            self.ledger.apply_order(order_buy, fallback_price=self.stock_data['close_price'].iloc[-1])
+            self.actual_trade_position = True
+            self.last_buy_price = self.ledger.position(self.operation_code).avg_price  # Preço médio dos fills
+            self.last_trade_time = time.time()
+        if self.stop_engine is not None:
+            self.stop_engine.add_position(self.operation_code, quantity_to_buy, self.last_buy_price)
         createLogOrder(order_buy)
         return order_buy
 
@@ -147,17 +165,48 @@ class BinanceTraderBot:
         min_qty = 0.0001
         quantity_to_sell = max(round(self.last_stock_account_balance, 6), min_qty)
 
-        order_sell = self.client_binance.create_order(
-            symbol=self.operation_code,
-            side=SIDE_SELL,
-            type=ORDER_TYPE_MARKET,
-            quantity=quantity_to_sell
-        )
-        self.actual_trade_position = False
-        self.last_trade_time = time.time()
+        with self._order_lock:
+            order_sell = self.client_binance.create_order(
+                symbol=self.operation_code,
+                side=SIDE_SELL,
+                type=ORDER_TYPE_MARKET,
+                quantity=quantity_to_sell
+            )
+            self._registerSell(order_sell, self.stock_data['close_price'].iloc[-1])
+        if self.stop_engine is not None:
+            self.stop_engine.remove_symbol(self.operation_code)
+        createLogOrder(order_sell)
+        return order_sell
+
+    def onStopExit(self, position, reason, price):
+        """
+        Callback on_exit do StopEngine: vende a posição disparada (stop, trailing,
+        take-profit ou time-stop) e registra a saída como uma venda do próprio bot.
+        :param position: TrackedPosition do engine.
+        :param reason: Regra que disparou ('stop_loss', 'trailing_stop', 'take_profit', ...).
+        :param price: Preço do tick que disparou a saída (usado se a ordem não trouxer fills).
+        """
+        with self._order_lock:
+            if not self.actual_trade_position:
+                logging.info(f"Saída {reason} ignorada: sem posição aberta em {position.symbol}.")
+                return None
+            order_sell = self.client_binance.create_order(
+                symbol=position.symbol,
+                side=SIDE_SELL,
+                type=ORDER_TYPE_MARKET,
+                quantity=position.quantity
+            )
+            self._registerSell(order_sell, price)
+        print(f"⚠️ Saída por {reason} a {price}")
         createLogOrder(order_sell)
         return order_sell
 
+    def _registerSell(self, order_sell, fallback_price):
+        self.ledger.apply_order(order_sell, fallback_price=fallback_price)
+        self.actual_trade_position = False
+        self.last_buy_price = None
+        self.last_trade_time = time.time()
+
     def execute(self):
         self.updateAllData()
         print(f'🚀 Executando ({datetime.now().strftime("%Y-%m-%d %H:%M:%S")})')
@@ -176,6 +225,14 @@ class BinanceTraderBot:
 
 if __name__ == "__main__":
     MaTrader = BinanceTraderBot(STOCK_CODE, OPERATION_CODE, TRADED_QUANTITY, CANDLE_PERIOD)
+
+    # Para checar stop-loss/take-profit a cada trade em vez de a cada 60s:
+    # from binance import ThreadedWebsocketManager
+    # from stop_engine import StopEngine
+    # twm = ThreadedWebsocketManager(api_key, secret_key, testnet=True)
+    # twm.start()
+    # MaTrader.stop_engine = StopEngine(on_exit=MaTrader.onStopExit)
+    # MaTrader.stop_engine.attach(twm, OPERATION_CODE, stream='trade')
     
     while True:
         MaTrader.execute()
@@ -0,0 +1,244 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('TradingBot.AuditLog')
+
+# =============================================================================
+# Log de auditoria das decisões (colunar, append-only)
+# -----------------------------------------------------------------------------
+# Cada avaliação de estratégia vira uma linha: horário, símbolo, estratégia,
+# decisão final, latência, voto de cada estratégia individual (vote_<nome>)
+# e valor de cada indicador (ind_<nome>). As linhas ficam num buffer em
+# memória e são gravadas em lotes por uma thread, sem bloquear o loop.
+#
+# Formato do arquivo:
+#   MAGIC
+#   lote*: uint32 tamanho do cabeçalho | cabeçalho JSON | bytes de cada coluna
+# O cabeçalho traz o número de linhas, o intervalo de horário do lote e, para
+# cada coluna, nome, dtype e tamanho. A leitura pula colunas e lotes que não
+# interessam, então meses de decisões carregam em segundos.
+# =============================================================================
+MAGIC = b'TBAUDIT1'
+BATCH_HEADER = struct.Struct('<I')
+
+BUY = 1
+SELL = -1
+HOLD = 0
+
+
+def vote_value(signal) -> int:
+    """Converte o retorno das estratégias (True/False/None) em 1/-1/0."""
+    if signal is None:
+        return HOLD
+    if isinstance(signal, (bool, np.bool_)):
+        return BUY if signal else SELL
+    return int(signal)
+
+
+def _string_column(values) -> np.ndarray:
+    width = max((len(v) for v in values), default=1) or 1
+    return np.array(values, dtype=f'<U{width}')
+
+
+class DecisionAuditLog:
+    """
+    Registro das decisões das estratégias. record() só acrescenta a linha ao
+    buffer; a gravação acontece em lotes, numa thread separada.
+    """
+    def __init__(self, path: str = 'decisions.audit', flush_rows: int = 1000, flush_interval: float = 60.0):
+        """
+        :param path: Arquivo do log (aberto em modo append).
+        :param flush_rows: Linhas acumuladas antes de gravar um lote.
+        :param flush_interval: Segundos máximos entre gravações (se houver linhas).
+        """
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.batches_written = 0
+        self._rows = []
+        self._last_flush = time.monotonic()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name='audit-log', daemon=True)
+        self._writer.start()
+        self._closed = False
+        atexit.register(self.close)
+
+    def record(self, symbol: str, strategy: str, decision, votes: dict = None, indicators: dict = None,
+               latency_ms: float = float('nan'), timestamp: float = None):
+        """
+        :param symbol: Par avaliado.
+        :param strategy: Estratégia (ou conjunto) que tomou a decisão.
+        :param decision: Decisão final (True/False/None ou 1/-1/0).
+        :param votes: {estratégia: voto} das estratégias individuais.
+        :param indicators: {indicador: valor} usados na avaliação.
+        :param latency_ms: Tempo da avaliação, em milissegundos.
+        :param timestamp: Horário (epoch, segundos); padrão agora.
+        """
+        self._rows.append((time.time() if timestamp is None else timestamp, symbol, strategy,
+                           vote_value(decision), latency_ms, votes, indicators))
+        if len(self._rows) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Entrega as linhas do buffer para a thread de gravação."""
+        if self._rows:
+            rows, self._rows = self._rows, []
+            self._queue.put(rows)
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Grava o que estiver pendente e encerra a thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+
+    # -------------------------
+    # Gravação (thread)
+    # -------------------------
+    def _write_loop(self):
+        with open(self.path, 'ab') as f:
+            if f.tell() == 0:
+                f.write(MAGIC)
+                f.flush()
+            while True:
+                rows = self._queue.get()
+                if rows is None:
+                    return
+                try:
+                    self._write_batch(f, rows)
+                except Exception as e:
+                    logger.exception(f"Erro ao gravar lote de auditoria em {self.path}: {e}")
+
+    @staticmethod
+    def _columns(rows) -> dict:
+        """Transforma as linhas do lote em arrays, uma coluna por campo."""
+        n = len(rows)
+        timestamps, symbols, strategies, decisions, latencies, votes, values = zip(*rows)
+        columns = {
+            'timestamp': np.array(timestamps, dtype=np.float64),
+            'symbol': _string_column(symbols),
+            'strategy': _string_column(strategies),
+            'decision': np.array(decisions, dtype=np.int8),
+            'latency_ms': np.array(latencies, dtype=np.float64),
+        }
+        for prefix, dicts, dtype, missing in (('vote_', votes, np.int8, HOLD),
+                                              ('ind_', values, np.float64, np.nan)):
+            names = {}
+            for d in dicts:
+                if d:
+                    names.update(dict.fromkeys(d))
+            for name in names:
+                column = np.full(n, missing, dtype=dtype)
+                for i, d in enumerate(dicts):
+                    if d and name in d and d[name] is not None:
+                        column[i] = vote_value(d[name]) if prefix == 'vote_' else d[name]
+                columns[prefix + name] = column
+        return columns
+
+    def _write_batch(self, f, rows):
+        columns = self._columns(rows)
+        timestamps = columns['timestamp']
+        header = {
+            'rows': len(rows),
+            'start': float(timestamps.min()),
+            'end': float(timestamps.max()),
+            'columns': [{'name': name, 'dtype': col.dtype.str, 'nbytes': col.nbytes}
+                        for name, col in columns.items()],
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        f.write(BATCH_HEADER.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for col in columns.values():
+            f.write(np.ascontiguousarray(col).tobytes())
+        f.flush()
+        self.rows_written += len(rows)
+        self.batches_written += 1
+
+
+# =============================================================================
+# Leitura para análise
+# =============================================================================
+def load_audit_log(path: str, columns=None, start: float = None, end: float = None) -> pd.DataFrame:
+    """
+    Carrega o log de auditoria como DataFrame.
+    :param columns: Colunas desejadas (padrão: todas). 'timestamp' é sempre lida.
+    :param start: Horário mínimo (epoch, segundos).
+    :param end: Horário máximo (epoch, segundos).
+    """
+    wanted = None if columns is None else set(columns) | {'timestamp'}
+    frames = []
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} não é um log de auditoria.")
+        while True:
+            size = f.read(BATCH_HEADER.size)
+            if len(size) < BATCH_HEADER.size:
+                break
+            header_bytes = f.read(BATCH_HEADER.unpack(size)[0])
+            try:
+                header = json.loads(header_bytes)
+            except ValueError:
+                logger.warning(f"Lote incompleto no fim de {path}; ignorando.")
+                break
+            batch_bytes = sum(c['nbytes'] for c in header['columns'])
+            if (start is not None and header['end'] < start) or (end is not None and header['start'] > end):
+                f.seek(batch_bytes, os.SEEK_CUR)
+                continue
+
+            data = {}
+            truncated = False
+            for col in header['columns']:
+                if wanted is not None and col['name'] not in wanted:
+                    f.seek(col['nbytes'], os.SEEK_CUR)
+                    continue
+                raw = f.read(col['nbytes'])
+                if len(raw) < col['nbytes']:
+                    truncated = True
+                    break
+                data[col['name']] = np.frombuffer(raw, dtype=np.dtype(col['dtype']))
+            if truncated:
+                logger.warning(f"Lote incompleto no fim de {path}; ignorando.")
+                break
+            frames.append(pd.DataFrame(data))
+
+    if not frames:
+        return pd.DataFrame(columns=sorted(wanted) if wanted else ['timestamp'])
+    df = pd.concat(frames, ignore_index=True)
+    vote_cols = [c for c in df.columns if c.startswith('vote_')]
+    if vote_cols:
+        # Lotes sem a estratégia deixam NaN: ausência de voto
+        df[vote_cols] = df[vote_cols].fillna(HOLD).astype(np.int8)
+    if start is not None or end is not None:
+        ts = df['timestamp']
+        df = df[(ts >= (start if start is not None else -np.inf)) &
+                (ts <= (end if end is not None else np.inf))].reset_index(drop=True)
+    df['time'] = pd.to_datetime(df['timestamp'], unit='s', utc=True)
+    return df
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Resumo do log de auditoria das decisões.')
+    parser.add_argument('log', nargs='?', default='decisions.audit')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    df = load_audit_log(args.log)
+    print(f"{len(df)} decisões carregadas em {time.perf_counter() - t0:.2f}s")
+    if len(df):
+        print(df.groupby(['symbol', 'strategy', 'decision']).size().to_string())
+        print(df[[c for c in df.columns if c.startswith('vote_')]].apply(pd.Series.value_counts).to_string())
@@ -0,0 +1,174 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from tradingbot import Strategy, backtest_steps, close_backtest
+
+logger = logging.getLogger('TradingBot.Backtest')
+
+# =============================================================================
+# Backtest incremental
+# -----------------------------------------------------------------------------
+# Guarda o estado final de cada backtest (capital, posição, trades, último
+# índice processado e os últimos candles que a estratégia precisa) e, quando
+# chegam candles novos, continua de onde parou. Como backtest_steps só entrega
+# à estratégia os últimos required_history() candles, retomar produz
+# exatamente o mesmo resultado que rodar backtest_strategy no histórico todo.
+# =============================================================================
+
+
+# Parâmetros do construtor guardados com outro nome (ConsensusStrategy guarda máscaras)
+DERIVED_PARAMS = {'vetoes': 'veto_mask', 'optional': 'optional_mask'}
+
+
+def _param_value(value):
+    if isinstance(value, Strategy):
+        return strategy_params(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_param_value(v) for v in value]
+    return value
+
+
+def strategy_params(strategy: Strategy) -> dict:
+    """
+    Classe e parâmetros do construtor da estratégia, para o hash do cache.
+    Só entram os parâmetros do construtor: atributos de execução (last_values,
+    last_votes, skip_optional, programa compilado...) mudam a cada avaliação e
+    não podem mudar a chave.
+    """
+    params = {}
+    for name, parameter in inspect.signature(type(strategy)).parameters.items():
+        if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+            continue
+        attr = name if hasattr(strategy, name) else DERIVED_PARAMS.get(name)
+        if attr is not None and hasattr(strategy, attr):
+            params[name] = _param_value(getattr(strategy, attr))
+    return {'class': type(strategy).__name__, 'params': params}
+
+
+def cache_key(strategy: Strategy, initial_capital: float, first_open_time, dataset: str = '') -> str:
+    """Hash dos parâmetros da estratégia, do capital inicial e do início dos dados."""
+    payload = json.dumps({'strategy': strategy_params(strategy), 'capital': initial_capital,
+                          'start': str(first_open_time), 'dataset': dataset},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24]
+
+
+class IncrementalBacktest:
+    """
+    Backtest que persiste o estado final e retoma com os candles novos.
+    Uso típico (job noturno):
+        bt = IncrementalBacktest(strategy, dataset='BTCUSDT-1m')
+        capital, trades = bt.run(df)        # df = histórico completo, com os candles novos
+    """
+    def __init__(self, strategy: Strategy, initial_capital: float = 1000.0,
+                 cache_dir: str = '.backtest_cache', dataset: str = ''):
+        """
+        :param strategy: Estratégia avaliada.
+        :param initial_capital: Capital inicial.
+        :param cache_dir: Pasta onde os estados são guardados.
+        :param dataset: Identificação dos dados (ex: 'BTCUSDT-1m'); entra no hash do cache.
+        """
+        self.strategy = strategy
+        self.initial_capital = initial_capital
+        self.cache_dir = cache_dir
+        self.dataset = dataset
+        self.processed = 0   # Candles avaliados na última chamada (0 = tudo veio do cache)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load(self, key: str):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Cache de backtest ilegível ({path}): {e}; recalculando.")
+            return None
+
+    def _save(self, key: str, state: dict):
+        path = self._path(key)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def _new_state(self) -> dict:
+        return {'capital': self.initial_capital, 'position': 0.0, 'trades': [],
+                'last_index': -1, 'last_open_time': None, 'last_close': None, 'tail': None}
+
+    def _remember_tail(self, state: dict, df: pd.DataFrame, index_offset: int):
+        lookback = self.strategy.required_history()
+        tail = df if lookback is None else df.iloc[-lookback:]
+        state['tail'] = tail.reset_index(drop=True)
+        state['last_index'] = len(df) - 1 + index_offset
+        state['last_open_time'] = df['open_time'].iloc[-1]
+        state['last_close'] = float(df['close'].iloc[-1])
+
+    def run(self, df: pd.DataFrame):
+        """
+        Backtest sobre o histórico completo `df`. Se houver estado salvo para
+        o mesmo início de dados e os candles já processados não mudaram,
+        avalia apenas os candles novos. Retorna (capital final, trades), igual
+        a backtest_strategy.
+        """
+        key = cache_key(self.strategy, self.initial_capital, df['open_time'].iloc[0], self.dataset)
+        state = self._load(key)
+        start = 0
+        if state is not None:
+            last = state['last_index']
+            if (last < len(df) and df['open_time'].iloc[last] == state['last_open_time']
+                    and float(df['close'].iloc[last]) == state['last_close']):
+                start = last + 1
+            else:
+                logger.warning("Dados do backtest mudaram desde o cache; recalculando do início.")
+                state = None
+        if state is None:
+            state = self._new_state()
+
+        self.processed = len(df) - start
+        if start < len(df):
+            backtest_steps(self.strategy, df, state, start=start)
+            self._remember_tail(state, df, 0)
+            self._save(key, state)
+        logger.info(f"Backtest incremental: {self.processed} candles novos avaliados "
+                    f"({start} reaproveitados do cache).")
+        return close_backtest(state, df.iloc[:state['last_index'] + 1])
+
+    def extend(self, new_candles: pd.DataFrame, first_open_time):
+        """
+        Continua o backtest apenas com os candles novos, sem carregar o histórico:
+        usa os últimos candles guardados no estado como contexto da estratégia.
+        :param new_candles: Candles posteriores ao último processado.
+        :param first_open_time: open_time do primeiro candle do histórico (parte da chave).
+        """
+        key = cache_key(self.strategy, self.initial_capital, first_open_time, self.dataset)
+        state = self._load(key)
+        if state is None or state['tail'] is None:
+            raise ValueError("Não há backtest salvo para estes parâmetros; use run() no histórico completo.")
+
+        new_candles = new_candles[new_candles['open_time'] > state['last_open_time']]
+        if new_candles.empty:
+            self.processed = 0
+            return close_backtest(state, state['tail'], state['last_index'] - len(state['tail']) + 1)
+
+        tail = state['tail']
+        df = pd.concat([tail, new_candles], ignore_index=True)
+        offset = state['last_index'] - len(tail) + 1
+        backtest_steps(self.strategy, df, state, start=len(tail), index_offset=offset)
+        self.processed = len(new_candles)
+        self._remember_tail(state, df, offset)
+        self._save(key, state)
+        return close_backtest(state, df, offset)
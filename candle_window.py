@@ -0,0 +1,204 @@
+import numpy as np
+
+# =============================================================================
+# Janela fixa de candles (ring buffer) com views NumPy
+# -----------------------------------------------------------------------------
+# Cada coluna OHLCV é guardada em float64 num buffer de tamanho 2 * capacity:
+# todo candle é escrito em duas posições (i e i + capacity). Assim os últimos
+# `capacity` candles sempre ocupam um trecho contíguo do buffer e podem ser
+# lidos como uma view, sem cópia e sem montar DataFrame a cada tick.
+# =============================================================================
+FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+_INTERVAL_UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def interval_to_ms(interval: str) -> int:
+    """Converte um intervalo da Binance ('1m', '15m', '4h', '1d', '1w') para milissegundos."""
+    return int(interval[:-1]) * _INTERVAL_UNITS_MS[interval[-1]]
+
+
+class CandleWindow:
+    """
+    Janela pré-alocada com os últimos `capacity` candles fechados.
+    append() escreve o candle no lugar (sem alocar) e as propriedades
+    open/high/low/close/volume/open_time retornam views contíguas e somente leitura,
+    do candle mais antigo para o mais recente.
+    """
+    def __init__(self, capacity: int = 500):
+        """
+        :param capacity: Quantidade máxima de candles mantidos na janela.
+        """
+        self.capacity = capacity
+        self._buffer = np.zeros((len(FIELDS), 2 * capacity), dtype=np.float64)
+        self._head = 0    # Próxima posição de escrita (0 .. capacity - 1)
+        self._size = 0
+        self._views = None
+        self.last_open_time = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == self.capacity
+
+    def append(self, open_time: float, open_: float, high: float, low: float,
+               close: float, volume: float) -> bool:
+        """
+        Adiciona um candle FECHADO. Candles com open_time já presente na janela
+        são ignorados (retorna False).
+        """
+        if self.last_open_time is not None and open_time <= self.last_open_time:
+            return False
+
+        head = self._head
+        mirror = head + self.capacity
+        buf = self._buffer
+        buf[0, head] = buf[0, mirror] = open_time
+        buf[1, head] = buf[1, mirror] = open_
+        buf[2, head] = buf[2, mirror] = high
+        buf[3, head] = buf[3, mirror] = low
+        buf[4, head] = buf[4, mirror] = close
+        buf[5, head] = buf[5, mirror] = volume
+
+        self._head = head + 1 if head + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+        self.last_open_time = open_time
+        self._views = None
+        return True
+
+    def append_klines(self, klines) -> int:
+        """
+        Adiciona os candles fechados de uma resposta de get_klines. O último
+        item da resposta é o candle em andamento e nunca entra na janela.
+        Retorna quantos candles foram adicionados.
+        """
+        added = 0
+        for k in klines[:-1]:
+            if self.append(float(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                           float(k[4]), float(k[5])):
+                added += 1
+        return added
+
+    def resized(self, capacity: int) -> 'CandleWindow':
+        """
+        Nova janela com outra capacidade e os mesmos candles (os mais recentes,
+        se a nova for menor), sem buscar nada na exchange.
+        """
+        window = CandleWindow(capacity)
+        keep = min(self._size, capacity)
+        if keep:
+            data = np.array([view[-keep:] for view in (self._views or self._build_views())])
+            window._buffer[:, :keep] = data
+            window._buffer[:, capacity:capacity + keep] = data
+            window._head = keep % capacity
+            window._size = keep
+            window.last_open_time = self.last_open_time
+        return window
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self._views = None
+        self.last_open_time = None
+
+    def _build_views(self):
+        start = (self._head - self._size) % self.capacity
+        views = []
+        for row in self._buffer:
+            view = row[start:start + self._size]
+            view.flags.writeable = False
+            views.append(view)
+        self._views = views
+        return views
+
+    def column(self, name: str) -> np.ndarray:
+        """View somente leitura da coluna `name` (ver FIELDS)."""
+        views = self._views or self._build_views()
+        return views[FIELDS.index(name)]
+
+    @property
+    def open_time(self) -> np.ndarray:
+        return (self._views or self._build_views())[0]
+
+    @property
+    def open(self) -> np.ndarray:
+        return (self._views or self._build_views())[1]
+
+    @property
+    def high(self) -> np.ndarray:
+        return (self._views or self._build_views())[2]
+
+    @property
+    def low(self) -> np.ndarray:
+        return (self._views or self._build_views())[3]
+
+    @property
+    def close(self) -> np.ndarray:
+        return (self._views or self._build_views())[4]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return (self._views or self._build_views())[5]
+
+    def to_frame(self):
+        """
+        Monta um DataFrame com as colunas OHLCV de TradingBot.get_historical_data.
+        Útil para estratégias antigas e backtests; não use no loop quente.
+        """
+        import pandas as pd
+        df = pd.DataFrame({name: self.column(name).copy() for name in FIELDS[1:]})
+        df.insert(0, 'open_time', pd.to_datetime(self.open_time, unit='ms'))
+        return df
+
+
+class CandleStore:
+    """
+    Conjunto de CandleWindow por símbolo, com persistência em .npz para que
+    um novo processo comece aquecido em vez de baixar todo o histórico.
+    """
+    def __init__(self, capacity: int = 500):
+        self.capacity = capacity
+        self.windows = {}
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.windows
+
+    def window(self, symbol: str) -> CandleWindow:
+        """Retorna (criando se preciso) a janela do símbolo."""
+        window = self.windows.get(symbol)
+        if window is None:
+            window = self.windows[symbol] = CandleWindow(self.capacity)
+        return window
+
+    def closes_matrix(self, symbols, length: int, out: np.ndarray = None) -> np.ndarray:
+        """
+        Empilha os últimos `length` fechamentos de cada símbolo numa matriz
+        (símbolos x length). Todos os símbolos precisam ter ao menos `length` candles.
+        """
+        if out is None:
+            out = np.empty((len(symbols), length), dtype=np.float64)
+        for i, symbol in enumerate(symbols):
+            out[i] = self.windows[symbol].close[-length:]
+        return out
+
+    def save(self, path: str):
+        arrays = {}
+        for symbol, window in self.windows.items():
+            for name in FIELDS:
+                arrays[f"{symbol}/{name}"] = window.column(name)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str, capacity: int = 500) -> 'CandleStore':
+        store = cls(capacity)
+        with np.load(path) as data:
+            symbols = sorted({key.split('/')[0] for key in data.files})
+            for symbol in symbols:
+                columns = [data[f"{symbol}/{name}"] for name in FIELDS]
+                window = store.window(symbol)
+                for row in zip(*columns):
+                    window.append(*row)
+        return store
@@ -0,0 +1,160 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from tradingbot import Strategy
+
+logger = logging.getLogger('TradingBot.Consensus')
+
+# =============================================================================
+# Consenso entre estratégias (votação ponderada)
+# -----------------------------------------------------------------------------
+# Cada estratégia membro produz o array de sinais do histórico inteiro
+# (Strategy.signals: 1 compra, -1 venda, 0 nada). Empilhados numa matriz
+# (membros x candles), a decisão de todos os candles sai de poucas operações:
+#     score_compra = pesos @ (sinais == 1) / soma(pesos)
+#     score_venda  = pesos @ (sinais == -1) / soma(pesos)
+#     compra onde score_compra >= quorum e nenhum veto votou venda
+# O mesmo conjunto decide o último candle ao vivo (should_buy/should_sell)
+# e roda backtests longos via signals() + backtest_signals.
+# =============================================================================
+
+
+class ConsensusStrategy(Strategy):
+    """
+    Combina N estratégias com pesos, quórum e vetos.
+    Ex.: o getCombinedTradeStrategy de Trading_Bot.py (MA e RSI precisam concordar)
+         equivale a ConsensusStrategy([ma, rsi], buy_quorum=1.0, sell_quorum=1.0).
+    """
+    def __init__(self, members, weights=None, buy_quorum: float = 0.5, sell_quorum: float = 0.5,
+                 min_votes: int = 1, vetoes=(), optional=()):
+        """
+        :param members: Estratégias (instâncias de Strategy).
+        :param weights: Peso de cada estratégia (padrão: 1 para todas).
+        :param buy_quorum: Fração mínima do peso total votando compra para comprar.
+        :param sell_quorum: Fração mínima do peso total votando venda para vender.
+        :param min_votes: Número mínimo de estratégias votando no mesmo lado.
+        :param vetoes: Estratégias (membros) com poder de veto: se uma delas vota
+                       venda, não há compra naquele candle, e vice-versa.
+        :param optional: Estratégias que podem deixar de ser avaliadas quando o loop
+                         está sobrecarregado (skip_optional, ver loop_watchdog.py).
+        """
+        self.members = list(members)
+        if not self.members:
+            raise ValueError("ConsensusStrategy precisa de ao menos uma estratégia.")
+        self.weights = np.ones(len(self.members)) if weights is None else np.asarray(weights, dtype=np.float64)
+        if len(self.weights) != len(self.members):
+            raise ValueError("weights deve ter um peso por estratégia.")
+        self.buy_quorum = buy_quorum
+        self.sell_quorum = sell_quorum
+        self.min_votes = min_votes
+        self.veto_mask = np.array([any(m is v for v in vetoes) for m in self.members])
+        self.optional_mask = np.array([any(m is o for o in optional) for m in self.members])
+        self.skip_optional = False
+        self.names = self._member_names()
+        self.last_votes = {}
+        self._cache_key = None
+        self._cache = 0
+
+    def _member_names(self):
+        names, seen = [], {}
+        for member in self.members:
+            name = type(member).__name__
+            seen[name] = seen.get(name, 0) + 1
+            names.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+        return names
+
+    def required_history(self):
+        lookbacks = [m.required_history() for m in self.members]
+        return None if any(lb is None for lb in lookbacks) else max(lookbacks)
+
+    # -------------------------
+    # Votação vetorizada
+    # -------------------------
+    def member_signals(self, df: pd.DataFrame) -> np.ndarray:
+        """Matriz (membros x candles) com os sinais de cada estratégia."""
+        skip = self.optional_mask if self.skip_optional else np.zeros(len(self.members), dtype=bool)
+        return np.vstack([np.zeros(len(df), dtype=np.int8) if skipped else m.signals(df)
+                          for m, skipped in zip(self.members, skip)])
+
+    def _active_weights(self) -> np.ndarray:
+        if self.skip_optional and self.optional_mask.any():
+            return np.where(self.optional_mask, 0.0, self.weights)
+        return self.weights
+
+    def combine(self, votes: np.ndarray) -> np.ndarray:
+        """Decisão de cada candle a partir da matriz de votos (membros x candles)."""
+        buy_votes = votes == 1
+        sell_votes = votes == -1
+        weights = self._active_weights()
+        total = weights.sum()
+        buy_score = weights @ buy_votes / total
+        sell_score = weights @ sell_votes / total
+
+        buy = (buy_score >= self.buy_quorum) & (buy_votes.sum(axis=0) >= self.min_votes)
+        sell = (sell_score >= self.sell_quorum) & (sell_votes.sum(axis=0) >= self.min_votes)
+        if self.veto_mask.any():
+            buy &= ~sell_votes[self.veto_mask].any(axis=0)
+            sell &= ~buy_votes[self.veto_mask].any(axis=0)
+
+        # Quórum baixo pode aprovar os dois lados: vence o de maior score
+        both = buy & sell
+        if both.any():
+            buy[both] = buy_score[both] > sell_score[both]
+            sell[both] = sell_score[both] > buy_score[both]
+
+        out = np.zeros(votes.shape[1], dtype=np.int8)
+        out[buy] = 1
+        out[sell] = -1
+        return out
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        return self.combine(self.member_signals(df))
+
+    # -------------------------
+    # Decisão ao vivo (último candle)
+    # -------------------------
+    def _last_decision(self, df: pd.DataFrame) -> int:
+        """Decisão no último candle (1, -1 ou 0); reaproveitada entre should_buy e should_sell."""
+        key = (id(df), len(df), float(df['close'].iloc[-1]), self.skip_optional)
+        if key != self._cache_key:
+            self._cache = self._evaluate_last(df)
+            self._cache_key = key
+        return self._cache
+
+    def _evaluate_last(self, df: pd.DataFrame) -> int:
+        lookback = self.required_history()
+        if lookback is not None:
+            df = df.iloc[-lookback:]
+        votes = self.member_signals(df)[:, -1:]
+        self.last_votes = dict(zip(self.names, votes[:, 0].tolist()))
+        self.last_values = {k: v for m in self.members for k, v in m.last_values.items()}
+        return int(self.combine(votes)[0])
+
+    def should_buy(self, df: pd.DataFrame) -> bool:
+        return self._last_decision(df) == 1
+
+    def should_sell(self, df: pd.DataFrame) -> bool:
+        return self._last_decision(df) == -1
+
+
+if __name__ == '__main__':
+    import os
+    import time
+    from tradingbot import (TradingBot, MovingAverageCrossStrategy, RSIStrategy, BollingerStrategy,
+                            backtest_signals)
+
+    ma = MovingAverageCrossStrategy(short_window=5, long_window=20)
+    rsi = RSIStrategy()
+    bollinger = BollingerStrategy()
+    consensus = ConsensusStrategy([ma, rsi, bollinger], weights=[2, 1, 1], buy_quorum=0.5,
+                                  sell_quorum=0.5, vetoes=[rsi])
+
+    bot = TradingBot(os.environ.get('binance_api'), os.environ.get('binance_secret'), consensus,
+                     testnet=False)
+    df = bot.get_historical_data(lookback=1000)
+    start = time.perf_counter()
+    capital, trades = backtest_signals(consensus.signals(df), df)
+    print(f"Consenso: capital final {capital:.2f}, {len(trades)} trades, "
+          f"{(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,297 @@
+import csv
+import logging
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger('TradingBot.CustomBars')
+
+# =============================================================================
+# Barras por tick, volume e valor financeiro (aggTrade)
+# -----------------------------------------------------------------------------
+# Em vez de candles de tempo fixo, as barras fecham quando a atividade
+# acumulada cruza um múltiplo do limiar:
+#     tick   -> número de trades
+#     volume -> quantidade negociada
+#     dollar -> preço * quantidade (valor na moeda de cotação)
+# A barra k fecha no trade em que o acumulado desde o início atinge
+# k * threshold; um trade grande que cruza vários múltiplos fecha uma única
+# barra (não há barras vazias). Cada trade custa O(1) no caminho
+# incremental, e a mesma regra tem uma versão vetorizada (build) para
+# históricos e para conferir o resultado.
+# As barras saem como linhas no formato de get_klines
+#   [open_time, open, high, low, close, volume, close_time, quote_volume, trades]
+# e podem ir direto para um CandleWindow / WindowStrategy ou para a fila de
+# eventos (event_queue.py) consumida por TradingBot.on_market_event.
+# =============================================================================
+TICK_BARS = 'tick'
+VOLUME_BARS = 'volume'
+DOLLAR_BARS = 'dollar'
+BAR_KINDS = (TICK_BARS, VOLUME_BARS, DOLLAR_BARS)
+
+
+class CustomBarBuilder:
+    """Monta barras de tick, volume ou valor a partir de trades, um por vez."""
+    __slots__ = ('kind', 'threshold', 'on_bar', 'bars_emitted', 'trades_seen', '_cum', '_next_index',
+                 '_open_time', '_open', '_high', '_low', '_close', '_volume', '_quote', '_count',
+                 '_last_time', '_last_open_time')
+
+    def __init__(self, kind: str, threshold: float, on_bar=None):
+        """
+        :param kind: 'tick', 'volume' ou 'dollar'.
+        :param threshold: Trades, quantidade ou valor por barra.
+        :param on_bar: Função chamada com a linha de cada barra fechada.
+        """
+        if kind not in BAR_KINDS:
+            raise ValueError(f"Tipo de barra inválido: {kind} (use {', '.join(BAR_KINDS)}).")
+        self.kind = kind
+        self.threshold = float(threshold)
+        self.on_bar = on_bar
+        self.bars_emitted = 0
+        self.trades_seen = 0
+        self._cum = 0.0
+        self._next_index = 1   # Próximo múltiplo do limiar que fecha barra
+        self._last_open_time = None
+        self._reset()
+
+    def _reset(self):
+        self._open_time = None
+        self._open = self._high = self._low = self._close = 0.0
+        self._volume = self._quote = 0.0
+        self._count = 0
+        self._last_time = 0.0
+
+    def on_trade(self, price: float, qty: float, trade_time: float):
+        """
+        Processa um trade (trade_time em ms). Retorna a linha da barra se este
+        trade fechou uma, senão None.
+        """
+        self.trades_seen += 1
+        quote = price * qty
+        if self._open_time is None:
+            # Barras podem começar no mesmo ms: o open_time precisa ser crescente
+            # para o CandleWindow, então desempata com 1 µs
+            last = self._last_open_time
+            self._open_time = trade_time if last is None or trade_time > last else last + 0.001
+            self._open = self._high = self._low = price
+        elif price > self._high:
+            self._high = price
+        elif price < self._low:
+            self._low = price
+        self._close = price
+        self._volume += qty
+        self._quote += quote
+        self._count += 1
+        self._last_time = trade_time
+
+        kind = self.kind
+        self._cum += 1.0 if kind == TICK_BARS else qty if kind == VOLUME_BARS else quote
+        if self._cum / self.threshold < self._next_index:
+            return None
+
+        row = [self._open_time, self._open, self._high, self._low, self._close, self._volume,
+               self._last_time, self._quote, self._count]
+        self._next_index = math.floor(self._cum / self.threshold) + 1
+        self._last_open_time = self._open_time
+        self._reset()
+        self.bars_emitted += 1
+        if self.on_bar is not None:
+            self.on_bar(row)
+        return row
+
+    def on_agg_trade_message(self, msg: dict):
+        """Callback para start_aggtrade_socket (stream <symbol>@aggTrade)."""
+        msg = msg.get('data', msg)
+        if msg.get('e') != 'aggTrade':
+            if msg.get('e') == 'error':
+                logger.error(f"Erro no stream de aggTrade: {msg}")
+            return None
+        return self.on_trade(float(msg['p']), float(msg['q']), float(msg['T']))
+
+    def partial(self):
+        """Linha da barra em formação (None se ainda não houve trade)."""
+        if self._open_time is None:
+            return None
+        return [self._open_time, self._open, self._high, self._low, self._close, self._volume,
+                self._last_time, self._quote, self._count]
+
+    # -------------------------
+    # Versão vetorizada
+    # -------------------------
+    def build(self, prices, qtys, times) -> pd.DataFrame:
+        """
+        Barras fechadas de um lote de trades (histórico), com a mesma regra de
+        on_trade. Continua o acumulado do builder, mas não emite on_bar e não
+        guarda a barra incompleta do fim do lote (use on_trade para o ao vivo).
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        qtys = np.asarray(qtys, dtype=np.float64)
+        times = np.asarray(times, dtype=np.float64)
+        quote = prices * qtys
+        metric = (np.ones_like(prices) if self.kind == TICK_BARS
+                  else qtys if self.kind == VOLUME_BARS else quote)
+
+        cum_after = np.cumsum(np.concatenate(([self._cum], metric)))[1:]
+        next_after = np.floor(cum_after / self.threshold)
+        # Trade i fecha barra se o acumulado atingiu o próximo múltiplo pendente
+        boundary = np.maximum.accumulate(np.concatenate(([self._next_index - 1], next_after)))
+        ends = np.flatnonzero(next_after > boundary[:-1])
+        if len(ends) == 0:
+            return pd.DataFrame(columns=['open_time', 'open', 'high', 'low', 'close', 'volume',
+                                         'close_time', 'quote_volume', 'trades'])
+        starts = np.concatenate(([0], ends[:-1] + 1))
+
+        open_time = times[starts].copy()
+        for i in range(len(open_time)):   # Desempate de barras no mesmo ms (raro)
+            previous = self._last_open_time if i == 0 else open_time[i - 1]
+            if previous is not None and open_time[i] <= previous:
+                open_time[i] = previous + 0.001
+        used = int(ends[-1]) + 1    # Trades depois da última barra fechada ficam de fora
+        bars = pd.DataFrame({
+            'open_time': open_time,
+            'open': prices[starts],
+            'high': np.maximum.reduceat(prices[:used], starts),
+            'low': np.minimum.reduceat(prices[:used], starts),
+            'close': prices[ends],
+            'volume': np.add.reduceat(qtys[:used], starts),
+            'close_time': times[ends],
+            'quote_volume': np.add.reduceat(quote[:used], starts),
+            'trades': ends - starts + 1,
+        })
+        self._cum = float(cum_after[ends[-1]])
+        self._next_index = math.floor(self._cum / self.threshold) + 1
+        self._last_open_time = float(open_time[-1])
+        self.bars_emitted += len(ends)
+        self.trades_seen += used
+        return bars
+
+
+def window_feeder(window, strategy=None, on_signal=None):
+    """
+    on_bar que adiciona cada barra a um CandleWindow e, se houver uma
+    WindowStrategy, chama on_signal(1 | -1, linha) quando ela sinalizar.
+    """
+    def on_bar(row):
+        window.append(row[0], row[1], row[2], row[3], row[4], row[5])
+        if strategy is None or on_signal is None:
+            return
+        if strategy.should_buy_window(window):
+            on_signal(1, row)
+        elif strategy.should_sell_window(window):
+            on_signal(-1, row)
+    return on_bar
+
+
+def queue_publisher(queue, symbol: str, kind: str):
+    """
+    on_bar que publica cada barra como fechamento de candle na
+    CoalescingEventQueue (event_queue.py), com chave (symbol, kind); o
+    TradingBot.on_market_event trata a barra como um candle fechado.
+    """
+    key = (symbol, kind)
+
+    def on_bar(row):
+        queue.put_candle_close(key, row, event_time=row[6] / 1000)
+    return on_bar
+
+
+# =============================================================================
+# Leitura de trades gravados e benchmark
+# =============================================================================
+def load_trades(path: str):
+    """
+    Lê trades de um CSV de aggTrades da Binance (data.binance.vision:
+    agg_trade_id, price, quantity, first_trade_id, last_trade_id, transact_time,
+    is_buyer_maker[, is_best_match], com ou sem cabeçalho) ou de um log de
+    recorder.py (mensagens de stream aggTrade). Retorna (preços, quantidades, horários em ms).
+    """
+    from recorder import MAGIC, KIND_STREAM, read_records
+    with open(path, 'rb') as f:
+        is_recording = f.read(len(MAGIC)) == MAGIC
+    if is_recording:
+        rows = []
+        for kind, _, _, payload in read_records(path):
+            msg = payload.get('data', payload) if kind == KIND_STREAM else None
+            if msg and msg.get('e') == 'aggTrade':
+                rows.append((float(msg['p']), float(msg['q']), float(msg['T'])))
+        data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return data[:, 0], data[:, 1], data[:, 2]
+
+    with open(path, newline='') as f:
+        first = next(csv.reader(f))
+    header = 0 if not first[0].strip().lstrip('-').isdigit() else None
+    df = pd.read_csv(path, header=header, usecols=[1, 2, 5], names=None if header == 0 else range(len(first)))
+    df.columns = ['price', 'quantity', 'time']
+    times = df['time'].to_numpy(dtype=np.float64)
+    if len(times) and times[0] > 1e14:    # Arquivos recentes vêm em microssegundos
+        times = times / 1000
+    return df['price'].to_numpy(dtype=np.float64), df['quantity'].to_numpy(dtype=np.float64), times
+
+
+def synthetic_trades(n: int, seed: int = 0, start_price: float = 60_000.0):
+    """Trades sintéticos (passeio aleatório), para o benchmark sem arquivo."""
+    rng = np.random.default_rng(seed)
+    prices = start_price * np.exp(np.cumsum(rng.normal(0, 2e-5, n)))
+    qtys = rng.exponential(0.02, n)
+    times = 1.7e12 + np.cumsum(rng.exponential(0.5, n)).round()
+    return prices, qtys, times
+
+
+def benchmark(prices, qtys, times, kind: str, threshold: float, window_capacity: int = 500) -> dict:
+    """
+    Passa os trades um a um pelo caminho ao vivo (on_trade -> CandleWindow ->
+    MovingAverageCrossStrategy) e compara com a taxa de trades do arquivo.
+    """
+    from candle_window import CandleWindow
+    from tradingbot import MovingAverageCrossStrategy
+
+    window = CandleWindow(window_capacity)
+    signals = []
+    builder = CustomBarBuilder(kind, threshold,
+                               on_bar=window_feeder(window, MovingAverageCrossStrategy(5, 20),
+                                                    lambda side, row: signals.append(side)))
+    price_list, qty_list, time_list = prices.tolist(), qtys.tolist(), times.tolist()
+    on_trade = builder.on_trade
+    start = time.perf_counter()
+    for p, q, t in zip(price_list, qty_list, time_list):
+        on_trade(p, q, t)
+    elapsed = time.perf_counter() - start
+
+    reference = CustomBarBuilder(kind, threshold).build(prices, qtys, times)
+    span_s = max((times[-1] - times[0]) / 1000, 1e-9) if len(times) else 1e-9
+    # Pico: maior número de trades em uma janela de 1 segundo
+    peak = int(np.max(np.searchsorted(times, times + 1000) - np.arange(len(times)))) if len(times) else 0
+    rate = len(prices) / elapsed if elapsed > 0 else float('inf')
+    return {
+        'trades': len(prices),
+        'bars': builder.bars_emitted,
+        'bars_match_vectorized': builder.bars_emitted == len(reference),
+        'signals': len(signals),
+        'elapsed_s': elapsed,
+        'trades_per_s': rate,
+        'us_per_trade': elapsed / max(len(prices), 1) * 1e6,
+        'file_avg_trades_per_s': len(prices) / span_s,
+        'file_peak_trades_per_s': peak,
+        'headroom_vs_peak': rate / peak if peak else float('inf'),
+    }
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmark das barras de tick/volume/valor.')
+    parser.add_argument('trades', nargs='?', help='CSV de aggTrades ou log de recorder.py')
+    parser.add_argument('--kind', choices=BAR_KINDS, default=DOLLAR_BARS)
+    parser.add_argument('--threshold', type=float, default=1_000_000.0)
+    parser.add_argument('--synthetic', type=int, default=2_000_000,
+                        help='Trades sintéticos quando nenhum arquivo é informado')
+    args = parser.parse_args()
+
+    if args.trades:
+        data = load_trades(args.trades)
+    else:
+        data = synthetic_trades(args.synthetic)
+    for name, value in benchmark(*data, kind=args.kind, threshold=args.threshold).items():
+        print(f"{name:>24}: {value:,.2f}" if isinstance(value, float) else f"{name:>24}: {value}")
@@ -0,0 +1,379 @@
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+logger = logging.getLogger('TradingBot.Dashboard')
+
+# =============================================================================
+# Dashboard web local (server-sent events + LTTB)
+# -----------------------------------------------------------------------------
+# O loop de trading só publica em buffers em memória (DashboardState): séries
+# de preço, patrimônio e indicadores em ring buffers NumPy, posições e as
+# últimas ordens. Cada publicação custa um lock curto e um put_nowait por
+# navegador conectado; cliente lento perde eventos em vez de travar o bot.
+#
+# O servidor HTTP (ThreadingHTTPServer, uma thread por conexão) roda fora do
+# loop e expõe:
+#   /               página com gráficos (SVG, sem dependências externas)
+#   /api/snapshot   estado atual (posições, ordens, último valor das séries)
+#   /api/history    série reduzida com LTTB (?series=price&points=1000)
+#   /events         stream SSE com cada publicação do bot
+# O LTTB (Largest-Triangle-Three-Buckets) mantém o formato visual da série
+# com poucos pontos: meses de candles de 1m viram ~1000 pontos no servidor.
+# =============================================================================
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int):
+    """
+    Reduz a série (x, y) para `threshold` pontos com Largest-Triangle-Three-Buckets.
+    O primeiro e o último ponto são mantidos; de cada bucket intermediário fica o
+    ponto que forma o maior triângulo com o ponto escolhido antes e a média do
+    bucket seguinte.
+    :return: (x, y) reduzidos.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+    # Limites dos buckets intermediários (n - 2 pontos divididos em threshold - 2)
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Média de cada bucket, de uma vez (o "ponto C" do triângulo)
+    x_sum = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    y_sum = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    x_avg = np.append(x_sum / counts, x[-1])
+    y_avg = np.append(y_sum / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Área (x2) do triângulo A, ponto do bucket, média do próximo bucket
+        area = np.abs((x[a] - x_avg[i + 1]) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (y_avg[i + 1] - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+class RingSeries:
+    """Série temporal em ring buffer pré-alocado (tempo, valor)."""
+    __slots__ = ('capacity', '_t', '_v', '_next', 'size')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._t = np.empty(capacity, dtype=np.float64)
+        self._v = np.empty(capacity, dtype=np.float64)
+        self._next = 0
+        self.size = 0
+
+    def append(self, t: float, value: float):
+        i = self._next
+        self._t[i] = t
+        self._v[i] = value
+        self._next = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def last(self):
+        if not self.size:
+            return None
+        i = (self._next - 1) % self.capacity
+        return float(self._t[i]), float(self._v[i])
+
+    def arrays(self):
+        """Cópia (tempo, valor) em ordem cronológica."""
+        if self.size < self.capacity:
+            return self._t[:self.size].copy(), self._v[:self.size].copy()
+        return np.roll(self._t, -self._next), np.roll(self._v, -self._next)
+
+
+class DashboardState:
+    """
+    Estado publicado pelo bot. Os métodos são chamados da thread do loop e só
+    escrevem em memória; o servidor lê com o mesmo lock.
+    """
+    def __init__(self, capacity: int = 200_000, max_orders: int = 500, client_queue: int = 1000):
+        """
+        :param capacity: Pontos guardados por série (200k ≈ 4,5 meses de candles de 1m).
+        :param max_orders: Últimas ordens mantidas.
+        :param client_queue: Eventos pendentes por navegador antes de descartar.
+        """
+        self.capacity = capacity
+        self.client_queue = client_queue
+        self.series = {}
+        self.positions = {}
+        self.orders = deque(maxlen=max_orders)
+        self.dropped_events = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # Publicação (thread do loop)
+    # -------------------------
+    def record(self, name: str, value: float, timestamp: float = None):
+        """Acrescenta um ponto à série `name` (price, equity, ind_rsi, ...)."""
+        if value is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            series = self.series.get(name)
+            if series is None:
+                series = self.series[name] = RingSeries(self.capacity)
+            series.append(timestamp, float(value))
+        self._broadcast('series', {'name': name, 't': timestamp, 'v': float(value)})
+
+    def update_position(self, symbol: str, **fields):
+        """Estado da posição do símbolo (in_position, buy_price, quantity, ...)."""
+        with self._lock:
+            position = self.positions.setdefault(symbol, {})
+            position.update(fields)
+            position['updated'] = time.time()
+            payload = dict(position, symbol=symbol)
+        self._broadcast('position', payload)
+
+    def add_order(self, symbol: str, side: str, price: float, quantity: float, **extra):
+        order = {'symbol': symbol, 'side': side, 'price': price, 'quantity': quantity,
+                 'time': time.time(), **extra}
+        with self._lock:
+            self.orders.append(order)
+        self._broadcast('order', order)
+
+    def _broadcast(self, event: str, data: dict):
+        if not self._subscribers:
+            return
+        message = f"event: {event}\ndata: {json.dumps(data, default=float)}\n\n".encode('utf-8')
+        for q in list(self._subscribers):
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                self.dropped_events += 1
+
+    # -------------------------
+    # Leitura (threads do servidor)
+    # -------------------------
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(maxsize=self.client_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'positions': {s: dict(p) for s, p in self.positions.items()},
+                'orders': list(self.orders),
+                'series': {name: s.last() for name, s in self.series.items()},
+                'clients': len(self._subscribers),
+                'dropped_events': self.dropped_events,
+            }
+
+    def history(self, name: str, points: int = 1000, start: float = None, end: float = None) -> dict:
+        """Série `name` entre start e end (epoch, segundos), reduzida para `points` pontos."""
+        with self._lock:
+            series = self.series.get(name)
+            if series is None:
+                raise KeyError(name)
+            t, v = series.arrays()
+        if start is not None or end is not None:
+            mask = (t >= (start if start is not None else -np.inf)) & (t <= (end if end is not None else np.inf))
+            t, v = t[mask], v[mask]
+        total = len(t)
+        t, v = lttb(t, v, points)
+        return {'name': name, 'total': total, 't': t.tolist(), 'v': v.tolist()}
+
+
+# =============================================================================
+# Servidor HTTP
+# =============================================================================
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>TradingBot</title>
+<style>
+body{font-family:sans-serif;background:#111;color:#ddd;margin:16px}
+svg{background:#1b1b1b;width:100%;height:180px;margin-bottom:12px}
+table{border-collapse:collapse;font-size:13px}td,th{padding:2px 8px;border-bottom:1px solid #333}
+h3{margin:8px 0}
+</style></head><body>
+<h3>Posições</h3><table id="positions"></table>
+<div id="charts"></div>
+<h3>Ordens</h3><table id="orders"></table>
+<script>
+const data = {};
+function draw(name){
+  let svg = document.getElementById('c_'+name);
+  if(!svg){
+    const div = document.getElementById('charts');
+    div.insertAdjacentHTML('beforeend', '<h3>'+name+' <small id="l_'+name+'"></small></h3>'+
+      '<svg id="c_'+name+'" viewBox="0 0 1000 180" preserveAspectRatio="none"></svg>');
+    svg = document.getElementById('c_'+name);
+  }
+  const s = data[name]; if(!s || !s.t.length) return;
+  const t0 = s.t[0], t1 = s.t[s.t.length-1] || t0 + 1;
+  const lo = Math.min(...s.v), hi = Math.max(...s.v);
+  const pts = s.t.map((t,i)=>((t-t0)/((t1-t0)||1)*1000).toFixed(1)+','+
+    (175-(s.v[i]-lo)/((hi-lo)||1)*170).toFixed(1)).join(' ');
+  svg.innerHTML = '<polyline fill="none" stroke="#4caf50" stroke-width="1.5" points="'+pts+'"/>';
+  document.getElementById('l_'+name).textContent = s.v[s.v.length-1].toFixed(4)+' ('+s.total+' pontos)';
+}
+async function load(name){
+  const r = await fetch('/api/history?points=1000&series='+encodeURIComponent(name));
+  data[name] = await r.json(); draw(name);
+}
+function row(cells){return '<tr>'+cells.map(c=>'<td>'+c+'</td>').join('')+'</tr>';}
+const orders = [];
+function renderOrders(){
+  document.getElementById('orders').innerHTML = row(['hora','símbolo','lado','preço','qtd'])+
+    orders.slice(-20).reverse().map(o=>row([new Date(o.time*1000).toLocaleTimeString(),o.symbol,o.side,o.price,o.quantity])).join('');
+}
+const positions = {};
+function renderPositions(){
+  document.getElementById('positions').innerHTML = Object.values(positions).map(p=>row(
+    Object.entries(p).map(([k,v])=>k+': '+v))).join('');
+}
+fetch('/api/snapshot').then(r=>r.json()).then(s=>{
+  Object.assign(positions, s.positions); renderPositions();
+  orders.push(...s.orders); renderOrders();
+  Object.keys(s.series).forEach(load);
+  const es = new EventSource('/events');
+  es.addEventListener('series', e=>{
+    const p = JSON.parse(e.data);
+    if(!data[p.name]){load(p.name); return;}
+    const s = data[p.name]; s.t.push(p.t); s.v.push(p.v); s.total++;
+    // Reduz de novo no servidor quando o gráfico cresce demais
+    if(s.t.length > 2000) load(p.name); else draw(p.name);
+  });
+  es.addEventListener('position', e=>{const p = JSON.parse(e.data); positions[p.symbol] = p; renderPositions();});
+  es.addEventListener('order', e=>{orders.push(JSON.parse(e.data)); renderOrders();});
+});
+</script></body></html>
+"""
+
+
+class Dashboard:
+    """Servidor HTTP do dashboard, em threads próprias (daemon)."""
+    heartbeat_s = 15.0   # Comentário SSE periódico para manter a conexão aberta
+
+    def __init__(self, state: DashboardState = None, host: str = '127.0.0.1', port: int = 8050):
+        """
+        :param state: DashboardState publicado pelo bot (padrão: um novo).
+        :param host: Endereço do servidor (padrão: apenas local).
+        :param port: Porta HTTP.
+        """
+        self.state = state or DashboardState()
+        self.host = host
+        self.port = port
+        self._server = None
+        self._stopping = threading.Event()
+
+    def _handler(self):
+        dashboard = self
+        state = self.state
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                logger.debug(fmt % args)
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _json(self, payload, status: int = 200):
+                self._send(status, json.dumps(payload, default=float).encode('utf-8'), 'application/json')
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                if url.path == '/':
+                    self._send(200, PAGE.encode('utf-8'), 'text/html; charset=utf-8')
+                elif url.path == '/api/snapshot':
+                    self._json(state.snapshot())
+                elif url.path == '/api/history':
+                    try:
+                        self._json(state.history(query.get('series', 'price'),
+                                                 points=int(query.get('points', 1000)),
+                                                 start=float(query['start']) if 'start' in query else None,
+                                                 end=float(query['end']) if 'end' in query else None))
+                    except KeyError:
+                        self._json({'error': f"série desconhecida: {query.get('series')}"}, 404)
+                    except ValueError as e:
+                        self._json({'error': str(e)}, 400)
+                elif url.path == '/events':
+                    self._stream()
+                else:
+                    self._json({'error': 'não encontrado'}, 404)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-store')
+                self.send_header('Connection', 'keep-alive')
+                self.end_headers()
+                q = state.subscribe()
+                try:
+                    while not dashboard._stopping.is_set():
+                        try:
+                            message = q.get(timeout=dashboard.heartbeat_s)
+                        except queue.Empty:
+                            message = b': ping\n\n'
+                        self.wfile.write(message)
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    state.unsubscribe(q)
+
+        return Handler
+
+    def start(self):
+        """Sobe o servidor numa thread daemon e retorna imediatamente."""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='Dashboard', daemon=True).start()
+        logger.info(f"Dashboard em http://{self.host}:{self.port}/")
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import math
+
+    parser = argparse.ArgumentParser(description='Dashboard com dados sintéticos (demonstração).')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--history', type=int, default=130_000, help='Candles de 1m pré-carregados')
+    args = parser.parse_args()
+
+    state = DashboardState()
+    rng = np.random.default_rng(0)
+    now = time.time()
+    prices = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.001, args.history)))
+    for i, p in enumerate(prices):
+        state.record('price', p, now - (args.history - i) * 60)
+    Dashboard(state, port=args.port).start()
+    price = prices[-1]
+    while True:
+        price *= math.exp(rng.normal(0, 0.001))
+        state.record('price', price)
+        time.sleep(1)
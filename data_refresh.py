@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger('TradingBot.DataRefresh')
+
+# =============================================================================
+# Atualização concorrente de dados com prazo por requisição
+# -----------------------------------------------------------------------------
+# As buscas independentes (conta, candles, ...) rodam em paralelo num pool
+# pequeno de threads, cada uma com seu prazo. Quem perde o prazo é
+# substituído pelo último valor bom, marcado como desatualizado (stale), e a
+# estratégia decide se opera assim mesmo. A latência da etapa fica limitada
+# pela chamada mais lenta (ou pelo maior prazo), não pela soma das chamadas.
+# Uma busca atrasada não é repetida enquanto não terminar: a próxima rodada
+# espera a mesma requisição, e se ela terminar fora do prazo o resultado
+# ainda vira o "último valor bom".
+# =============================================================================
+
+
+class DataUnavailable(Exception):
+    """A busca falhou (ou estourou o prazo) e ainda não existe valor anterior."""
+
+
+class FetchResult:
+    """Resultado de uma busca na rodada de atualização."""
+    __slots__ = ('name', 'value', 'stale', 'fetched_at', 'latency', 'error')
+
+    def __init__(self, name: str, value, stale: bool, fetched_at: float, latency: float, error=None):
+        self.name = name
+        self.value = value
+        self.stale = stale              # True = valor de uma rodada anterior
+        self.fetched_at = fetched_at    # Relógio do momento em que o valor foi obtido
+        self.latency = latency          # Duração da requisição (ou espera até o prazo)
+        self.error = error              # 'timeout' ou a exceção, quando stale
+
+    def age(self, now: float = None) -> float:
+        """Segundos desde que o valor foi obtido."""
+        return (time.monotonic() if now is None else now) - self.fetched_at
+
+    def __repr__(self):
+        return (f"FetchResult({self.name!r}, stale={self.stale}, latency={self.latency * 1000:.1f}ms, "
+                f"error={self.error!r})")
+
+
+class _Source:
+    __slots__ = ('name', 'fetch', 'deadline', 'future', 'started_at', 'value', 'fetched_at',
+                 'has_value', 'timeouts', 'errors')
+
+    def __init__(self, name, fetch, deadline):
+        self.name = name
+        self.fetch = fetch
+        self.deadline = deadline
+        self.future = None
+        self.started_at = 0.0
+        self.value = None
+        self.fetched_at = None
+        self.has_value = False
+        self.timeouts = 0
+        self.errors = 0
+
+
+class ConcurrentRefresher:
+    """
+    Executa as buscas registradas em paralelo, cada uma com prazo próprio,
+    e devolve o valor novo ou o último valor bom marcado como stale.
+    """
+    def __init__(self, max_workers: int = 4, default_deadline: float = 5.0):
+        """
+        :param max_workers: Threads do pool (uma por busca independente basta).
+        :param default_deadline: Prazo padrão, em segundos, de cada busca.
+        """
+        self.default_deadline = default_deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='refresh')
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, fetch, deadline: float = None):
+        """
+        :param name: Nome da busca (chave do resultado).
+        :param fetch: Função sem argumentos que faz a requisição.
+        :param deadline: Prazo em segundos (padrão: default_deadline).
+        """
+        self._sources[name] = _Source(name, fetch, deadline or self.default_deadline)
+
+    def _run(self, source: _Source):
+        value = source.fetch()
+        # Guarda o valor mesmo se a rodada que pediu já desistiu dele
+        with self._lock:
+            source.value = value
+            source.fetched_at = time.monotonic()
+            source.has_value = True
+        return value
+
+    def refresh(self, names=None) -> dict:
+        """
+        Dispara as buscas e espera cada uma até o seu prazo.
+        :param names: Subconjunto das buscas (padrão: todas).
+        :return: {nome: FetchResult}.
+        """
+        sources = [self._sources[n] for n in (names or self._sources)]
+        start = time.monotonic()
+        for source in sources:
+            if source.future is None or source.future.done():
+                source.started_at = start
+                source.future = self._executor.submit(self._run, source)
+
+        results = {}
+        for source in sorted(sources, key=lambda s: s.deadline):
+            remaining = start + source.deadline - time.monotonic()
+            try:
+                value = source.future.result(timeout=max(remaining, 0.0))
+            except FutureTimeout:
+                source.timeouts += 1
+                results[source.name] = self._fallback(source, 'timeout', start)
+                logger.warning(f"Busca '{source.name}' passou do prazo de {source.deadline:.1f}s; "
+                               f"usando o último valor bom.")
+                continue
+            except Exception as e:
+                source.errors += 1
+                source.future = None
+                results[source.name] = self._fallback(source, e, start)
+                logger.error(f"Erro na busca '{source.name}': {e}; usando o último valor bom.")
+                continue
+            now = time.monotonic()
+            results[source.name] = FetchResult(source.name, value, False, source.fetched_at,
+                                               now - source.started_at)
+        return results
+
+    def _fallback(self, source: _Source, error, start: float) -> FetchResult:
+        with self._lock:
+            if not source.has_value:
+                raise DataUnavailable(f"Busca '{source.name}' sem resposta ({error}) e sem valor anterior.")
+            return FetchResult(source.name, source.value, True, source.fetched_at,
+                               time.monotonic() - start, error)
+
+    def stats(self) -> dict:
+        """Prazos estourados e erros por busca."""
+        return {name: {'timeouts': s.timeouts, 'errors': s.errors,
+                       'in_flight': s.future is not None and not s.future.done()}
+                for name, s in self._sources.items()}
+
+    def close(self):
+        """Encerra o pool sem esperar requisições atrasadas."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger('TradingBot.EventQueue')
+
+# =============================================================================
+# Fila de eventos com backpressure e coalescência (latest-wins)
+# -----------------------------------------------------------------------------
+# Entre o stream de mercado e a avaliação das estratégias:
+#   - ticks (candle em andamento, trades) são coalescidos por chave
+#     (símbolo, intervalo): se a estratégia estiver lenta, só o tick mais
+#     recente de cada chave fica na fila;
+#   - fechamentos de candle nunca são descartados: vão para uma fila FIFO
+#     limitada e, se ela encher, o produtor espera (backpressure);
+#   - um fechamento de candle torna obsoleto o tick pendente da mesma chave.
+# =============================================================================
+TICK = 'tick'
+CANDLE_CLOSE = 'candle_close'
+
+
+class MarketEvent:
+    """Evento entregue ao consumidor."""
+    __slots__ = ('kind', 'key', 'payload', 'event_time', 'enqueued_at')
+
+    def __init__(self, kind: str, key, payload, event_time: float, enqueued_at: float):
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.event_time = event_time      # Horário do dado (exchange), em segundos
+        self.enqueued_at = enqueued_at    # time.monotonic() da entrada na fila
+
+    def age(self, now: float = None) -> float:
+        """Tempo, em segundos, desde que o evento entrou na fila."""
+        return (time.monotonic() if now is None else now) - self.enqueued_at
+
+
+class QueueClosed(Exception):
+    """A fila foi fechada e não há mais eventos."""
+
+
+class CoalescingEventQueue:
+    """
+    Fila limitada entre dados de mercado e estratégias. Seguro para vários
+    produtores e consumidores (threads).
+    """
+    def __init__(self, max_candle_closes: int = 10_000, max_tick_keys: int = 10_000):
+        """
+        :param max_candle_closes: Fechamentos pendentes antes de bloquear o produtor.
+        :param max_tick_keys: Chaves com tick pendente antes de bloquear o produtor.
+        """
+        self.max_candle_closes = max_candle_closes
+        self.max_tick_keys = max_tick_keys
+        self._closes = deque()
+        self._ticks = OrderedDict()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Métricas
+        self.published = 0
+        self.coalesced = 0
+        self.superseded = 0
+        self.delivered = 0
+        self.max_depth = 0
+        self.blocked_s = 0.0
+        self.last_delivered_age = 0.0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._closes) + len(self._ticks)
+
+    def _wait_for_space(self, full, timeout):
+        if not full():
+            return
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        while full() and not self._closed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError("Fila cheia: consumidor não acompanha o fluxo de dados.")
+            self._cond.wait(remaining)
+        self.blocked_s += time.monotonic() - start
+
+    def put_tick(self, key, payload, event_time: float = None, timeout: float = None):
+        """Publica um tick; substitui o tick ainda não consumido da mesma chave."""
+        now = time.monotonic()
+        with self._cond:
+            if self._closed:
+                raise QueueClosed()
+            self.published += 1
+            pending = self._ticks.get(key)
+            if pending is not None:
+                # Mantém a posição na fila (justiça entre chaves), troca o conteúdo
+                pending.payload = payload
+                pending.event_time = event_time
+                self.coalesced += 1
+                return
+            self._wait_for_space(lambda: len(self._ticks) >= self.max_tick_keys, timeout)
+            self._ticks[key] = MarketEvent(TICK, key, payload, event_time, now)
+            self._after_put()
+
+    def put_candle_close(self, key, payload, event_time: float = None, timeout: float = None):
+        """Publica um fechamento de candle. Nunca é descartado: bloqueia se a fila estiver cheia."""
+        with self._cond:
+            if self._closed:
+                raise QueueClosed()
+            self._wait_for_space(lambda: len(self._closes) >= self.max_candle_closes, timeout)
+            self.published += 1
+            pending = self._ticks.get(key)
+            if pending is not None and (event_time is None or pending.event_time is None
+                                        or pending.event_time <= event_time):
+                del self._ticks[key]
+                self.superseded += 1
+            self._closes.append(MarketEvent(CANDLE_CLOSE, key, payload, event_time, time.monotonic()))
+            self._after_put()
+
+    def _after_put(self):
+        depth = len(self._closes) + len(self._ticks)
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self._cond.notify()
+
+    def get(self, timeout: float = None) -> MarketEvent:
+        """
+        Retorna o próximo evento: fechamentos de candle primeiro (em ordem),
+        depois o tick mais recente de cada chave. Levanta TimeoutError ou
+        QueueClosed.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._closes or self._ticks or self._closed, timeout):
+                raise TimeoutError()
+            if self._closes:
+                event = self._closes.popleft()
+            elif self._ticks:
+                _, event = self._ticks.popitem(last=False)
+            else:
+                raise QueueClosed()
+            self.delivered += 1
+            self.last_delivered_age = event.age()
+            self._cond.notify_all()
+            return event
+
+    def close(self):
+        """Encerra a fila: consumidores recebem os eventos restantes e depois QueueClosed."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Profundidade, idade do evento mais antigo e contadores."""
+        now = time.monotonic()
+        with self._cond:
+            oldest = [e.enqueued_at for e in (self._closes[0] if self._closes else None,
+                                              next(iter(self._ticks.values()), None)) if e]
+            return {
+                'depth_candle_closes': len(self._closes),
+                'depth_ticks': len(self._ticks),
+                'max_depth': self.max_depth,
+                'oldest_age_s': now - min(oldest) if oldest else 0.0,
+                'last_delivered_age_s': self.last_delivered_age,
+                'published': self.published,
+                'delivered': self.delivered,
+                'coalesced': self.coalesced,
+                'superseded': self.superseded,
+                'producer_blocked_s': self.blocked_s,
+            }
+
+
+# =============================================================================
+# Integração com o stream de klines e com o bot
+# =============================================================================
+def kline_stream_callback(queue: CoalescingEventQueue):
+    """
+    Retorna um callback para start_kline_socket que publica o candle em
+    andamento como tick e o candle fechado (k['x'] == True) como fechamento.
+    O payload é uma linha no formato de get_klines.
+    """
+    def on_message(msg):
+        msg = msg.get('data', msg)
+        if msg.get('e') != 'kline':
+            if msg.get('e') == 'error':
+                logger.error(f"Erro no stream de klines: {msg}")
+            return
+        k = msg['k']
+        key = (msg['s'], k['i'])
+        row = [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T']]
+        if k['x']:
+            queue.put_candle_close(key, row, event_time=msg['E'] / 1000)
+        else:
+            queue.put_tick(key, row, event_time=msg['E'] / 1000)
+    return on_message
+
+
+def run_consumer(queue: CoalescingEventQueue, handler, stats_every: float = 60.0):
+    """
+    Consome a fila até ela ser fechada, chamando handler(event) para cada
+    evento e registrando as métricas da fila periodicamente.
+    """
+    next_stats = time.monotonic() + stats_every
+    while True:
+        try:
+            event = queue.get(timeout=1.0)
+        except TimeoutError:
+            event = None
+        except QueueClosed:
+            logger.info(f"Fila encerrada: {queue.stats()}")
+            return
+        if event is not None:
+            try:
+                handler(event)
+            except Exception as e:
+                logger.exception(f"Erro ao processar evento {event.kind} {event.key}: {e}")
+        if time.monotonic() >= next_stats:
+            logger.info(f"Fila de eventos: {queue.stats()}")
+            next_stats = time.monotonic() + stats_every
@@ -0,0 +1,610 @@
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger('TradingBot.FastOrders')
+
+# =============================================================================
+# Caminho rápido de envio de ordens (REST da Binance Spot)
+# -----------------------------------------------------------------------------
+# O python-binance monta cada requisição do zero (dict de parâmetros ordenado,
+# HMAC criado com a chave, sessão com configuração padrão). Aqui:
+#   - uma requests.Session com pool keep-alive aquecido (warm) antes da
+#     primeira ordem: a ordem não paga handshake TCP/TLS; sem trust_env, o
+#     requests não relê variáveis de proxy do ambiente a cada chamada;
+#   - corpo de cada tipo de ordem pré-montado (template): no envio só entram
+#     os campos variáveis, o timestamp e a assinatura;
+#   - HMAC-SHA256 com a chave já processada (hmac.copy() por requisição);
+#   - diferença para o relógio do servidor em cache (sync_time), renovada
+#     fora do caminho da ordem; erro -1021 (timestamp fora do recvWindow)
+#     força a renovação e um novo envio;
+#   - tick de preço de cada símbolo (PRICE_FILTER do exchangeInfo) buscado
+#     uma vez, de preferência no warm, e usado para arredondar os preços.
+# Compra com proteção:
+#   - 'otoco': uma única requisição (orderList/otoco): compra LIMIT FOK
+#     agressiva (preço de referência + max_slippage) e, se executada, a OCO de
+#     stop loss/take profit é ativada pela própria exchange;
+#   - 'sequential': compra a mercado e OCO em seguida pela mesma conexão
+#     aquecida, com os preços calculados sobre o preço médio dos fills.
+# Enviar a compra e a OCO em paralelo não é possível no spot: a OCO de venda é
+# recusada enquanto a compra não libera o saldo do ativo. O paralelismo fica
+# no aquecimento das conexões e na renovação do relógio.
+# O tempo até o ack (envio -> resposta) de cada ordem é medido e reportado
+# (latency_report). MockExchange é um servidor HTTP local com a mesma API
+# (assinatura e recvWindow verificados) para medir sem tocar a exchange.
+# =============================================================================
+API_URL = 'https://api.binance.com'
+TESTNET_URL = 'https://testnet.binance.vision'
+
+
+class BinanceAPIError(Exception):
+    """Erro devolvido pela API (código e mensagem da Binance)."""
+    def __init__(self, status: int, code: int, message: str):
+        super().__init__(f"HTTP {status}, código {code}: {message}")
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def _format(value: float) -> str:
+    """Número sem notação científica nem zeros à direita (ex: 0.001, 30250.5)."""
+    return f'{value:.8f}'.rstrip('0').rstrip('.')
+
+
+def _tick_rule(tick: str):
+    """(tick, casas decimais) a partir do tickSize da Binance (ex: '0.01000000' -> (0.01, 2))."""
+    digits = tick.rstrip('0').partition('.')[2] if '.' in tick else ''
+    return float(tick), len(digits)
+
+
+class FastOrderClient:
+    """
+    Cliente de ordens com conexões aquecidas, templates e assinatura pré-computada.
+        fast = FastOrderClient(api_key, api_secret, testnet=True).warm()
+        result = fast.buy('BTCUSDT', 0.001, reference_price=30000.0, protect=True)
+        fast.latency_report()
+    """
+    def __init__(self, api_key: str, api_secret: str, testnet: bool = False, base_url: str = None,
+                 pool_size: int = 4, recv_window: int = 5000, time_sync_s: float = 300.0,
+                 timeout: float = 5.0, mode: str = 'otoco', max_slippage: float = 0.001,
+                 tick_sizes: dict = None, keep_acks: int = 10_000, trust_env: bool = False):
+        """
+        :param testnet: Usa a Binance Testnet (ignorado se base_url for informado).
+        :param base_url: URL base da API (ex: MockExchange.url).
+        :param pool_size: Conexões keep-alive mantidas abertas.
+        :param recv_window: Janela de validade das requisições assinadas (ms).
+        :param time_sync_s: Idade máxima da diferença de relógio antes de renovar.
+        :param timeout: Timeout de cada requisição (s).
+        :param mode: 'otoco' (compra + proteção numa requisição) ou 'sequential'.
+        :param max_slippage: Preço limite da compra FOK no modo 'otoco' (ex: 0.001 => +0.1%).
+        :param tick_sizes: {símbolo: tick} já conhecidos; os demais vêm do exchangeInfo.
+        :param keep_acks: Medições de tempo até o ack guardadas para o relatório.
+        :param trust_env: Lê proxies/.netrc do ambiente a cada requisição (padrão do
+                          requests, ~40% do tempo local de cada chamada); desligado por padrão.
+        """
+        if mode not in ('otoco', 'sequential'):
+            raise ValueError("mode deve ser 'otoco' ou 'sequential'.")
+        self.base_url = (base_url or (TESTNET_URL if testnet else API_URL)).rstrip('/')
+        self.pool_size = pool_size
+        self.recv_window = recv_window
+        self.time_sync_s = time_sync_s
+        self.timeout = timeout
+        self.mode = mode
+        self.max_slippage = max_slippage
+        self._ticks = {}
+        for symbol, tick in (tick_sizes or {}).items():
+            self._ticks[symbol] = _tick_rule(str(tick))
+
+        self.session = requests.Session()
+        self.session.trust_env = trust_env
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'X-MBX-APIKEY': api_key or '',
+                                     'Content-Type': 'application/x-www-form-urlencoded'})
+        self._mac = hmac.new((api_secret or '').encode('utf-8'), digestmod=hashlib.sha256)
+        self._templates = {}
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='FastOrders')
+
+        self.time_offset_ms = 0.0
+        self.time_synced_at = None
+        self._sync_pending = False
+        self._lock = threading.Lock()
+        self.acks = deque(maxlen=keep_acks)
+
+    # -------------------------
+    # Conexões e relógio
+    # -------------------------
+    def warm(self, symbols=()):
+        """
+        Sincroniza o relógio, abre pool_size conexões em paralelo (ping) e busca o
+        tick de preço de `symbols`, para nada disso ficar no caminho da primeira ordem.
+        """
+        self.sync_time()
+        list(self._executor.map(lambda _: self.ping(), range(self.pool_size)))
+        for symbol in symbols:
+            self.tick_size(symbol)
+        logger.info(f"{self.pool_size} conexões abertas com {self.base_url}; "
+                    f"diferença de relógio {self.time_offset_ms:+.1f} ms.")
+        return self
+
+    def ping(self):
+        self._call('GET', '/api/v3/ping')
+
+    def sync_time(self) -> float:
+        """Diferença servidor - local (ms), medida no ponto médio da ida e volta."""
+        start = time.time()
+        server_time = self._call('GET', '/api/v3/time')['serverTime']
+        end = time.time()
+        with self._lock:
+            self.time_offset_ms = server_time - (start + end) * 500.0
+            self.time_synced_at = time.monotonic()
+            self._sync_pending = False
+        return self.time_offset_ms
+
+    def _refresh_time_later(self):
+        """Renova o relógio em segundo plano se a medição estiver velha."""
+        with self._lock:
+            stale = self.time_synced_at is None or time.monotonic() - self.time_synced_at > self.time_sync_s
+            if not stale or self._sync_pending:
+                return
+            self._sync_pending = True
+        self._executor.submit(self._sync_quietly)
+
+    def _sync_quietly(self):
+        try:
+            self.sync_time()
+        except Exception as e:
+            self._sync_pending = False
+            logger.warning(f"Falha ao sincronizar relógio com a exchange: {e}")
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
+
+    # -------------------------
+    # Requisições
+    # -------------------------
+    def _call(self, method: str, path: str, body: str = None):
+        response = self.session.request(method, self.base_url + path, data=body, timeout=self.timeout)
+        try:
+            payload = response.json()
+        except ValueError:
+            # Erros de gateway/WAF (429, 418, 5xx) podem vir em HTML ou texto puro
+            raise BinanceAPIError(response.status_code, None,
+                                  f"resposta não é JSON: {response.text[:200]!r}")
+        if response.status_code >= 400:
+            if isinstance(payload, dict):
+                raise BinanceAPIError(response.status_code, payload.get('code'), payload.get('msg'))
+            raise BinanceAPIError(response.status_code, None, str(payload)[:200])
+        return payload
+
+    def tick_size(self, symbol: str) -> float:
+        """Tick de preço do símbolo (PRICE_FILTER do exchangeInfo), em cache."""
+        rule = self._ticks.get(symbol)
+        if rule is None:
+            info = self._call('GET', f'/api/v3/exchangeInfo?{urlencode({"symbol": symbol})}')
+            try:
+                filters = info['symbols'][0]['filters']
+                tick = next(f['tickSize'] for f in filters if f['filterType'] == 'PRICE_FILTER')
+            except (KeyError, IndexError, StopIteration):
+                raise BinanceAPIError(200, None, f"exchangeInfo sem PRICE_FILTER para {symbol}.")
+            rule = self._ticks[symbol] = _tick_rule(tick)
+        return rule[0]
+
+    def _price(self, symbol: str, price: float) -> float:
+        """Preço arredondado para o múltiplo do tick mais próximo."""
+        self.tick_size(symbol)
+        tick, decimals = self._ticks[symbol]
+        return round(round(price / tick) * tick, decimals)
+
+    def _template(self, path: str, **fixed):
+        """Prefixo urlencoded dos campos fixos de um tipo de ordem (montado uma vez)."""
+        key = (path, tuple(sorted(fixed.items())))
+        prefix = self._templates.get(key)
+        if prefix is None:
+            prefix = self._templates[key] = urlencode(fixed) + f'&recvWindow={self.recv_window}'
+        return prefix
+
+    def _sign(self, payload: str) -> str:
+        mac = self._mac.copy()
+        mac.update(payload.encode('ascii'))
+        return mac.hexdigest()
+
+    def _signed(self, method: str, path: str, prefix: str, fields: dict, op: str, symbol: str):
+        """Envia uma requisição assinada e registra o tempo até o ack."""
+        variable = urlencode(fields)
+        for attempt in (0, 1):
+            build_start = time.perf_counter()
+            payload = (f"{prefix}&{variable}" if variable else prefix) + \
+                f"&timestamp={int(time.time() * 1000 + self.time_offset_ms)}"
+            body = f"{payload}&signature={self._sign(payload)}"
+            sent = time.perf_counter()
+            try:
+                result = self._call(method, path, body)
+            except BinanceAPIError as e:
+                self._record(op, symbol, build_start, sent, e.code)
+                if e.code == -1021 and attempt == 0:
+                    logger.warning("Timestamp fora do recvWindow; sincronizando relógio e reenviando.")
+                    self.sync_time()
+                    continue
+                raise
+            self._record(op, symbol, build_start, sent, 'ok')
+            self._refresh_time_later()
+            return result
+
+    def _record(self, op: str, symbol: str, build_start: float, sent: float, status):
+        self.acks.append({'op': op, 'symbol': symbol, 'status': status,
+                          'build_us': (sent - build_start) * 1e6,
+                          'ack_ms': (time.perf_counter() - sent) * 1000})
+
+    # -------------------------
+    # Ordens
+    # -------------------------
+    def market_order(self, symbol: str, side: str, quantity: float) -> dict:
+        """Ordem a mercado com resposta FULL (fills para o livro de posições)."""
+        prefix = self._template('/api/v3/order', symbol=symbol, side=side, type='MARKET',
+                                newOrderRespType='FULL')
+        return self._signed('POST', '/api/v3/order', prefix, {'quantity': _format(quantity)},
+                            f'market_{side.lower()}', symbol)
+
+    def _protection_prices(self, symbol: str, price: float, take_profit_multiplier: float,
+                           stop_loss_multiplier: float):
+        """(take profit, stop, stop limit), como TradingBot.place_risk_management_order."""
+        stop = self._price(symbol, price * stop_loss_multiplier)
+        return (self._price(symbol, price * take_profit_multiplier), stop,
+                self._price(symbol, stop * 0.995))
+
+    def oco_sell(self, symbol: str, quantity: float, price: float, take_profit_multiplier: float = 1.02,
+                 stop_loss_multiplier: float = 0.98) -> dict:
+        """OCO de venda (take profit LIMIT_MAKER + STOP_LOSS_LIMIT) em torno de `price`."""
+        take_profit, stop, stop_limit = self._protection_prices(symbol, price, take_profit_multiplier,
+                                                                stop_loss_multiplier)
+        prefix = self._template('/api/v3/orderList/oco', symbol=symbol, side='SELL', aboveType='LIMIT_MAKER',
+                                belowType='STOP_LOSS_LIMIT', belowTimeInForce='GTC')
+        return self._signed('POST', '/api/v3/orderList/oco', prefix,
+                            {'quantity': _format(quantity), 'abovePrice': _format(take_profit),
+                             'belowStopPrice': _format(stop), 'belowPrice': _format(stop_limit)},
+                            'oco_sell', symbol)
+
+    def otoco_buy(self, symbol: str, quantity: float, reference_price: float,
+                  take_profit_multiplier: float = 1.02, stop_loss_multiplier: float = 0.98) -> dict:
+        """
+        Compra LIMIT FOK a reference_price * (1 + max_slippage) com OCO de venda
+        pendente, numa única requisição. Os preços de proteção usam o preço de referência.
+        """
+        limit = self._price(symbol, reference_price * (1 + self.max_slippage))
+        take_profit, stop, stop_limit = self._protection_prices(symbol, reference_price,
+                                                                take_profit_multiplier, stop_loss_multiplier)
+        prefix = self._template('/api/v3/orderList/otoco', symbol=symbol, workingType='LIMIT',
+                                workingSide='BUY', workingTimeInForce='FOK', pendingSide='SELL',
+                                pendingAboveType='LIMIT_MAKER', pendingBelowType='STOP_LOSS_LIMIT',
+                                pendingBelowTimeInForce='GTC')
+        quantity = _format(quantity)
+        return self._signed('POST', '/api/v3/orderList/otoco', prefix,
+                            {'workingPrice': _format(limit), 'workingQuantity': quantity,
+                             'pendingQuantity': quantity, 'pendingAbovePrice': _format(take_profit),
+                             'pendingBelowStopPrice': _format(stop), 'pendingBelowPrice': _format(stop_limit)},
+                            'otoco_buy', symbol)
+
+    def cancel_open_orders(self, symbol: str):
+        """Cancela todas as ordens abertas do símbolo numa requisição (inclui OCOs)."""
+        prefix = self._template('/api/v3/openOrders', symbol=symbol)
+        try:
+            return self._signed('DELETE', '/api/v3/openOrders', prefix, {}, 'cancel_all', symbol)
+        except BinanceAPIError as e:
+            if e.code == -2011:      # Nenhuma ordem aberta
+                return []
+            raise
+
+    def buy(self, symbol: str, quantity: float, reference_price: float, protect: bool = True,
+            take_profit_multiplier: float = 1.02, stop_loss_multiplier: float = 0.98) -> dict:
+        """
+        Compra com (ou sem) proteção no modo configurado. Retorna
+        {'order': ordem de compra (symbol, side, executedQty, fills...), 'protection': lista OCO/OTOCO ou None,
+         'protection_error': exceção da OCO ou None}.
+        executedQty == 0 indica compra FOK não executada (preço andou além de max_slippage).
+        No modo 'sequential' a compra já executou quando a OCO é enviada: uma falha da
+        OCO não levanta exceção (a compra precisa ser registrada) e vai em protection_error.
+        """
+        if not protect:
+            return {'order': self.market_order(symbol, 'BUY', quantity), 'protection': None,
+                    'protection_error': None}
+        if self.mode == 'otoco':
+            result = self.otoco_buy(symbol, quantity, reference_price, take_profit_multiplier,
+                                    stop_loss_multiplier)
+            working = next((r for r in result.get('orderReports', ()) if r.get('side') == 'BUY'), {})
+            return {'order': {'symbol': symbol, 'side': 'BUY', 'executedQty': '0', **working},
+                    'protection': result, 'protection_error': None}
+        order = self.market_order(symbol, 'BUY', quantity)
+        executed = float(order.get('executedQty') or 0.0)
+        quote = float(order.get('cummulativeQuoteQty') or 0.0)
+        price = quote / executed if executed and quote else reference_price
+        try:
+            protection = self.oco_sell(symbol, quantity, price, take_profit_multiplier, stop_loss_multiplier)
+        except Exception as e:
+            logger.error(f"Compra de {symbol} executada, mas a OCO de proteção falhou: {e}")
+            return {'order': order, 'protection': None, 'protection_error': e}
+        return {'order': order, 'protection': protection, 'protection_error': None}
+
+    # -------------------------
+    # Medições
+    # -------------------------
+    def latency_report(self) -> dict:
+        """Por tipo de requisição: quantidade, erros, p50/p90/p99/máximo do ack (ms) e montagem (µs)."""
+        report = {}
+        for op in sorted({a['op'] for a in self.acks}):
+            acks = [a for a in self.acks if a['op'] == op]
+            ack = np.array([a['ack_ms'] for a in acks])
+            p50, p90, p99, top = np.percentile(ack, [50, 90, 99, 100])
+            report[op] = {'count': len(acks), 'errors': sum(a['status'] != 'ok' for a in acks),
+                          'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': top,
+                          'build_us': float(np.median([a['build_us'] for a in acks]))}
+        return report
+
+
+# =============================================================================
+# Exchange simulada (HTTP local) para medir o tempo até o ack
+# =============================================================================
+class MockExchange:
+    """
+    Servidor HTTP/1.1 keep-alive com os endpoints de ordem da API Spot (e o
+    exchangeInfo). Confere chave, assinatura HMAC, recvWindow e o tick dos preços; ordens são executadas
+    inteiras ao preço `price`. Conta as conexões TCP abertas pelos clientes.
+    """
+    def __init__(self, api_key: str = 'mock-key', api_secret: str = 'mock-secret', price: float = 30_000.0,
+                 latency_ms: float = 0.0, clock_skew_ms: float = 0.0, tick_size: str = '0.01000000',
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        :param price: Preço de execução das ordens.
+        :param tick_size: tickSize do PRICE_FILTER de todos os símbolos; preços fora do tick são recusados.
+        :param latency_ms: Atraso artificial de cada resposta (rede + motor de casamento).
+        :param clock_skew_ms: Relógio do servidor adiantado em relação ao local.
+        :param port: Porta HTTP (0 = livre).
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret.encode('utf-8')
+        self.price = price
+        self.latency_ms = latency_ms
+        self.clock_skew_ms = clock_skew_ms
+        self.tick_size = tick_size
+        self.outage = None          # (status, texto): responde assim, sem JSON (erro de gateway)
+        self.reject_oco = None      # (status, código, mensagem): recusa as OCOs de venda
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.requests = 0
+        self.orders = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}'
+
+    def server_time(self) -> int:
+        return int(time.time() * 1000 + self.clock_skew_ms)
+
+    # -------------------------
+    # Respostas
+    # -------------------------
+    def _check(self, headers, body: str):
+        if headers.get('X-MBX-APIKEY') != self.api_key:
+            return 401, {'code': -2014, 'msg': 'API-key format invalid.'}
+        payload, _, signature = body.rpartition('&signature=')
+        expected = hmac.new(self.api_secret, payload.encode('utf-8'), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            return 400, {'code': -1022, 'msg': 'Signature for this request is not valid.'}
+        params = dict(parse_qsl(payload))
+        if abs(self.server_time() - int(params.get('timestamp', 0))) > int(params.get('recvWindow', 5000)):
+            return 400, {'code': -1021, 'msg': "Timestamp for this request is outside of the recvWindow."}
+        return None, params
+
+    def _fill(self, symbol: str, side: str, quantity: float, type_: str = 'MARKET', limit: float = None):
+        with self._lock:
+            order_id, self._next_id = self._next_id, self._next_id + 1
+        price = self.price
+        filled = limit is None or (price <= limit if side == 'BUY' else price >= limit)
+        executed = quantity if filled else 0.0
+        order = {'symbol': symbol, 'orderId': order_id, 'side': side, 'type': type_,
+                 'status': 'FILLED' if filled else 'EXPIRED', 'transactTime': self.server_time(),
+                 'origQty': _format(quantity), 'executedQty': _format(executed),
+                 'cummulativeQuoteQty': _format(executed * price),
+                 'fills': [{'price': _format(price), 'qty': _format(executed), 'commission': '0',
+                            'commissionAsset': 'USDT', 'tradeId': order_id}] if filled else []}
+        self.orders.append(order)
+        return order
+
+    def _pending(self, symbol: str, side: str, quantity: float, type_: str, price: float, status: str = 'NEW'):
+        with self._lock:
+            order_id, self._next_id = self._next_id, self._next_id + 1
+        order = {'symbol': symbol, 'orderId': order_id, 'side': side, 'type': type_, 'status': status,
+                 'price': _format(price), 'origQty': _format(quantity), 'executedQty': '0'}
+        self.orders.append(order)
+        return order
+
+    def _exchange_info(self, symbol: str) -> dict:
+        return {'timezone': 'UTC', 'serverTime': self.server_time(),
+                'symbols': [{'symbol': symbol, 'status': 'TRADING', 'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': self.tick_size,
+                     'maxPrice': '1000000.00000000', 'tickSize': self.tick_size},
+                    {'filterType': 'LOT_SIZE', 'minQty': '0.00001000', 'maxQty': '9000.00000000',
+                     'stepSize': '0.00001000'}]}]}
+
+    def _off_tick(self, params: dict) -> bool:
+        """Algum preço da ordem fora do múltiplo do tick (PRICE_FILTER)."""
+        tick = float(self.tick_size)
+        for key, value in params.items():
+            if key.lower().endswith('price'):
+                steps = float(value) / tick
+                if abs(steps - round(steps)) > 1e-6:
+                    return True
+        return False
+
+    def handle(self, method: str, path: str, headers, body: str):
+        """(status, payload) de uma requisição."""
+        if path == '/api/v3/ping':
+            return 200, {}
+        if path == '/api/v3/time':
+            return 200, {'serverTime': self.server_time()}
+        if path == '/api/v3/exchangeInfo':
+            return 200, self._exchange_info(dict(parse_qsl(body)).get('symbol', 'BTCUSDT'))
+        status, params = self._check(headers, body)
+        if status is not None:
+            return status, params
+        if self._off_tick(params):
+            return 400, {'code': -1013, 'msg': 'Filter failure: PRICE_FILTER'}
+        symbol, quantity = params.get('symbol'), float(params.get('quantity', 0) or 0)
+        if method == 'POST' and path == '/api/v3/order':
+            return 200, self._fill(symbol, params['side'], quantity, params.get('type', 'MARKET'))
+        if method == 'POST' and path in ('/api/v3/orderList/oco', '/api/v3/order/oco'):
+            if self.reject_oco is not None:
+                status, code, msg = self.reject_oco
+                return status, {'code': code, 'msg': msg}
+            above = float(params.get('abovePrice') or params.get('price'))
+            below = float(params.get('belowStopPrice') or params.get('stopPrice'))
+            reports = [self._pending(symbol, 'SELL', quantity, 'STOP_LOSS_LIMIT', below),
+                       self._pending(symbol, 'SELL', quantity, 'LIMIT_MAKER', above)]
+            return 200, {'orderListId': reports[0]['orderId'], 'contingencyType': 'OCO',
+                         'listOrderStatus': 'EXECUTING', 'symbol': symbol, 'orderReports': reports}
+        if method == 'POST' and path == '/api/v3/orderList/otoco':
+            quantity = float(params['workingQuantity'])
+            working = self._fill(symbol, 'BUY', quantity, 'LIMIT', float(params['workingPrice']))
+            active = working['status'] == 'FILLED'
+            reports = [working] + [
+                self._pending(symbol, 'SELL', float(params['pendingQuantity']), type_, float(params[field]),
+                              'NEW' if active else 'EXPIRED')
+                for type_, field in (('STOP_LOSS_LIMIT', 'pendingBelowStopPrice'),
+                                     ('LIMIT_MAKER', 'pendingAbovePrice'))]
+            return 200, {'orderListId': working['orderId'], 'contingencyType': 'OTO',
+                         'listOrderStatus': 'EXECUTING' if active else 'ALL_DONE', 'symbol': symbol,
+                         'orderReports': reports}
+        if method == 'DELETE' and path == '/api/v3/openOrders':
+            cancelled = [o for o in self.orders if o['symbol'] == symbol and o['status'] == 'NEW']
+            if not cancelled:
+                return 400, {'code': -2011, 'msg': 'Unknown order sent.'}
+            for order in cancelled:
+                order['status'] = 'CANCELED'
+            return 200, cancelled
+        return 404, {'code': -1100, 'msg': f'Endpoint desconhecido: {method} {path}'}
+
+    def _handler(self):
+        exchange = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'        # Keep-alive
+            disable_nagle_algorithm = True
+
+            def log_message(self, fmt, *args):
+                logger.debug(fmt % args)
+
+            def setup(self):
+                super().setup()
+                with exchange._lock:
+                    exchange.connections += 1
+
+            def _dispatch(self, method: str):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8') if length else ''
+                url = urlparse(self.path)
+                if url.query:
+                    body = f"{url.query}&{body}" if body else url.query
+                with exchange._lock:
+                    exchange.requests += 1
+                if exchange.latency_ms:
+                    time.sleep(exchange.latency_ms / 1000)
+                if exchange.outage is not None:
+                    status, text = exchange.outage
+                    data, content_type = text.encode('utf-8'), 'text/html'
+                else:
+                    status, payload = exchange.handle(method, url.path, self.headers, body)
+                    data, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._dispatch('GET')
+
+            def do_POST(self):
+                self._dispatch('POST')
+
+            def do_DELETE(self):
+                self._dispatch('DELETE')
+
+        return Handler
+
+    def start(self):
+        """Sobe o servidor numa thread daemon e retorna imediatamente."""
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='MockExchange', daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Tempo até o ack: python-binance x FastOrderClient '
+                                                 '(contra a MockExchange local).')
+    parser.add_argument('--orders', type=int, default=200, help='Compras protegidas por caminho')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Atraso artificial do servidor')
+    parser.add_argument('--skew-ms', type=float, default=800.0, help='Relógio do servidor adiantado')
+    args = parser.parse_args()
+
+    exchange = MockExchange(latency_ms=args.latency_ms, clock_skew_ms=args.skew_ms).start()
+
+    def summary(name: str, totals, connections: int):
+        ms = np.asarray(totals) * 1000
+        p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+        print(f"{name:<28} compra+proteção p50 {p50:7.2f} ms  p90 {p90:7.2f}  p99 {p99:7.2f}  "
+              f"conexões novas: {connections}")
+
+    # python-binance, como TradingBot._execute_signals: order_market_buy + order_oco_sell
+    from binance.client import Client
+    client = Client(exchange.api_key, exchange.api_secret.decode(), ping=False)
+    client.API_URL = exchange.url + '/api'
+    client.timestamp_offset = exchange.clock_skew_ms
+    before, totals = exchange.connections, []
+    for _ in range(args.orders):
+        start = time.perf_counter()
+        client.order_market_buy(symbol='BTCUSDT', quantity=0.001)
+        client.order_oco_sell(symbol='BTCUSDT', quantity=0.001, price='30600.00', stopPrice='29400.00',
+                              stopLimitPrice='29253.00', stopLimitTimeInForce='GTC')
+        totals.append(time.perf_counter() - start)
+    summary('python-binance', totals, exchange.connections - before)
+
+    for mode in ('sequential', 'otoco'):
+        fast = FastOrderClient(exchange.api_key, exchange.api_secret.decode(), base_url=exchange.url,
+                               mode=mode).warm(symbols=['BTCUSDT'])
+        before, totals = exchange.connections, []
+        for _ in range(args.orders):
+            start = time.perf_counter()
+            fast.buy('BTCUSDT', 0.001, reference_price=exchange.price)
+            totals.append(time.perf_counter() - start)
+        summary(f'FastOrderClient ({mode})', totals, exchange.connections - before)
+        for op, stats in fast.latency_report().items():
+            print(f"    {op:<12} n={stats['count']:<5} ack p50 {stats['p50_ms']:.2f} ms  "
+                  f"p99 {stats['p99_ms']:.2f} ms  montagem {stats['build_us']:.1f} µs")
+        fast.close()
+    exchange.stop()
@@ -0,0 +1,230 @@
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger('TradingBot.Features')
+
+# =============================================================================
+# Matriz de features para modelos de ML (janelas por stride, em blocos)
+# -----------------------------------------------------------------------------
+# Todas as features do candle t dependem apenas dos últimos `warmup` candles
+# (janelas finitas; por isso o RSI é o de Cutler, com médias simples em vez de
+# exponenciais). Com isso:
+#   - o histórico é processado em blocos de `chunk_rows` candles, cada um lido
+#     com `warmup - 1` candles de sobreposição: a memória fica limitada pelo
+#     bloco, não pelo tamanho do histórico, e o resultado é idêntico ao de
+#     processar tudo de uma vez;
+#   - o candle ao vivo usa exatamente a mesma função sobre os últimos `warmup`
+#     candles (latest), então treino e operação veem as mesmas features.
+# As janelas são views de sliding_window_view (sem copiar os dados) e a saída
+# é float32, pronta para treino (pode ser um np.memmap para anos de dados).
+# =============================================================================
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _last(values: np.ndarray, rows: int) -> np.ndarray:
+    return values[values.shape[0] - rows:]
+
+
+def _safe_div(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = num / den
+    out[~np.isfinite(out)] = 0.0
+    return out
+
+
+def cutler_rsi(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    RSI de Cutler: médias simples de ganhos e perdas nos últimos `period` candles.
+    Os primeiros `period` valores ficam NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if len(close) <= period:
+        return out
+    delta = np.diff(close)
+    gains = sliding_window_view(np.clip(delta, 0, None), period).sum(axis=-1)
+    losses = sliding_window_view(-np.clip(delta, None, 0), period).sum(axis=-1)
+    out[period:] = 100 - 100 / (1 + gains / (losses + 1e-10))
+    return out
+
+
+class FeaturePipeline:
+    """
+    Gera a matriz de features (candles x features) a partir dos arrays OHLCV:
+    retornos defasados, indicadores e estatísticas por janela.
+    """
+    def __init__(self, return_lags: int = 5, windows=(10, 20, 50), rsi_period: int = 14,
+                 dtype=np.float32):
+        """
+        :param return_lags: Retornos logarítmicos de 1 candle defasados (t, t-1, ...).
+        :param windows: Janelas das estatísticas móveis (média, volatilidade, z-score, ...).
+        :param rsi_period: Período do RSI de Cutler.
+        :param dtype: Tipo da matriz de saída.
+        """
+        self.return_lags = return_lags
+        self.windows = tuple(windows)
+        self.rsi_period = rsi_period
+        self.dtype = dtype
+        self.names = self._feature_names()
+        # Candles necessários para a primeira linha completa
+        self.warmup = max(max(self.windows, default=1) + 1, return_lags + 1, rsi_period + 1)
+
+    def _feature_names(self):
+        names = [f'ret_{lag}' for lag in range(self.return_lags)]
+        names += [f'rsi_{self.rsi_period}', 'hl_range', 'body']
+        for w in self.windows:
+            names += [f'close_sma_{w}', f'vol_{w}', f'zscore_{w}', f'range_pos_{w}', f'volume_z_{w}']
+        return names
+
+    @property
+    def n_features(self) -> int:
+        return len(self.names)
+
+    # -------------------------
+    # Núcleo (mesmo caminho para blocos e candle ao vivo)
+    # -------------------------
+    def _compute(self, open_, high, low, close, volume, out: np.ndarray):
+        """
+        Preenche `out` (linhas x features) com as features dos últimos `len(out)`
+        candles. Os arrays de entrada têm `len(out) + warmup - 1` candles.
+        """
+        rows = out.shape[0]
+        log_close = np.log(close)
+        returns = np.diff(log_close)    # returns[i] = retorno do candle i + 1
+        col = 0
+
+        # Retornos defasados: view (rows x lags) invertida para ret_0 = mais recente
+        lags = sliding_window_view(returns, self.return_lags)[:, ::-1]
+        out[:, col:col + self.return_lags] = _last(lags, rows)
+        col += self.return_lags
+
+        delta = np.diff(close)
+        gains = sliding_window_view(np.clip(delta, 0, None), self.rsi_period).sum(axis=-1)
+        losses = sliding_window_view(-np.clip(delta, None, 0), self.rsi_period).sum(axis=-1)
+        out[:, col] = 100 - 100 / (1 + _last(gains, rows) / (_last(losses, rows) + 1e-10))
+        c, h, l, o = _last(close, rows), _last(high, rows), _last(low, rows), _last(open_, rows)
+        out[:, col + 1] = _safe_div(h - l, c)
+        out[:, col + 2] = _safe_div(c - o, o)
+        col += 3
+
+        for w in self.windows:
+            closes = _last(sliding_window_view(close, w), rows)
+            mean = closes.mean(axis=-1)
+            std = closes.std(axis=-1)
+            vol = _last(sliding_window_view(returns, w), rows).std(axis=-1)
+            lowest = _last(sliding_window_view(low, w), rows).min(axis=-1)
+            highest = _last(sliding_window_view(high, w), rows).max(axis=-1)
+            volumes = _last(sliding_window_view(volume, w), rows)
+            v = _last(volume, rows)
+            out[:, col] = _safe_div(c, mean) - 1
+            out[:, col + 1] = vol
+            out[:, col + 2] = _safe_div(c - mean, std)
+            out[:, col + 3] = _safe_div(c - lowest, highest - lowest)
+            out[:, col + 4] = _safe_div(v - volumes.mean(axis=-1), volumes.std(axis=-1))
+            col += 5
+
+    @staticmethod
+    def _arrays(data):
+        """Aceita DataFrame (get_historical_data), dict de arrays ou CandleWindow."""
+        return [np.asarray(getattr(data, name) if hasattr(data, 'append_klines') else data[name],
+                           dtype=np.float64) for name in COLUMNS]
+
+    # -------------------------
+    # Histórico em blocos
+    # -------------------------
+    def iter_chunks(self, data, chunk_rows: int = 50_000):
+        """
+        Gera (início, bloco) com as features dos candles [início, início + len(bloco)).
+        Cada bloco usa memória proporcional a chunk_rows * max(windows).
+        """
+        arrays = self._arrays(data)
+        total = len(arrays[3])
+        start = self.warmup - 1
+        while start < total:
+            end = min(total, start + chunk_rows)
+            block = np.empty((end - start, self.n_features), dtype=self.dtype)
+            self._compute(*(a[start - self.warmup + 1:end] for a in arrays), out=block)
+            yield start, block
+            start = end
+
+    def transform(self, data, out: np.ndarray = None, chunk_rows: int = 50_000) -> np.ndarray:
+        """
+        Matriz (candles x features) alinhada aos candles de entrada; as primeiras
+        `warmup - 1` linhas ficam NaN.
+        :param out: Matriz de saída pré-alocada (ex: np.lib.format.open_memmap).
+        """
+        total = len(self._arrays(data)[3]) if out is None else out.shape[0]
+        if out is None:
+            out = np.empty((total, self.n_features), dtype=self.dtype)
+        out[:min(self.warmup - 1, total)] = np.nan
+        for start, block in self.iter_chunks(data, chunk_rows):
+            out[start:start + len(block)] = block
+        return out
+
+    # -------------------------
+    # Candle ao vivo
+    # -------------------------
+    def latest(self, data) -> np.ndarray:
+        """
+        Features do último candle de `data` (ex: bot.window), com o mesmo cálculo
+        usado no histórico. Retorna None se ainda não há `warmup` candles.
+        """
+        arrays = self._arrays(data)
+        if len(arrays[3]) < self.warmup:
+            return None
+        row = np.empty((1, self.n_features), dtype=self.dtype)
+        self._compute(*(a[-self.warmup:] for a in arrays), out=row)
+        return row[0]
+
+
+# =============================================================================
+# Leitura de candles e CLI
+# =============================================================================
+def load_klines_csv(path: str) -> dict:
+    """
+    Lê um CSV de klines da Binance (data.binance.vision: open_time, open, high,
+    low, close, volume, ...), com ou sem cabeçalho.
+    """
+    with open(path) as f:
+        has_header = not f.readline().split(',')[0].strip().isdigit()
+    raw = np.loadtxt(path, delimiter=',', usecols=range(6), skiprows=int(has_header), ndmin=2)
+    return {'open_time': raw[:, 0], 'open': raw[:, 1], 'high': raw[:, 2], 'low': raw[:, 3],
+            'close': raw[:, 4], 'volume': raw[:, 5]}
+
+
+def synthetic_candles(n: int, seed: int = 0) -> dict:
+    """Candles sintéticos (passeio aleatório) para testes e benchmark."""
+    rng = np.random.default_rng(seed)
+    close = 30_000 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    spread = np.abs(rng.normal(0, 0.0008, n)) * close
+    return {'open_time': np.arange(n, dtype=np.float64) * 60_000, 'open': open_,
+            'high': np.maximum(open_, close) + spread, 'low': np.minimum(open_, close) - spread,
+            'close': close, 'volume': rng.lognormal(3, 1, n)}
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Gera a matriz de features (float32) para treino.')
+    parser.add_argument('klines', nargs='?', help='CSV de klines (padrão: candles sintéticos)')
+    parser.add_argument('--out', default='features.npy', help='Arquivo .npy de saída (memmap)')
+    parser.add_argument('--candles', type=int, default=1_000_000, help='Candles sintéticos')
+    parser.add_argument('--chunk', type=int, default=50_000)
+    args = parser.parse_args()
+
+    data = load_klines_csv(args.klines) if args.klines else synthetic_candles(args.candles)
+    pipeline = FeaturePipeline()
+    total = len(data['close'])
+    out = np.lib.format.open_memmap(args.out, mode='w+', dtype=pipeline.dtype,
+                                    shape=(total, pipeline.n_features))
+    t0 = time.perf_counter()
+    pipeline.transform(data, out=out, chunk_rows=args.chunk)
+    out.flush()
+    elapsed = time.perf_counter() - t0
+    print(f"{total} candles x {pipeline.n_features} features em {elapsed:.2f}s "
+          f"({total / elapsed:,.0f} candles/s) -> {args.out}")
+    print(', '.join(pipeline.names))
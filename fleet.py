@@ -0,0 +1,402 @@
+import heapq
+import logging
+import multiprocessing as mp
+import os
+import pickle
+import queue
+import time
+
+logger = logging.getLogger('TradingBot.Fleet')
+
+# =============================================================================
+# Frota de bots em vários processos
+# -----------------------------------------------------------------------------
+# O supervisor divide a lista de símbolos entre processos (um por núcleo).
+# Cada worker cria os próprios bots (com caches e client próprios), executa
+# um passo de cada bot por candle e envia ao supervisor um heartbeat com o
+# tempo de CPU gasto por símbolo. O supervisor:
+#   - reinicia workers que morreram ou pararam de responder; os bots voltam
+#     do último estado salvo (get_state/set_state, um arquivo por símbolo);
+#   - redistribui os símbolos quando a carga medida fica desequilibrada
+#     (LPT: símbolos mais caros primeiro, cada um no worker menos carregado);
+#   - concentra saúde e métricas de todos os workers em health().
+# =============================================================================
+
+
+def assign_shards(symbols, workers: int, costs: dict = None):
+    """
+    Distribui os símbolos entre `workers` grupos equilibrando o custo (LPT).
+    Símbolos sem custo medido recebem a média dos medidos (ou 1).
+    """
+    costs = costs or {}
+    known = [costs[s] for s in symbols if s in costs]
+    default = sum(known) / len(known) if known else 1.0
+    ordered = sorted(symbols, key=lambda s: (-costs.get(s, default), s))
+    heap = [(0.0, i) for i in range(workers)]
+    shards = [[] for _ in range(workers)]
+    for symbol in ordered:
+        load, i = heapq.heappop(heap)
+        shards[i].append(symbol)
+        heapq.heappush(heap, (load + costs.get(symbol, default), i))
+    return shards
+
+
+def shard_loads(shards, costs: dict):
+    return [sum(costs.get(s, 0.0) for s in shard) for shard in shards]
+
+
+# =============================================================================
+# Worker
+# =============================================================================
+def _state_path(state_dir: str, symbol: str) -> str:
+    return os.path.join(state_dir, f"{symbol}.pkl")
+
+
+def save_bot_state(state_dir: str, symbol: str, bot):
+    if not hasattr(bot, 'get_state'):
+        return
+    path = _state_path(state_dir, symbol)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        pickle.dump(bot.get_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_bot_state(state_dir: str, symbol: str, bot) -> bool:
+    path = _state_path(state_dir, symbol)
+    if not hasattr(bot, 'set_state') or not os.path.exists(path):
+        return False
+    try:
+        with open(path, 'rb') as f:
+            bot.set_state(pickle.load(f))
+        return True
+    except Exception as e:
+        logger.warning(f"Estado de {symbol} ilegível ({e}); começando do zero.")
+        return False
+
+
+def default_step(bot):
+    bot.execute_trade()
+
+
+def _worker_main(worker_id: int, symbols, make_bot, step, state_dir: str, period_s: float,
+                 results, commands, cpu_alpha: float = 0.3):
+    """
+    Loop do processo worker: a cada período executa um passo de cada bot,
+    salva o estado e envia o heartbeat com as métricas.
+    """
+    context = {'worker_id': worker_id}   # Cache compartilhado pelos bots deste worker
+    bots, cpu, errors, restored = {}, {}, {}, 0
+    for symbol in symbols:
+        try:
+            bot = make_bot(symbol, context)
+        except Exception as e:
+            logger.exception(f"Worker {worker_id}: erro ao criar o bot de {symbol}: {e}")
+            errors[symbol] = errors.get(symbol, 0) + 1
+            continue
+        restored += load_bot_state(state_dir, symbol, bot)
+        bots[symbol] = bot
+    logger.info(f"Worker {worker_id} (pid {os.getpid()}): {len(bots)} bots, {restored} restaurados.")
+
+    iterations = 0
+    while True:
+        started = time.monotonic()
+        for symbol, bot in bots.items():
+            cpu_start = time.process_time()
+            try:
+                step(bot)
+            except Exception as e:
+                errors[symbol] = errors.get(symbol, 0) + 1
+                logger.exception(f"Worker {worker_id}: erro no passo de {symbol}: {e}")
+            spent = time.process_time() - cpu_start
+            cpu[symbol] = spent if symbol not in cpu else (1 - cpu_alpha) * cpu[symbol] + cpu_alpha * spent
+            try:
+                save_bot_state(state_dir, symbol, bot)
+            except Exception as e:
+                logger.error(f"Worker {worker_id}: erro ao salvar o estado de {symbol}: {e}")
+        iterations += 1
+        elapsed = time.monotonic() - started
+        results.put({'worker': worker_id, 'pid': os.getpid(), 'time': time.time(),
+                     'iterations': iterations, 'iteration_s': elapsed, 'cpu': dict(cpu),
+                     'errors': dict(errors), 'symbols': list(bots)})
+
+        # Espera o próximo período, atento a comandos do supervisor
+        deadline = started + period_s
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                command = commands.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if command == 'stop':
+                logger.info(f"Worker {worker_id}: encerrando.")
+                return
+
+
+# =============================================================================
+# Supervisor
+# =============================================================================
+class _WorkerHandle:
+    __slots__ = ('worker_id', 'symbols', 'process', 'commands', 'started_at', 'restarts',
+                 'last_heartbeat', 'metrics', 'next_restart_at', 'backoff_s')
+
+    def __init__(self, worker_id, symbols):
+        self.worker_id = worker_id
+        self.symbols = symbols
+        self.process = None
+        self.commands = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.last_heartbeat = None
+        self.metrics = {}
+        self.next_restart_at = 0.0
+        self.backoff_s = 1.0
+
+
+class FleetSupervisor:
+    """
+    Executa make_bot(symbol, context) para cada símbolo em processos
+    separados e mantém a frota saudável.
+    """
+    def __init__(self, symbols, make_bot, workers: int = None, step=default_step, period_s: float = 60.0,
+                 state_dir: str = '.fleet_state', heartbeat_timeout: float = None,
+                 rebalance_every: float = 3600.0, imbalance_threshold: float = 1.25):
+        """
+        :param symbols: Símbolos operados pela frota.
+        :param make_bot: Função de módulo (precisa ser importável pelo processo filho)
+                         que recebe (symbol, context) e retorna o bot. `context` é
+                         um dict por worker, para caches/clients compartilhados.
+        :param workers: Número de processos (padrão: núcleos da máquina).
+        :param step: Função de módulo que executa um passo do bot (padrão: execute_trade).
+        :param period_s: Intervalo entre passos (duração do candle).
+        :param state_dir: Pasta do estado salvo de cada bot.
+        :param heartbeat_timeout: Segundos sem heartbeat para considerar o worker travado
+                                  (padrão: 3 períodos).
+        :param rebalance_every: Intervalo mínimo entre redistribuições, em segundos.
+        :param imbalance_threshold: Redistribui se (carga máxima / carga média) passar disto.
+        """
+        self.symbols = list(symbols)
+        self.make_bot = make_bot
+        self.step = step
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.symbols)))
+        self.period_s = period_s
+        self.state_dir = state_dir
+        self.heartbeat_timeout = heartbeat_timeout or 3 * period_s + 30
+        self.rebalance_every = rebalance_every
+        self.imbalance_threshold = imbalance_threshold
+        os.makedirs(state_dir, exist_ok=True)
+
+        self._ctx = mp.get_context('spawn')
+        self._results = self._ctx.Queue()
+        self._handles = [_WorkerHandle(i, shard) for i, shard in
+                         enumerate(assign_shards(self.symbols, self.workers))]
+        self._last_rebalance = time.monotonic()
+        self.rebalances = 0
+        self._running = False
+
+    # -------------------------
+    # Ciclo de vida dos workers
+    # -------------------------
+    def _spawn(self, handle: _WorkerHandle):
+        handle.commands = self._ctx.Queue()
+        handle.process = self._ctx.Process(
+            target=_worker_main, name=f"fleet-worker-{handle.worker_id}",
+            args=(handle.worker_id, handle.symbols, self.make_bot, self.step, self.state_dir,
+                  self.period_s, self._results, handle.commands), daemon=True)
+        handle.process.start()
+        handle.started_at = time.monotonic()
+        handle.last_heartbeat = None
+        logger.info(f"Worker {handle.worker_id} iniciado (pid {handle.process.pid}) com "
+                    f"{len(handle.symbols)} símbolos.")
+
+    def _stop_worker(self, handle: _WorkerHandle, timeout: float = 10.0):
+        if handle.process is None:
+            return
+        if handle.process.is_alive():
+            handle.commands.put('stop')
+            handle.process.join(timeout)
+            if handle.process.is_alive():
+                logger.warning(f"Worker {handle.worker_id} não encerrou; terminando o processo.")
+                handle.process.terminate()
+                handle.process.join(timeout)
+        handle.process = None
+
+    def start(self):
+        self._running = True
+        for handle in self._handles:
+            self._spawn(handle)
+
+    def stop(self):
+        """Encerra todos os workers (cada um salva o estado a cada passo)."""
+        self._running = False
+        for handle in self._handles:
+            self._stop_worker(handle)
+        self._drain_results()
+
+    # -------------------------
+    # Monitoramento
+    # -------------------------
+    def _drain_results(self):
+        while True:
+            try:
+                msg = self._results.get_nowait()
+            except queue.Empty:
+                return
+            handle = self._handles[msg['worker']]
+            if handle.process is not None and msg['pid'] != handle.process.pid:
+                continue    # Heartbeat atrasado de um processo que já foi substituído
+            handle.last_heartbeat = time.monotonic()
+            handle.metrics = msg
+            handle.backoff_s = 1.0
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for handle in self._handles:
+            if handle.process is None:
+                if now >= handle.next_restart_at:
+                    self._spawn(handle)
+                continue
+            alive = handle.process.is_alive()
+            reference = handle.last_heartbeat or handle.started_at
+            if alive and now - reference <= self.heartbeat_timeout:
+                continue
+            if alive:
+                logger.error(f"Worker {handle.worker_id} sem heartbeat há {now - reference:.0f}s; reiniciando.")
+                handle.process.terminate()
+                handle.process.join(5)
+            else:
+                logger.error(f"Worker {handle.worker_id} morreu (exit code {handle.process.exitcode}); "
+                             f"reiniciando a partir do último estado.")
+            handle.process = None
+            handle.restarts += 1
+            # Backoff exponencial para não entrar em laço de crash
+            handle.next_restart_at = now + handle.backoff_s
+            handle.backoff_s = min(handle.backoff_s * 2, 300.0)
+
+    def symbol_costs(self) -> dict:
+        """Tempo de CPU médio por passo de cada símbolo (último heartbeat de cada worker)."""
+        costs = {}
+        for handle in self._handles:
+            costs.update(handle.metrics.get('cpu', {}))
+        return costs
+
+    def maybe_rebalance(self, force: bool = False) -> bool:
+        """
+        Redistribui os símbolos se a carga medida estiver desequilibrada. Os
+        workers são reiniciados com os novos grupos e os bots retomam do
+        estado salvo.
+        """
+        if not force and time.monotonic() - self._last_rebalance < self.rebalance_every:
+            return False
+        costs = self.symbol_costs()
+        if len(costs) < len(self.symbols):
+            return False    # Ainda não há medida de todos os símbolos
+        current = shard_loads([h.symbols for h in self._handles], costs)
+        mean = sum(current) / len(current)
+        self._last_rebalance = time.monotonic()
+        if mean <= 0 or max(current) / mean <= self.imbalance_threshold:
+            return False
+
+        shards = assign_shards(self.symbols, self.workers, costs)
+        proposed = shard_loads(shards, costs)
+        if max(proposed) >= max(current) * 0.95:
+            return False    # Ganho pequeno demais para reiniciar workers
+        logger.info(f"Redistribuindo símbolos: carga máxima {max(current) * 1000:.1f}ms -> "
+                    f"{max(proposed) * 1000:.1f}ms por período.")
+        for handle in self._handles:
+            self._stop_worker(handle)
+        self._drain_results()
+        for handle, shard in zip(self._handles, shards):
+            handle.symbols = shard
+            handle.metrics = {}
+            self._spawn(handle)
+        self.rebalances += 1
+        return True
+
+    def health(self) -> dict:
+        """Saúde e métricas agregadas da frota."""
+        now = time.monotonic()
+        workers = []
+        for h in self._handles:
+            m = h.metrics
+            workers.append({
+                'worker': h.worker_id,
+                'pid': h.process.pid if h.process is not None else None,
+                'alive': h.process is not None and h.process.is_alive(),
+                'symbols': len(h.symbols),
+                'restarts': h.restarts,
+                'heartbeat_age_s': now - h.last_heartbeat if h.last_heartbeat else None,
+                'iterations': m.get('iterations', 0),
+                'iteration_s': m.get('iteration_s'),
+                'cpu_s': sum(m.get('cpu', {}).values()),
+                'errors': sum(m.get('errors', {}).values()),
+            })
+        return {
+            'workers': workers,
+            'alive': sum(w['alive'] for w in workers),
+            'symbols': len(self.symbols),
+            'restarts': sum(w['restarts'] for w in workers),
+            'errors': sum(w['errors'] for w in workers),
+            'cpu_s_per_period': sum(w['cpu_s'] for w in workers),
+            'max_iteration_s': max((w['iteration_s'] or 0.0 for w in workers), default=0.0),
+            'rebalances': self.rebalances,
+        }
+
+    def poll(self):
+        """Um ciclo de supervisão: heartbeats, reinícios e redistribuição."""
+        self._drain_results()
+        self._check_workers()
+        self.maybe_rebalance()
+
+    def run(self, poll_s: float = 1.0, health_every: float = 60.0):
+        """Inicia a frota e supervisiona até KeyboardInterrupt."""
+        self.start()
+        next_health = time.monotonic() + health_every
+        try:
+            while self._running:
+                self.poll()
+                if time.monotonic() >= next_health:
+                    logger.info(f"Saúde da frota: {self.health()}")
+                    next_health = time.monotonic() + health_every
+                time.sleep(poll_s)
+        except KeyboardInterrupt:
+            logger.info("Interrompido pelo usuário; encerrando a frota.")
+        finally:
+            self.stop()
+
+
+def make_trading_bot(symbol: str, context: dict, testnet: bool = True):
+    """
+    make_bot padrão: TradingBot de cruzamento de médias, um client por worker.
+    :param testnet: Se True (padrão), opera na Binance Testnet; produção só com testnet=False.
+    """
+    from binance.client import Client
+    from tradingbot import TradingBot, MovingAverageCrossStrategy
+
+    if 'client' not in context:
+        context['client'] = Client(os.environ.get('binance_api'), os.environ.get('binance_secret'),
+                                   testnet=testnet)
+    return TradingBot(None, None, MovingAverageCrossStrategy(short_window=3, long_window=5),
+                      symbol=symbol, client=context['client'])
+
+
+if __name__ == '__main__':
+    import argparse
+    import functools
+
+    parser = argparse.ArgumentParser(description='Executa uma frota de bots em vários processos.')
+    parser.add_argument('symbols', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--period', type=float, default=60.0)
+    parser.add_argument('--live', action='store_true',
+                        help='Opera na Binance de produção (dinheiro real); sem ela, usa a Testnet')
+    args = parser.parse_args()
+
+    make_bot = make_trading_bot
+    if args.live:
+        logger.warning("Frota em PRODUÇÃO (--live): as ordens usam dinheiro real.")
+        # partial de uma função de módulo continua serializável para os processos filhos
+        make_bot = functools.partial(make_trading_bot, testnet=False)
+    FleetSupervisor(args.symbols, make_bot, workers=args.workers, period_s=args.period).run()
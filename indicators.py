@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# =============================================================================
+# Indicadores vetorizados
+# -----------------------------------------------------------------------------
+# Todas as funções operam no último eixo: aceitam uma série (T,) ou uma matriz
+# (símbolos x T) e retornam arrays do mesmo formato, com NaN onde a janela
+# ainda não está completa (mesmo comportamento do pandas rolling/ewm usado
+# nos bots).
+# =============================================================================
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """Média móvel simples, equivalente a Series.rolling(window).mean()."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    windows = sliding_window_view(values, window, axis=-1)
+    out[..., window - 1:] = windows.mean(axis=-1)
+    return out
+
+
+def rolling_std(values: np.ndarray, window: int, ddof: int = 1) -> np.ndarray:
+    """Desvio padrão móvel, equivalente a Series.rolling(window).std()."""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < window:
+        return out
+    windows = sliding_window_view(values, window, axis=-1)
+    out[..., window - 1:] = windows.std(axis=-1, ddof=ddof)
+    return out
+
+
+def ema(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Média móvel exponencial com adjust=False (Series.ewm(alpha=..., adjust=False)),
+    começando no primeiro valor. A recursão no tempo roda no ewm do pandas
+    (compilado), uma coluna por símbolo.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] == 0:
+        return np.empty(values.shape)
+    flat = values.reshape(-1, values.shape[-1]).T
+    out = pd.DataFrame(flat).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    return out.T.reshape(values.shape)
+
+
+def rsi(values: np.ndarray, period: int = 14) -> np.ndarray:
+    """
+    RSI com médias exponenciais (com=period-1), igual a
+    BinanceTraderBot.calcular_rsi. O primeiro candle fica NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if values.shape[-1] < 2:
+        return out
+    delta = np.diff(values, axis=-1)
+    gains = np.clip(delta, 0, None)
+    losses = -np.clip(delta, None, 0)
+    alpha = 1.0 / period
+    avg_gain = ema(gains, alpha)
+    avg_loss = ema(losses, alpha)
+    rs = avg_gain / (avg_loss + 1e-10)
+    out[..., 1:] = 100 - (100 / (1 + rs))
+    return out
+
+
+def bollinger(values: np.ndarray, window: int = 20, num_std: float = 2.0):
+    """Retorna (média, banda superior, banda inferior), como getBollingerTradeStrategy."""
+    middle = sma(values, window)
+    std = rolling_std(values, window)
+    return middle, middle + num_std * std, middle - num_std * std
+
+
+def crosses_above(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """True nos candles em que `fast` cruza `slow` de baixo para cima."""
+    out = np.zeros(np.shape(fast), dtype=bool)
+    out[..., 1:] = (fast[..., :-1] < slow[..., :-1]) & (fast[..., 1:] > slow[..., 1:])
+    return out
+
+
+def crosses_below(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """True nos candles em que `fast` cruza `slow` de cima para baixo."""
+    out = np.zeros(np.shape(fast), dtype=bool)
+    out[..., 1:] = (fast[..., :-1] > slow[..., :-1]) & (fast[..., 1:] < slow[..., 1:])
+    return out
@@ -0,0 +1,257 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger('TradingBot.Ledger')
+
+# =============================================================================
+# Livro de posições por fill, com PnL marcado a mercado
+# -----------------------------------------------------------------------------
+# Cada fill (da resposta da ordem ou do executionReport do user data stream)
+# atualiza a posição do símbolo em O(1): quantidade, preço médio de entrada
+# (custo médio, comissões incluídas) e PnL realizado. Cada tick de preço
+# atualiza o PnL não realizado da posição e o total da carteira pela
+# diferença, também em O(1). Posição e PnL ficam disponíveis na hora, sem
+# chamar get_account.
+#
+# Comissões:
+#   - no ativo base (ex: BTC numa compra de BTCUSDT): reduzem a quantidade;
+#   - no ativo de cotação (USDT): entram no custo da compra / saem da venda;
+#   - em outro ativo (ex: BNB): convertidas pelo último preço de <ativo><cotação>
+#     conhecido pelo livro; sem preço, ficam em `other_commissions`.
+# =============================================================================
+BUY = 'BUY'
+SELL = 'SELL'
+
+
+class LedgerPosition:
+    """Posição de um símbolo. quantity > 0 comprado, < 0 vendido."""
+    __slots__ = ('symbol', 'base_asset', 'quote_asset', 'quantity', 'avg_price', 'realized_pnl',
+                 'commissions', 'last_price', 'unrealized_pnl', 'fills', 'volume')
+
+    def __init__(self, symbol: str, base_asset: str, quote_asset: str):
+        self.symbol = symbol
+        self.base_asset = base_asset
+        self.quote_asset = quote_asset
+        self.quantity = 0.0
+        self.avg_price = 0.0
+        self.realized_pnl = 0.0       # Já descontadas as comissões
+        self.commissions = 0.0        # Total pago, em moeda de cotação
+        self.last_price = None
+        self.unrealized_pnl = 0.0
+        self.fills = 0
+        self.volume = 0.0             # Volume negociado, em moeda de cotação
+
+    @property
+    def is_open(self) -> bool:
+        return self.quantity != 0.0
+
+    @property
+    def total_pnl(self) -> float:
+        return self.realized_pnl + self.unrealized_pnl
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return (f"LedgerPosition({self.symbol}, qty={self.quantity:.8f}, avg={self.avg_price:.8f}, "
+                f"realized={self.realized_pnl:.4f}, unrealized={self.unrealized_pnl:.4f})")
+
+
+class PositionLedger:
+    """Posições, preço médio e PnL por símbolo, atualizados fill a fill."""
+    def __init__(self, quote_assets=('USDT', 'BUSD', 'USDC', 'FDUSD', 'BRL', 'BTC', 'ETH', 'BNB'),
+                 dust: float = 1e-12, remember_trades: int = 10_000):
+        """
+        :param quote_assets: Moedas de cotação reconhecidas ao separar o símbolo (na ordem).
+        :param dust: Quantidade abaixo da qual a posição é considerada zerada.
+        :param remember_trades: trade_ids lembrados para descartar fills repetidos.
+        """
+        self.quote_assets = tuple(quote_assets)
+        self.dust = dust
+        self.positions = {}
+        self.prices = {}
+        self.other_commissions = {}   # {ativo: quantidade} sem preço para converter
+        self.realized_total = 0.0
+        self.unrealized_total = 0.0
+        self._seen_trades = set()
+        self._seen_order = deque()
+        self.remember_trades = remember_trades
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # O lock não é serializável (estado salvo por fleet.py / get_state)
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def split_symbol(self, symbol: str):
+        """('BTC', 'USDT') para 'BTCUSDT'."""
+        for quote in self.quote_assets:
+            if symbol.endswith(quote) and len(symbol) > len(quote):
+                return symbol[:-len(quote)], quote
+        raise ValueError(f"Moeda de cotação desconhecida em {symbol}; informe em quote_assets.")
+
+    def position(self, symbol: str) -> LedgerPosition:
+        position = self.positions.get(symbol)
+        if position is None:
+            base, quote = self.split_symbol(symbol)
+            position = self.positions[symbol] = LedgerPosition(symbol, base, quote)
+        return position
+
+    def quantity(self, symbol: str) -> float:
+        position = self.positions.get(symbol)
+        return position.quantity if position is not None else 0.0
+
+    def is_long(self, symbol: str, min_quantity: float = 0.0) -> bool:
+        return self.quantity(symbol) > max(min_quantity, self.dust)
+
+    def totals(self) -> dict:
+        return {'realized_pnl': self.realized_total, 'unrealized_pnl': self.unrealized_total,
+                'total_pnl': self.realized_total + self.unrealized_total,
+                'open_positions': sum(1 for p in self.positions.values() if p.is_open)}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {'positions': {s: p.as_dict() for s, p in self.positions.items()},
+                    'other_commissions': dict(self.other_commissions), **self.totals()}
+
+    # -------------------------
+    # Preços
+    # -------------------------
+    def on_price(self, symbol: str, price: float):
+        """Novo preço do símbolo: atualiza o PnL não realizado (O(1))."""
+        price = float(price)
+        self.prices[symbol] = price
+        position = self.positions.get(symbol)
+        if position is not None:
+            with self._lock:
+                position.last_price = price
+                self._mark(position)
+
+    def _mark(self, position: LedgerPosition):
+        if position.last_price is None:
+            return
+        unrealized = (position.last_price - position.avg_price) * position.quantity if position.is_open else 0.0
+        self.unrealized_total += unrealized - position.unrealized_pnl
+        position.unrealized_pnl = unrealized
+
+    # -------------------------
+    # Fills
+    # -------------------------
+    def _commission_in_quote(self, position: LedgerPosition, commission: float, asset: str, price: float):
+        """Comissão em moeda de cotação e quanto dela sai da quantidade (ativo base)."""
+        if not commission or asset is None:
+            return 0.0, 0.0
+        if asset == position.quote_asset:
+            return commission, 0.0
+        if asset == position.base_asset:
+            return commission * price, commission
+        rate = self.prices.get(asset + position.quote_asset)
+        if rate is None:
+            self.other_commissions[asset] = self.other_commissions.get(asset, 0.0) + commission
+            return 0.0, 0.0
+        return commission * rate, 0.0
+
+    def apply_fill(self, symbol: str, side: str, price: float, quantity: float, commission: float = 0.0,
+                   commission_asset: str = None, trade_id=None) -> bool:
+        """
+        Aplica um fill com custo médio. Retorna False se o trade_id já foi aplicado.
+        :param side: 'BUY' ou 'SELL'.
+        :param commission: Comissão cobrada no fill, em commission_asset.
+        :param trade_id: Identificador do trade na Binance (evita contar duas vezes o
+                         mesmo fill vindo da resposta da ordem e do user data stream).
+        """
+        price, quantity, commission = float(price), float(quantity), float(commission or 0.0)
+        with self._lock:
+            if trade_id is not None:
+                key = (symbol, trade_id)
+                if key in self._seen_trades:
+                    return False
+                self._seen_trades.add(key)
+                self._seen_order.append(key)
+                if len(self._seen_order) > self.remember_trades:
+                    self._seen_trades.discard(self._seen_order.popleft())
+
+            position = self.position(symbol)
+            fee_quote, fee_base = self._commission_in_quote(position, commission, commission_asset, price)
+            signed = quantity if side.upper() == BUY else -quantity
+            old, avg = position.quantity, position.avg_price
+            # Comissão no ativo base: a compra rende menos e a venda consome mais do saldo
+            new = old + signed - fee_base
+            realized = 0.0
+            if old == 0.0 or (old > 0) == (signed > 0):
+                # Aumenta a posição: comissão em cotação entra no custo médio
+                cost = avg * abs(old) + price * quantity + (0.0 if fee_base else fee_quote)
+                position.avg_price = cost / abs(new) if abs(new) > self.dust else 0.0
+            else:
+                # Reduz (ou inverte) a posição: realiza o PnL da parte fechada
+                closed = min(quantity, abs(old))
+                realized = (price - avg) * closed * (1.0 if old > 0 else -1.0)
+                realized -= fee_base * avg if fee_base else fee_quote
+                if abs(new) > self.dust and (new > 0) != (old > 0):
+                    position.avg_price = price    # Inverteu: o excedente abre posição nova
+            if abs(new) <= self.dust:
+                new = 0.0
+                position.avg_price = 0.0
+
+            position.quantity = new
+            position.realized_pnl += realized
+            position.commissions += fee_quote
+            position.fills += 1
+            position.volume += price * quantity
+            self.realized_total += realized
+            if position.last_price is None:
+                position.last_price = price
+            self._mark(position)
+        return True
+
+    def apply_order(self, order: dict, fallback_price: float = None) -> int:
+        """
+        Aplica todos os fills da resposta de uma ordem (create_order/order_market_*).
+        Sem 'fills' (ex: testnet ou respostas parciais), usa executedQty ao preço
+        médio cummulativeQuoteQty / executedQty, ou fallback_price.
+        Retorna o número de fills aplicados.
+        """
+        symbol, side = order.get('symbol'), order.get('side')
+        if symbol is None or side is None:
+            raise ValueError("Ordem sem 'symbol'/'side'; não é possível registrar no livro.")
+        fills = order.get('fills') or []
+        applied = 0
+        for fill in fills:
+            applied += self.apply_fill(symbol, side, fill['price'], fill['qty'], fill.get('commission', 0.0),
+                                       fill.get('commissionAsset'), fill.get('tradeId'))
+        if not fills:
+            executed = float(order.get('executedQty') or 0.0)
+            quote = float(order.get('cummulativeQuoteQty') or 0.0)
+            price = quote / executed if executed and quote else fallback_price
+            if executed and price:
+                applied += self.apply_fill(symbol, side, price, executed)
+        return applied
+
+    def on_execution_report(self, event: dict) -> bool:
+        """
+        Aplica o fill de um evento executionReport do user data stream
+        (x == 'TRADE'); outros eventos são ignorados.
+        """
+        if event.get('e') != 'executionReport' or event.get('x') != 'TRADE':
+            return False
+        return self.apply_fill(event['s'], event['S'], event['L'], event['l'], event.get('n', 0.0),
+                               event.get('N'), event.get('t'))
+
+    def seed(self, symbol: str, quantity: float, avg_price: float):
+        """Posição já existente ao iniciar (ex: saldo da conta), com custo médio informado."""
+        with self._lock:
+            position = self.position(symbol)
+            position.quantity = float(quantity)
+            position.avg_price = float(avg_price) if quantity else 0.0
+            if position.last_price is None:
+                position.last_price = self.prices.get(symbol, position.avg_price)
+            self._mark(position)
@@ -0,0 +1,344 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from candle_window import interval_to_ms
+from consensus import ConsensusStrategy
+from event_queue import CoalescingEventQueue, QueueClosed
+from loop_watchdog import LoopWatchdog
+from tradingbot import (TradingBot, WindowStrategy, MovingAverageCrossStrategy, RSIStrategy,
+                        BollingerStrategy)
+
+logger = logging.getLogger('TradingBot.LoadTest')
+
+# =============================================================================
+# Teste de carga do loop de decisão (exchange simulada)
+# -----------------------------------------------------------------------------
+# Quantos pares (símbolo, estratégia) um host avalia dentro do intervalo do
+# candle? Uma StubExchange gera candles e ticks sintéticos para milhares de
+# símbolos e responde get_klines e ordens sem rede. Dois caminhos de dados:
+#   - poll:   a cada candle, execute_trade() de cada bot (get_klines + estratégia
+#             + ordens), como o loop do TradingBot.run;
+#   - stream: ticks e fechamentos de candle publicados numa CoalescingEventQueue
+#             a uma taxa configurada e consumidos por on_market_event, como o
+#             stream de klines (só WindowStrategy; as demais são ignoradas nesse caminho).
+# Para cada tipo de estratégia a quantidade de símbolos dobra a cada nível até
+# o processamento de um candle não caber mais no intervalo: o relatório traz a
+# vazão sustentada, os percentis de latência por decisão e o ponto de ruptura.
+# =============================================================================
+STRATEGIES = {
+    'ma': lambda: MovingAverageCrossStrategy(short_window=5, long_window=20),
+    'rsi': lambda: RSIStrategy(),
+    'bollinger': lambda: BollingerStrategy(),
+    'consensus': lambda: ConsensusStrategy([MovingAverageCrossStrategy(), RSIStrategy(), BollingerStrategy()],
+                                           weights=[2, 1, 1]),
+}
+
+
+class StubExchange:
+    """
+    Exchange em memória: candles sintéticos por símbolo (passeio aleatório) e
+    ordens a mercado executadas no fechamento corrente. Mesmos métodos do
+    Client usados pelo TradingBot.
+    """
+    def __init__(self, symbols, history: int = 600, steps: int = 1000, interval: str = '1m', seed: int = 0):
+        """
+        :param symbols: Símbolos simulados.
+        :param history: Candles já fechados disponíveis no início.
+        :param steps: Candles que ainda podem ser gerados (advance).
+        :param interval: Intervalo dos candles.
+        """
+        rng = np.random.default_rng(seed)
+        n = history + steps + 1
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.interval_ms = interval_to_ms(interval)
+        returns = rng.normal(0, 0.002, (len(self.symbols), n))
+        self.close = 100 * np.exp(np.cumsum(returns, axis=1))
+        self.open = np.concatenate((self.close[:, :1], self.close[:, :-1]), axis=1)
+        spread = np.abs(rng.normal(0, 0.001, self.close.shape)) * self.close
+        self.high = np.maximum(self.open, self.close) + spread
+        self.low = np.minimum(self.open, self.close) - spread
+        self.volume = rng.lognormal(2, 1, self.close.shape)
+        self.open_time = 1_700_000_000_000 + np.arange(n) * self.interval_ms
+        self.current = history      # Candle em andamento (índice)
+        self.orders = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def advance(self, candles: int = 1):
+        """Fecha o candle em andamento e abre o próximo."""
+        if self.current + candles >= self.close.shape[1]:
+            raise IndexError("StubExchange sem candles; aumente steps.")
+        self.current += candles
+
+    def row(self, symbol: str, i: int = None):
+        """Linha no formato de get_klines (candle i; padrão: o em andamento)."""
+        s = self.index[symbol]
+        i = self.current if i is None else i
+        return [int(self.open_time[i]), self.open[s, i], self.high[s, i], self.low[s, i], self.close[s, i],
+                self.volume[s, i], int(self.open_time[i] + self.interval_ms - 1)]
+
+    # -------------------------
+    # Interface do Client
+    # -------------------------
+    def get_klines(self, symbol: str, interval: str = None, limit: int = 500):
+        self.requests += 1
+        s = self.index[symbol]
+        end = self.current + 1
+        start = max(0, end - limit)
+        times = self.open_time[start:end]
+        return np.column_stack((times, self.open[s, start:end], self.high[s, start:end], self.low[s, start:end],
+                                self.close[s, start:end], self.volume[s, start:end],
+                                times + self.interval_ms - 1)).tolist()
+
+    def _fill(self, symbol: str, side: str, quantity: float):
+        with self._lock:
+            self.orders += 1
+            order_id = self.orders
+        price = float(self.close[self.index[symbol], self.current])
+        return {'symbol': symbol, 'orderId': order_id, 'side': side, 'type': 'MARKET', 'status': 'FILLED',
+                'executedQty': str(quantity), 'cummulativeQuoteQty': str(price * quantity),
+                'transactTime': int(self.open_time[self.current]),
+                'fills': [{'price': str(price), 'qty': str(quantity), 'commission': '0',
+                           'commissionAsset': 'USDT', 'tradeId': order_id}]}
+
+    def order_market_buy(self, symbol: str, quantity: float):
+        return self._fill(symbol, 'BUY', quantity)
+
+    def order_market_sell(self, symbol: str, quantity: float):
+        return self._fill(symbol, 'SELL', quantity)
+
+    def order_oco_sell(self, **kwargs):
+        self.orders += 1
+        return {'orderListId': self.orders}
+
+    def get_open_orders(self, symbol: str):
+        return []
+
+    def cancel_order(self, **kwargs):
+        return {}
+
+    def get_account(self):
+        return {'balances': [{'asset': 'USDT', 'free': '1000000', 'locked': '0'}]}
+
+
+def percentiles(latencies_s) -> dict:
+    """p50/p90/p99/máximo, em milissegundos."""
+    if not len(latencies_s):
+        return {'p50_ms': 0.0, 'p90_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    p50, p90, p99, top = np.percentile(np.asarray(latencies_s) * 1000, [50, 90, 99, 100])
+    return {'p50_ms': p50, 'p90_ms': p90, 'p99_ms': p99, 'max_ms': top}
+
+
+def symbol_names(n: int):
+    return [f'SYM{i:05d}USDT' for i in range(n)]
+
+
+# =============================================================================
+# Cenários
+# =============================================================================
+class LoadTest:
+    """
+    Rampa de símbolos por tipo de estratégia, no caminho poll ou stream.
+        report = LoadTest(interval_s=60).run(['ma', 'rsi'])
+    """
+    def __init__(self, interval_s: float = 60.0, utilization: float = 0.8, start_symbols: int = 50,
+                 max_symbols: int = 10_000, candles_per_level: int = 5, ticks_per_candle: int = 10,
+                 interval: str = '1m', seed: int = 0):
+        """
+        :param interval_s: Tempo disponível por candle (o intervalo real, ou menor para
+                           simular um host mais lento / testar mais rápido).
+        :param utilization: Fração do intervalo que o processamento pode ocupar.
+        :param start_symbols: Símbolos do primeiro nível (dobra a cada nível).
+        :param max_symbols: Limite da rampa.
+        :param candles_per_level: Candles processados em cada nível.
+        :param ticks_per_candle: Ticks por símbolo entre dois fechamentos (caminho stream).
+        """
+        self.interval_s = interval_s
+        self.utilization = utilization
+        self.start_symbols = start_symbols
+        self.max_symbols = max_symbols
+        self.candles_per_level = candles_per_level
+        self.ticks_per_candle = ticks_per_candle
+        self.interval = interval
+        self.seed = seed
+
+    def _bots(self, kind: str, exchange: StubExchange):
+        factory = STRATEGIES[kind]
+        return [TradingBot(None, None, factory(), symbol=symbol, interval=self.interval, client=exchange,
+                           use_risk_management=False, watchdog=LoopWatchdog(self.interval_s))
+                for symbol in exchange.symbols]
+
+    # -------------------------
+    # Caminho poll (execute_trade)
+    # -------------------------
+    def poll_level(self, kind: str, n_symbols: int) -> dict:
+        exchange = StubExchange(symbol_names(n_symbols), steps=self.candles_per_level + 2, seed=self.seed)
+        bots = self._bots(kind, exchange)
+        for bot in bots:   # Aquecimento: primeira carga da janela/histórico
+            bot.execute_trade()
+        latencies, candle_times = [], []
+        for _ in range(self.candles_per_level):
+            exchange.advance()
+            candle_start = time.perf_counter()
+            for bot in bots:
+                start = time.perf_counter()
+                bot.execute_trade()
+                latencies.append(time.perf_counter() - start)
+            candle_times.append(time.perf_counter() - candle_start)
+        return self._summary(kind, 'poll', n_symbols, latencies, candle_times, exchange)
+
+    # -------------------------
+    # Caminho stream (fila de eventos + on_market_event)
+    # -------------------------
+    def stream_level(self, kind: str, n_symbols: int) -> dict:
+        exchange = StubExchange(symbol_names(n_symbols), steps=self.candles_per_level + 2, seed=self.seed)
+        bots = self._bots(kind, exchange)
+        if bots[0].window is None:
+            raise TypeError(f"Estratégia '{kind}' não é WindowStrategy; use o caminho poll.")
+        by_key = {(bot.symbol, self.interval): bot for bot in bots}
+        for bot in bots:
+            bot.update_window()
+        queue = CoalescingEventQueue(max_candle_closes=max(10_000, 2 * n_symbols),
+                                     max_tick_keys=max(10_000, 2 * n_symbols))
+        latencies, close_ages = [], []
+
+        def consume():
+            while True:
+                try:
+                    event = queue.get()
+                except QueueClosed:
+                    return
+                start = time.perf_counter()
+                by_key[event.key].on_market_event(event)
+                if event.kind == 'candle_close':
+                    latencies.append(time.perf_counter() - start)
+                    close_ages.append(event.age())
+
+        consumer = threading.Thread(target=consume, name='loadtest-consumer', daemon=True)
+        consumer.start()
+        start = time.perf_counter()
+        for _ in range(self.candles_per_level):
+            for t in range(self.ticks_per_candle):
+                for symbol in exchange.symbols:
+                    row = exchange.row(symbol)
+                    row[4] = row[1] + (row[4] - row[1]) * (t + 1) / self.ticks_per_candle
+                    queue.put_tick((symbol, self.interval), row)
+            for symbol in exchange.symbols:
+                queue.put_candle_close((symbol, self.interval), exchange.row(symbol))
+            exchange.advance()
+        queue.close()
+        consumer.join()
+        # Produtor e consumidor dividem o processo: tempo médio por candle até
+        # o último fechamento ser avaliado
+        candle_s = (time.perf_counter() - start) / self.candles_per_level
+        summary = self._summary(kind, 'stream', n_symbols, latencies, [candle_s], exchange)
+        summary['close_age'] = percentiles(close_ages)
+        summary['queue'] = queue.stats()
+        # Fechamento avaliado mais de um orçamento depois de publicado também é atraso
+        summary['behind'] |= summary['close_age']['max_ms'] / 1000 > summary['budget_s']
+        return summary
+
+    def _summary(self, kind, path, n_symbols, latencies, candle_times, exchange) -> dict:
+        worst = max(candle_times)
+        decisions = len(latencies)
+        busy = sum(latencies)
+        return {
+            'strategy': kind, 'path': path, 'symbols': n_symbols,
+            'decisions': decisions,
+            'decisions_per_s': decisions / busy if busy else float('inf'),
+            'candle_s': worst,
+            'budget_s': self.interval_s * self.utilization,
+            'behind': worst > self.interval_s * self.utilization,
+            'latency': percentiles(latencies),
+            'orders': exchange.orders,
+        }
+
+    # -------------------------
+    # Rampa
+    # -------------------------
+    def ramp(self, kind: str, path: str = 'poll') -> dict:
+        """Dobra os símbolos até passar do orçamento; retorna os níveis e a capacidade."""
+        level = self.stream_level if path == 'stream' else self.poll_level
+        levels, n = [], self.start_symbols
+        while n <= self.max_symbols:
+            result = level(kind, n)
+            levels.append(result)
+            logger.info(f"[{kind}/{path}] {n} símbolos: candle {result['candle_s']:.3f}s "
+                        f"(orçamento {result['budget_s']:.1f}s), {result['decisions_per_s']:,.0f} decisões/s, "
+                        f"p99 {result['latency']['p99_ms']:.2f} ms")
+            if result['behind']:
+                break
+            n *= 2
+        sustained = [r for r in levels if not r['behind']]
+        best = sustained[-1] if sustained else None
+        throughput = best['decisions_per_s'] if best else 0.0
+        return {
+            'strategy': kind, 'path': path, 'levels': levels,
+            'max_sustained_symbols': best['symbols'] if best else 0,
+            'falls_behind_at': levels[-1]['symbols'] if levels and levels[-1]['behind'] else None,
+            'decisions_per_s': throughput,
+            # Estimativa linear de pares que cabem no orçamento do candle
+            'estimated_capacity': int(throughput * self.interval_s * self.utilization),
+        }
+
+    def run(self, kinds=None, path: str = 'poll') -> list:
+        kinds = list(kinds or STRATEGIES)
+        if path == 'stream':
+            # O caminho stream só atende WindowStrategy; as demais ficam de fora do teste
+            skipped = [kind for kind in kinds if not is_window_kind(kind)]
+            if skipped:
+                logger.info(f"Caminho stream: ignorando {', '.join(skipped)} (não são WindowStrategy; "
+                            "use --path poll).")
+            kinds = [kind for kind in kinds if kind not in skipped]
+        return [self.ramp(kind, path) for kind in kinds]
+
+
+def is_window_kind(kind: str) -> bool:
+    """Se a estratégia `kind` de STRATEGIES roda no caminho stream (WindowStrategy)."""
+    return isinstance(STRATEGIES[kind](), WindowStrategy)
+
+
+def print_report(reports):
+    header = f"{'estratégia':<11}{'caminho':<8}{'símbolos':>9}{'candle s':>10}{'dec/s':>10}" \
+             f"{'p50 ms':>8}{'p90 ms':>8}{'p99 ms':>8}{'max ms':>8}  status"
+    print(header)
+    print('-' * len(header))
+    for report in reports:
+        for r in report['levels']:
+            lat = r['latency']
+            print(f"{r['strategy']:<11}{r['path']:<8}{r['symbols']:>9}{r['candle_s']:>10.3f}"
+                  f"{r['decisions_per_s']:>10,.0f}{lat['p50_ms']:>8.2f}{lat['p90_ms']:>8.2f}"
+                  f"{lat['p99_ms']:>8.2f}{lat['max_ms']:>8.2f}  {'ATRASADO' if r['behind'] else 'ok'}")
+        behind = report['falls_behind_at']
+        print(f"  => {report['strategy']}: sustenta {report['max_sustained_symbols']} símbolos"
+              f"{f', atrasa com {behind}' if behind else ' (limite da rampa)'}; "
+              f"capacidade estimada ~{report['estimated_capacity']:,} pares por candle\n")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Teste de carga do loop de decisão com exchange simulada.')
+    parser.add_argument('--strategies', nargs='*', default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument('--path', choices=('poll', 'stream'), default='poll')
+    parser.add_argument('--interval-s', type=float, default=60.0, help='Tempo disponível por candle')
+    parser.add_argument('--utilization', type=float, default=0.8)
+    parser.add_argument('--start', type=int, default=50)
+    parser.add_argument('--max-symbols', type=int, default=10_000)
+    parser.add_argument('--candles', type=int, default=5)
+    parser.add_argument('--ticks', type=int, default=10, help='Ticks por símbolo por candle (stream)')
+    parser.add_argument('--verbose', action='store_true', help='Mantém os logs INFO dos bots')
+    args = parser.parse_args()
+
+    # Os logs por iteração dos bots (console + arquivo) dominariam a medição
+    if not args.verbose:
+        logging.getLogger('TradingBot').setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    test = LoadTest(interval_s=args.interval_s, utilization=args.utilization, start_symbols=args.start,
+                    max_symbols=args.max_symbols, candles_per_level=args.candles, ticks_per_candle=args.ticks)
+    print_report(test.run(args.strategies, args.path))
@@ -0,0 +1,183 @@
+import logging
+import time
+
+from profiler import PROFILER
+
+logger = logging.getLogger('TradingBot.Watchdog')
+
+# =============================================================================
+# Watchdog do loop: atraso e prazos por etapa, com degradação gradual
+# -----------------------------------------------------------------------------
+# A cada iteração o watchdog mede:
+#   - o atraso (lag) entre o horário agendado da iteração e o início real;
+#   - a duração de cada etapa ('dados', 'estrategia', 'ordens') contra o seu
+#     orçamento, uma fração do intervalo do candle.
+# Iterações seguidas com atraso ou prazo estourado sobem um nível de
+# degradação; iterações saudáveis seguidas descem um nível. Os níveis, em
+# ordem, são configuráveis:
+#   skip_optional    -> estratégias opcionais deixam de ser avaliadas
+#   reduce_lookback  -> busca menos candles (apenas o que a estratégia exige)
+#   pause_entries    -> não abre posições novas; saídas continuam normais
+# =============================================================================
+SKIP_OPTIONAL = 'skip_optional'
+REDUCE_LOOKBACK = 'reduce_lookback'
+PAUSE_ENTRIES = 'pause_entries'
+DEFAULT_STEPS = (SKIP_OPTIONAL, REDUCE_LOOKBACK, PAUSE_ENTRIES)
+
+DEFAULT_STAGE_BUDGETS = {'dados': 0.25, 'estrategia': 0.25, 'ordens': 0.25}
+
+
+class _WatchedStage:
+    """Mede uma etapa e também a marca no PROFILER (substitui PROFILER.stage)."""
+    __slots__ = ('watchdog', 'name', 'budget_s', '_profiler_stage', '_start')
+
+    def __init__(self, watchdog, name, budget_s):
+        self.watchdog = watchdog
+        self.name = name
+        self.budget_s = budget_s
+        self._profiler_stage = PROFILER.stage(name)
+        self._start = None
+
+    def __enter__(self):
+        self._profiler_stage.__enter__()
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.monotonic() - self._start
+        self._profiler_stage.__exit__(exc_type, exc, tb)
+        self.watchdog._stage_finished(self.name, elapsed, self.budget_s)
+        return False
+
+
+class LoopWatchdog:
+    """Detecta sobrecarga do loop e decide o nível de degradação."""
+    def __init__(self, interval_s: float, stage_budgets: dict = None, lag_tolerance: float = 0.1,
+                 steps=DEFAULT_STEPS, escalate_after: int = 2, recover_after: int = 5):
+        """
+        :param interval_s: Intervalo do candle (período do loop), em segundos.
+        :param stage_budgets: Fração do intervalo permitida a cada etapa.
+        :param lag_tolerance: Atraso máximo no início da iteração, em fração do intervalo.
+        :param steps: Degradações aplicadas, na ordem, conforme o nível sobe.
+        :param escalate_after: Iterações sobrecarregadas seguidas para subir um nível.
+        :param recover_after: Iterações saudáveis seguidas para descer um nível.
+        """
+        self.interval_s = interval_s
+        self.stage_budgets = dict(DEFAULT_STAGE_BUDGETS if stage_budgets is None else stage_budgets)
+        self.lag_tolerance = lag_tolerance
+        self.steps = tuple(steps)
+        self.escalate_after = escalate_after
+        self.recover_after = recover_after
+        self.level = 0
+        self._budgets_s = {}         # Prazo em segundos por etapa (calculado no primeiro uso)
+        self._overloaded_streak = 0
+        self._healthy_streak = 0
+        self._iteration_start = None
+        self._iteration_missed = []
+
+        # Métricas
+        self.iterations = 0
+        self.overloaded_iterations = 0
+        self.skipped_iterations = 0
+        self.last_lag_s = 0.0
+        self.max_lag_s = 0.0
+        self.last_iteration_s = 0.0
+        self.deadline_misses = {name: 0 for name in self.stage_budgets}
+        self.stage_max_s = {}
+
+    # -------------------------
+    # Estado de degradação
+    # -------------------------
+    def _active(self, step: str) -> bool:
+        return step in self.steps[:self.level]
+
+    @property
+    def skip_optional(self) -> bool:
+        return self._active(SKIP_OPTIONAL)
+
+    @property
+    def reduce_lookback(self) -> bool:
+        return self._active(REDUCE_LOOKBACK)
+
+    @property
+    def pause_entries(self) -> bool:
+        return self._active(PAUSE_ENTRIES)
+
+    def lookback(self, normal: int, minimum: int = None) -> int:
+        """Candles a buscar: `normal`, ou o mínimo exigido pela estratégia se reduzido."""
+        if not self.reduce_lookback or minimum is None:
+            return normal
+        return min(normal, minimum)
+
+    # -------------------------
+    # Medições
+    # -------------------------
+    def stage(self, name: str) -> _WatchedStage:
+        """Context manager da etapa `name` (mede o prazo e marca no PROFILER); um por uso."""
+        budget = self._budgets_s.get(name)
+        if budget is None and name not in self._budgets_s:
+            fraction = self.stage_budgets.get(name)
+            budget = self._budgets_s[name] = None if fraction is None else fraction * self.interval_s
+        return _WatchedStage(self, name, budget)
+
+    def _stage_finished(self, name: str, elapsed: float, budget_s: float):
+        if elapsed > self.stage_max_s.get(name, 0.0):
+            self.stage_max_s[name] = elapsed
+        if budget_s is not None and elapsed > budget_s:
+            self.deadline_misses[name] = self.deadline_misses.get(name, 0) + 1
+            self._iteration_missed.append(name)
+            logger.warning(f"Etapa '{name}' levou {elapsed:.2f}s (prazo {budget_s:.2f}s).")
+
+    def iteration_started(self, scheduled_at: float = None):
+        """Início da iteração; `scheduled_at` é o horário (time.monotonic) em que ela deveria começar."""
+        now = time.monotonic()
+        self._iteration_start = now
+        self._iteration_missed = []
+        self.last_lag_s = max(0.0, now - scheduled_at) if scheduled_at is not None else 0.0
+        self.max_lag_s = max(self.max_lag_s, self.last_lag_s)
+
+    def iterations_skipped(self, count: int):
+        """Registra iterações puladas porque o loop atrasou mais de um intervalo."""
+        self.skipped_iterations += count
+        logger.warning(f"Loop atrasado: {count} iteração(ões) pulada(s) para não operar com dados antigos.")
+
+    def iteration_finished(self) -> int:
+        """Fim da iteração: avalia a sobrecarga e ajusta o nível. Retorna o nível atual."""
+        self.iterations += 1
+        self.last_iteration_s = time.monotonic() - (self._iteration_start or time.monotonic())
+        overloaded = (self.last_lag_s > self.lag_tolerance * self.interval_s
+                      or self.last_iteration_s > self.interval_s
+                      or bool(self._iteration_missed))
+        if overloaded:
+            self.overloaded_iterations += 1
+            self._overloaded_streak += 1
+            self._healthy_streak = 0
+            if self._overloaded_streak >= self.escalate_after and self.level < len(self.steps):
+                self.level += 1
+                self._overloaded_streak = 0
+                logger.error(f"Loop sobrecarregado (atraso {self.last_lag_s:.2f}s, iteração "
+                             f"{self.last_iteration_s:.2f}s, prazos estourados: {self._iteration_missed}); "
+                             f"degradação nível {self.level}: {', '.join(self.steps[:self.level])}.")
+        else:
+            self._healthy_streak += 1
+            self._overloaded_streak = 0
+            if self._healthy_streak >= self.recover_after and self.level > 0:
+                self.level -= 1
+                self._healthy_streak = 0
+                logger.warning(f"Loop normalizado; degradação reduzida para o nível {self.level}"
+                               f"{': ' + ', '.join(self.steps[:self.level]) if self.level else ''}.")
+        return self.level
+
+    def metrics(self) -> dict:
+        return {
+            'level': self.level,
+            'active_steps': list(self.steps[:self.level]),
+            'iterations': self.iterations,
+            'overloaded_iterations': self.overloaded_iterations,
+            'skipped_iterations': self.skipped_iterations,
+            'last_lag_s': self.last_lag_s,
+            'max_lag_s': self.max_lag_s,
+            'last_iteration_s': self.last_iteration_s,
+            'deadline_misses': dict(self.deadline_misses),
+            'stage_max_s': dict(self.stage_max_s),
+        }
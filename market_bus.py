@@ -0,0 +1,312 @@
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from candle_window import interval_to_ms
+
+logger = logging.getLogger('TradingBot.MarketBus')
+
+# =============================================================================
+# Barramento de dados de mercado em memória compartilhada
+# -----------------------------------------------------------------------------
+# Um único processo (MarketDataIngestor) fala com a Binance e publica, por
+# símbolo, dois anéis em memória compartilhada:
+#   - candles: candles fechados  [seq, open_time, open, high, low, close, volume, close_time]
+#   - ticks:   trades            [seq, trade_time, price, quantity, is_buyer_maker]
+# Cada registro é escrito duas vezes (posição i e i + capacity), então qualquer
+# intervalo de até `capacity` registros é um trecho contíguo e o leitor recebe
+# uma view NumPy direto da memória compartilhada, sem cópia.
+#
+# Cabeçalho (float64[16]):
+#   [0] próximo seq   [1] capacity   [2] largura do registro
+#   [3] versão do candle em andamento (ímpar = escrita em curso)
+#   [4:11] candle em andamento (mesmos campos do registro de candle, sem o seq)
+# O seq de cada registro é gravado por último; o leitor confere o seq para
+# detectar que o escritor deu a volta no anel.
+# =============================================================================
+HEADER_SIZE = 16
+CANDLE_FIELDS = ('open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time')
+TICK_FIELDS = ('trade_time', 'price', 'quantity', 'is_buyer_maker')
+CHANNELS = {'candles': CANDLE_FIELDS, 'ticks': TICK_FIELDS}
+MAX_KLINES = 1000       # Limite de candles por chamada de get_klines na Binance
+
+
+def segment_name(symbol: str, interval: str, channel: str) -> str:
+    """Nome do segmento (curto: o macOS limita nomes a 31 caracteres)."""
+    return f"tb_{symbol}_{interval}_{channel[0]}"
+
+
+class RingSegment:
+    """Anel de registros float64 num segmento de memória compartilhada."""
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((HEADER_SIZE,), dtype=np.float64, buffer=shm.buf)
+        self.capacity = int(self.header[1])
+        self.width = int(self.header[2])
+        self.records = np.ndarray((2 * self.capacity, self.width), dtype=np.float64,
+                                  buffer=shm.buf, offset=HEADER_SIZE * 8)
+
+    @classmethod
+    def create(cls, name: str, capacity: int, fields) -> 'RingSegment':
+        width = len(fields) + 1
+        size = (HEADER_SIZE + 2 * capacity * width) * 8
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Sobrou de um ingestor anterior que não encerrou limpo
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        header = np.ndarray((HEADER_SIZE,), dtype=np.float64, buffer=shm.buf)
+        header[:] = 0
+        header[1] = capacity
+        header[2] = width
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> 'RingSegment':
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: sem `track`, o resource_tracker do leitor apagaria o
+            # segmento ao sair; só o ingestor deve fazer unlink
+            shm = shared_memory.SharedMemory(name=name)
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls(shm, owner=False)
+
+    @property
+    def next_seq(self) -> int:
+        return int(self.header[0])
+
+    def publish(self, values) -> int:
+        """Escreve um registro (sem o seq) e o torna visível aos leitores."""
+        seq = int(self.header[0])
+        slot = seq % self.capacity
+        for row in (self.records[slot], self.records[slot + self.capacity]):
+            row[1:] = values
+            row[0] = seq
+        self.header[0] = seq + 1
+        return seq
+
+    def read_range(self, start_seq: int, end_seq: int) -> np.ndarray:
+        """View contígua e somente leitura dos registros [start_seq, end_seq)."""
+        slot = start_seq % self.capacity
+        view = self.records[slot:slot + (end_seq - start_seq)]
+        view.flags.writeable = False
+        return view
+
+    def set_live(self, values):
+        header = self.header
+        header[3] += 1                       # ímpar: escrita em andamento
+        header[4:4 + len(values)] = values
+        header[3] += 1
+
+    def get_live(self):
+        header = self.header
+        while True:
+            version = header[3]
+            if version % 2 == 0:
+                values = header[4:4 + self.width - 1].copy()
+                if header[3] == version:
+                    return values if version > 0 else None
+
+    def close(self):
+        # As views precisam ser liberadas antes de fechar o segmento
+        self.header = self.records = None
+        try:
+            self.shm.close()
+        except BufferError:
+            logger.warning(f"Segmento {self.shm.name} ainda tem views em uso; "
+                           "fechando no fim do processo.")
+        if self.owner:
+            self.shm.unlink()
+
+
+# =============================================================================
+# 1. Ingestão (único processo com conexão à Binance)
+# =============================================================================
+class MarketDataIngestor:
+    """
+    Busca os candles de cada símbolo uma única vez e publica no barramento.
+    Trades de websocket podem ser publicados com on_trade_message.
+    """
+    def __init__(self, client, symbols, interval: str = '1m', capacity: int = 1000,
+                 tick_capacity: int = 65536):
+        """
+        :param client: Client da Binance (o único do host).
+        :param symbols: Pares publicados (ex: ['BTCUSDT', 'ETHUSDT']).
+        :param interval: Intervalo dos candles.
+        :param capacity: Candles fechados mantidos por símbolo (a carga inicial traz no
+                         máximo MAX_KLINES - 1; o restante do anel enche com o tempo).
+        :param tick_capacity: Trades mantidos por símbolo.
+        """
+        self.client = client
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.capacity = capacity
+        self.candles = {s: RingSegment.create(segment_name(s, interval, 'candles'), capacity,
+                                              CANDLE_FIELDS) for s in self.symbols}
+        self.ticks = {s: RingSegment.create(segment_name(s, interval, 'ticks'), tick_capacity,
+                                            TICK_FIELDS) for s in self.symbols}
+        self._last_open_time = dict.fromkeys(self.symbols)
+        logger.info(f"Barramento criado para {self.symbols} ({interval}).")
+
+    def poll_once(self):
+        """Uma rodada de get_klines por símbolo; publica os candles recém-fechados."""
+        for symbol in self.symbols:
+            last = self._last_open_time[symbol]
+            limit = min(self.capacity + 1, MAX_KLINES) if last is None else 5
+            try:
+                klines = self.client.get_klines(symbol=symbol, interval=self.interval, limit=limit)
+            except Exception as e:
+                logger.error(f"Erro ao buscar candles de {symbol}: {e}")
+                continue
+            if last is not None and klines[0][0] > last + interval_to_ms(self.interval):
+                # Parada maior que a janela curta: busca o histórico completo de novo,
+                # senão os candles do meio sumiriam do anel sem aviso
+                logger.warning(f"Candles faltando em {symbol}; recarregando histórico completo.")
+                try:
+                    klines = self.client.get_klines(symbol=symbol, interval=self.interval,
+                                                    limit=min(self.capacity + 1, MAX_KLINES))
+                except Exception as e:
+                    logger.error(f"Erro ao buscar candles de {symbol}: {e}")
+                    continue
+            ring = self.candles[symbol]
+            for k in klines[:-1]:
+                if last is None or k[0] > last:
+                    ring.publish([float(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                                  float(k[4]), float(k[5]), float(k[6])])
+                    last = k[0]
+            self._last_open_time[symbol] = last
+            k = klines[-1]
+            ring.set_live([float(k[0]), float(k[1]), float(k[2]), float(k[3]),
+                           float(k[4]), float(k[5]), float(k[6])])
+
+    def on_trade_message(self, msg: dict):
+        """Callback para start_trade_socket: publica o trade no anel de ticks."""
+        msg = msg.get('data', msg)
+        ring = self.ticks.get(msg.get('s'))
+        if ring is not None:
+            ring.publish([float(msg['T']), float(msg['p']), float(msg['q']), float(msg['m'])])
+
+    def run(self, poll_interval: float = 1.0):
+        logger.info("Ingestor do barramento iniciado.")
+        try:
+            while True:
+                self.poll_once()
+                time.sleep(poll_interval)
+        finally:
+            self.close()
+
+    def close(self):
+        for ring in list(self.candles.values()) + list(self.ticks.values()):
+            ring.close()
+        logger.info("Barramento encerrado.")
+
+
+# =============================================================================
+# 2. Leitura (qualquer número de processos de bot)
+# =============================================================================
+class BusReader:
+    """
+    Leitor de um canal de um símbolo. Cada leitor guarda seu próprio cursor;
+    read_new() devolve uma view (sem cópia) com os registros publicados desde
+    a última leitura. A view continua válida até o escritor dar a volta no anel.
+    """
+    def __init__(self, symbol: str, interval: str = '1m', channel: str = 'candles'):
+        self.symbol = symbol
+        self.channel = channel
+        self.fields = CHANNELS[channel]
+        self.ring = RingSegment.attach(segment_name(symbol, interval, channel))
+        self.cursor = 0
+        self.overruns = 0
+
+    def read_new(self) -> np.ndarray:
+        while True:
+            end = self.ring.next_seq
+            start = max(self.cursor, end - self.ring.capacity)
+            view = self.ring.read_range(start, end)
+            if not len(view) or int(view[0, 0]) == start:
+                break
+            # O escritor deu a volta durante a leitura; recalcula o intervalo
+        if start > self.cursor:
+            self.overruns += start - self.cursor
+            logger.warning(f"{self.symbol}/{self.channel}: leitor atrasado, "
+                           f"{start - self.cursor} registros perdidos.")
+        self.cursor = end
+        return view
+
+    def latest(self, count: int) -> np.ndarray:
+        """View com os últimos `count` registros (sem mover o cursor)."""
+        end = self.ring.next_seq
+        start = max(0, end - min(count, self.ring.capacity))
+        view = self.ring.read_range(start, end)
+        if len(view) and int(view[0, 0]) != start:
+            # O escritor deu a volta durante a leitura; tenta de novo
+            return self.latest(count)
+        return view
+
+    def column(self, view: np.ndarray, name: str) -> np.ndarray:
+        """Coluna `name` de uma view retornada por read_new/latest."""
+        return view[:, self.fields.index(name) + 1]
+
+    def live_candle(self):
+        """Candle em andamento (apenas no canal de candles) ou None."""
+        return self.ring.get_live()
+
+    def close(self):
+        self.ring.close()
+
+
+class BusClient:
+    """
+    Substituto do client da Binance para os bots: get_klines é servido pelo
+    barramento (sem rede) e os demais métodos (conta, ordens) são repassados ao
+    client real. Assim tradingbot.TradingBot roda sem alterações:
+        TradingBot(..., client=BusClient(Client(api_key, api_secret)))
+    """
+    def __init__(self, client=None, interval: str = '1m'):
+        self._client = client
+        self.interval = interval
+        self._readers = {}
+
+    def get_klines(self, symbol: str, interval: str, limit: int = 500):
+        if interval != self.interval:
+            raise ValueError(f"Barramento publica {self.interval}, pedido {interval}.")
+        reader = self._readers.get(symbol)
+        if reader is None:
+            reader = self._readers[symbol] = BusReader(symbol, interval, 'candles')
+        rows = reader.latest(limit - 1)[:, 1:].tolist()
+        live = reader.live_candle()
+        if live is not None:
+            rows.append(live.tolist())
+        # Mesmo formato de 12 campos da API; os campos que o barramento não guarda vêm zerados
+        return [[int(r[0]), str(r[1]), str(r[2]), str(r[3]), str(r[4]), str(r[5]), int(r[6]),
+                 '0', 0, '0', '0', '0'] for r in rows]
+
+    def __getattr__(self, name):
+        if self._client is None:
+            raise AttributeError(f"{name} não é servido pelo barramento e não há client real.")
+        return getattr(self._client, name)
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+
+
+if __name__ == '__main__':
+    import os
+    import sys
+    from binance.client import Client
+
+    # Ex: python market_bus.py BTCUSDT ETHUSDT
+    ingestor = MarketDataIngestor(Client(os.environ.get('binance_api'), os.environ.get('binance_secret')),
+                                  sys.argv[1:] or ['BTCUSDT'])
+    try:
+        ingestor.run()
+    except KeyboardInterrupt:
+        logger.info("Ingestor interrompido pelo usuário.")
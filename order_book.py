@@ -0,0 +1,320 @@
+import logging
+import time
+
+import numpy as np
+
+logger = logging.getLogger('TradingBot.OrderBook')
+
+# =============================================================================
+# Livro de ofertas local (snapshot + diff stream)
+# -----------------------------------------------------------------------------
+# Segue o procedimento da Binance para manter um livro local:
+#   1. Abrir o stream <symbol>@depth e guardar os eventos recebidos.
+#   2. Buscar um snapshot (get_order_book) e anotar lastUpdateId.
+#   3. Descartar eventos com u <= lastUpdateId.
+#   4. O primeiro evento aplicado deve ter U <= lastUpdateId + 1 <= u.
+#   5. Cada evento seguinte deve ter U == u anterior + 1; senão, ressincroniza.
+# Se o primeiro evento começa depois de lastUpdateId + 1, o snapshot é antigo
+# demais para os eventos: busca-se outro (até max_snapshot_retries seguidas; depois,
+# uma nova tentativa a cada retry_delay_s enquanto os eventos ficam em buffer).
+# Cada lado do livro é um par de arrays ordenados (preço, quantidade); compras
+# são guardadas com preço negativo para que os dois lados fiquem em ordem
+# crescente e o melhor preço seja sempre o índice 0.
+# =============================================================================
+
+
+class _BookSide:
+    """Níveis de preço de um lado do livro, ordenados do melhor para o pior."""
+    def __init__(self, descending: bool, capacity: int = 1024):
+        self.sign = -1.0 if descending else 1.0
+        self.keys = np.empty(capacity, dtype=np.float64)    # preço * sign (ordem crescente)
+        self.qtys = np.empty(capacity, dtype=np.float64)
+        self.n = 0
+
+    def clear(self):
+        self.n = 0
+
+    def _grow(self):
+        capacity = 2 * len(self.keys)
+        for name in ('keys', 'qtys'):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=np.float64)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def update(self, price: float, qty: float):
+        """Define a quantidade de um nível (qty == 0 remove o nível)."""
+        key = price * self.sign
+        n = self.n
+        keys, qtys = self.keys, self.qtys
+        i = int(np.searchsorted(keys[:n], key))
+        if i < n and keys[i] == key:
+            if qty == 0:
+                keys[i:n - 1] = keys[i + 1:n]
+                qtys[i:n - 1] = qtys[i + 1:n]
+                self.n = n - 1
+            else:
+                qtys[i] = qty
+        elif qty != 0:
+            if n == len(keys):
+                self._grow()
+                keys, qtys = self.keys, self.qtys
+            keys[i + 1:n + 1] = keys[i:n]
+            qtys[i + 1:n + 1] = qtys[i:n]
+            keys[i] = key
+            qtys[i] = qty
+            self.n = n + 1
+
+    def best(self):
+        return float(self.keys[0] * self.sign) if self.n else None
+
+    def prices(self) -> np.ndarray:
+        return self.keys[:self.n] * self.sign
+
+    def quantities(self) -> np.ndarray:
+        return self.qtys[:self.n]
+
+
+class OrderBookOutOfSync(Exception):
+    """O livro local não está sincronizado com o stream."""
+
+
+class LocalOrderBook:
+    """
+    Livro de ofertas local de um símbolo, mantido a partir de um snapshot e
+    dos eventos do stream de profundidade, com estimativa de preço médio e
+    slippage de uma ordem a mercado.
+    """
+    def __init__(self, symbol: str, client=None, snapshot_limit: int = 1000,
+                 max_snapshot_retries: int = 3, retry_delay_s: float = 1.0):
+        """
+        :param symbol: Par (ex: BTCUSDT).
+        :param client: Client usado para buscar o snapshot (get_order_book).
+        :param snapshot_limit: Profundidade do snapshot.
+        :param max_snapshot_retries: Snapshots buscados em seguida quando não fecham com os eventos.
+        :param retry_delay_s: Espera antes de tentar de novo depois de esgotar as tentativas.
+        """
+        self.symbol = symbol
+        self.client = client
+        self.snapshot_limit = snapshot_limit
+        self.max_snapshot_retries = max_snapshot_retries
+        self.retry_delay_s = retry_delay_s
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.last_update_id = None
+        self.synced = False
+        self.resyncs = 0
+        self._buffer = []
+        self._first_pending = False     # Nenhum evento aplicado desde o snapshot
+        self._snapshot_attempts = 0
+        self._retry_at = None
+
+    # -------------------------
+    # Sincronização
+    # -------------------------
+    def load_snapshot(self, snapshot: dict):
+        """Carrega a resposta de get_order_book e aplica os eventos em espera."""
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in snapshot['bids']:
+            self.bids.update(float(price), float(qty))
+        for price, qty in snapshot['asks']:
+            self.asks.update(float(price), float(qty))
+        self.last_update_id = snapshot['lastUpdateId']
+        self.synced = True
+        self._first_pending = True
+        self._retry_at = None
+
+        buffered, self._buffer = self._buffer, []
+        for i, event in enumerate(buffered):
+            if not self._process(event):
+                self._buffer = buffered[i:]
+                self._resync(event)
+                return
+
+    def sync(self):
+        """Busca um snapshot novo no client e ressincroniza o livro."""
+        if self.client is None:
+            raise OrderBookOutOfSync(f"{self.symbol}: sem client para buscar o snapshot.")
+        self.load_snapshot(self.client.get_order_book(symbol=self.symbol, limit=self.snapshot_limit))
+
+    def on_depth_message(self, msg: dict):
+        """Callback para start_depth_socket (stream diff <symbol>@depth)."""
+        msg = msg.get('data', msg)
+        if msg.get('e') == 'error':
+            logger.error(f"Erro no stream de profundidade: {msg}; ressincronizando.")
+            # Eventos podem ter se perdido: o livro só volta com um snapshot novo,
+            # buscado na próxima mensagem (que já entra no buffer)
+            self.synced = False
+            self.resyncs += 1
+            self._buffer = []
+            self._snapshot_attempts = 0
+            self._retry_at = time.monotonic()
+            return
+        if not self.synced:
+            self._buffer.append(msg)
+            if self._retry_at is not None and time.monotonic() >= self._retry_at:
+                self._snapshot_attempts = 0
+                self._retry_at = None
+                self.sync()
+            return
+        if not self._process(msg):
+            self._buffer = [msg]
+            self._resync(msg)
+
+    def _process(self, event: dict) -> bool:
+        """
+        Aplica um evento ao livro sincronizado. Retorna False se o evento não
+        continua a sequência (é preciso um snapshot novo).
+        """
+        if event['u'] <= self.last_update_id:
+            return True                 # Já contido no snapshot
+        if self._first_pending:
+            # Primeiro evento após o snapshot: basta conter lastUpdateId + 1
+            if event['U'] > self.last_update_id + 1:
+                return False
+        elif event['U'] != self.last_update_id + 1:
+            return False
+        self._first_pending = False
+        self._snapshot_attempts = 0
+        self._apply(event)
+        return True
+
+    def _resync(self, event: dict):
+        if self._first_pending:
+            logger.warning(f"{self.symbol}: snapshot antigo demais para os eventos (lastUpdateId="
+                           f"{self.last_update_id}, primeiro evento U={event['U']}); "
+                           "buscando outro snapshot.")
+        else:
+            logger.warning(f"{self.symbol}: buraco na sequência (esperado U={self.last_update_id + 1}, "
+                           f"recebido U={event['U']}); ressincronizando.")
+        self.synced = False
+        self.resyncs += 1
+        if self.client is None:
+            return                      # Fica em buffer até o próximo load_snapshot
+        if self._snapshot_attempts >= self.max_snapshot_retries:
+            logger.error(f"{self.symbol}: {self._snapshot_attempts} snapshots seguidos não fecharam "
+                         f"com o stream; nova tentativa em {self.retry_delay_s}s.")
+            self._retry_at = time.monotonic() + self.retry_delay_s
+            return
+        self._snapshot_attempts += 1
+        self.sync()
+
+    def _apply(self, event: dict):
+        for price, qty in event['b']:
+            self.bids.update(float(price), float(qty))
+        for price, qty in event['a']:
+            self.asks.update(float(price), float(qty))
+        self.last_update_id = event['u']
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def mid_price(self):
+        bid, ask = self.bids.best(), self.asks.best()
+        return (bid + ask) / 2 if bid is not None and ask is not None else None
+
+    def estimate_market_order(self, side: str, quantity: float, top_levels: int = 32) -> dict:
+        """
+        Estima o preço médio de uma ordem a mercado de `quantity` varrendo o livro.
+        :param side: 'BUY' (consome asks) ou 'SELL' (consome bids).
+        :return: Dicionário com preço médio, pior preço, slippage em relação ao
+                 melhor preço e ao mid, níveis consumidos e se o livro tinha
+                 quantidade suficiente.
+        """
+        if quantity <= 0:
+            raise ValueError(f"Quantidade deve ser positiva (recebido {quantity}).")
+        if not self.synced:
+            raise OrderBookOutOfSync(f"{self.symbol}: livro não sincronizado.")
+        book = self.asks if side.upper() == 'BUY' else self.bids
+        n = book.n
+        if n == 0:
+            raise OrderBookOutOfSync(f"{self.symbol}: lado {side} vazio.")
+
+        # Quase sempre a ordem é preenchida nos primeiros níveis: acumula só eles
+        depth = min(top_levels, n)
+        cum = np.cumsum(book.qtys[:depth])
+        if cum[-1] < quantity and depth < n:
+            depth = n
+            cum = np.cumsum(book.qtys[:n])
+        levels = min(int(np.searchsorted(cum, quantity)) + 1, depth)
+
+        prices = book.keys[:levels] * book.sign
+        qtys = book.qtys[:levels].copy()
+        filled = min(quantity, float(cum[levels - 1]))
+        qtys[-1] -= float(cum[levels - 1]) - filled
+        avg_price = float(prices @ qtys) / filled
+
+        best = float(prices[0])
+        mid = self.mid_price()
+        direction = 1.0 if side.upper() == 'BUY' else -1.0
+        slippage = direction * (avg_price - best) / best
+        return {
+            'side': side.upper(),
+            'quantity': quantity,
+            'filled': filled,
+            'complete': filled >= quantity,
+            'avg_price': avg_price,
+            'worst_price': float(prices[-1]),
+            'best_price': best,
+            'mid_price': mid,
+            'slippage': slippage,
+            'slippage_bps': slippage * 10_000,
+            'cost_vs_mid_bps': direction * (avg_price - mid) / mid * 10_000 if mid else None,
+            'levels': levels,
+        }
+
+
+# =============================================================================
+# Feed de profundidade reproduzido (testes)
+# =============================================================================
+class ReplayDepthFeed:
+    """
+    Reproduz um snapshot e uma sequência de eventos diff, localmente. Também
+    serve de client para LocalOrderBook.sync() (responde get_order_book).
+    """
+    def __init__(self, snapshot: dict, events):
+        self.snapshot = snapshot
+        self.events = list(events)
+
+    def get_order_book(self, symbol: str, limit: int = 1000):
+        return self.snapshot
+
+    @classmethod
+    def from_recording(cls, path: str, symbol: str, stream: str = 'depth') -> 'ReplayDepthFeed':
+        """
+        Monta o feed a partir de um log de recorder.py: o primeiro get_order_book
+        gravado vira o snapshot e as mensagens do stream `stream` viram os eventos.
+        """
+        from recorder import KIND_CALL, KIND_STREAM, read_records
+        snapshot, events = None, []
+        for kind, _, name, payload in read_records(path):
+            if kind == KIND_CALL and name == 'get_order_book' and snapshot is None \
+                    and payload['kwargs'].get('symbol') == symbol:
+                snapshot = payload['result']
+            elif kind == KIND_STREAM and name == stream:
+                msg = payload.get('data', payload)
+                if msg.get('s') == symbol:
+                    events.append(msg)
+        if snapshot is None:
+            raise ValueError(f"Nenhum snapshot de {symbol} em {path}.")
+        return cls(snapshot, events)
+
+    def run(self, book: LocalOrderBook, events_before_snapshot: int = 0):
+        """
+        Entrega os eventos ao livro. Os `events_before_snapshot` primeiros chegam
+        antes do snapshot (ficam em buffer), como acontece na conexão real.
+        """
+        book.synced = False
+        for event in self.events[:events_before_snapshot]:
+            book.on_depth_message(event)
+        book.load_snapshot(self.snapshot)
+        for event in self.events[events_before_snapshot:]:
+            book.on_depth_message(event)
+        return book
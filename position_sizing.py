@@ -0,0 +1,227 @@
+import logging
+import math
+
+import numpy as np
+
+logger = logging.getLogger('TradingBot.PositionSizing')
+
+# =============================================================================
+# Dimensionamento de posição por volatilidade
+# -----------------------------------------------------------------------------
+# - ATR de Wilder mantido incrementalmente por símbolo (O(1) por candle).
+# - Covariância móvel dos retornos entre símbolos, atualizada em O(k²) por
+#   candle (soma dos retornos e soma dos produtos externos numa janela
+#   deslizante), sem recalcular a janela inteira.
+# - Quantidade por símbolo = menor entre:
+#     risco:   patrimônio * risk_per_trade / (atr_multiplier * ATR)
+#     limite:  patrimônio * trade_percentage / 100 / preço
+#   e, se a volatilidade da carteira (w' Σ w) passar do alvo, todas as
+#   quantidades são reduzidas na mesma proporção.
+# =============================================================================
+
+
+class IncrementalATR:
+    """ATR de Wilder atualizado candle a candle."""
+    __slots__ = ('period', 'value', '_prev_close', '_warmup_sum', '_count')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.value = None
+        self._prev_close = None
+        self._warmup_sum = 0.0
+        self._count = 0
+
+    @property
+    def ready(self) -> bool:
+        return self.value is not None
+
+    def update(self, high: float, low: float, close: float):
+        prev = self._prev_close
+        tr = high - low if prev is None else max(high - low, abs(high - prev), abs(low - prev))
+        self._prev_close = close
+        if self.value is None:
+            self._warmup_sum += tr
+            self._count += 1
+            if self._count == self.period:
+                self.value = self._warmup_sum / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + tr) / self.period
+        return self.value
+
+
+class RollingCovariance:
+    """
+    Covariância amostral dos últimos `window` vetores de retorno (k símbolos).
+    Cada update custa O(k²); a cada `window` updates as somas são refeitas do
+    zero para não acumular erro de arredondamento (custo amortizado O(k²)).
+    """
+    def __init__(self, k: int, window: int = 100):
+        self.k = k
+        self.window = window
+        self._returns = np.zeros((window, k))
+        self._sum = np.zeros(k)
+        self._sum_outer = np.zeros((k, k))
+        self._outer = np.empty((k, k))
+        self._pos = 0
+        self._count = 0
+        self._updates = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= 2
+
+    def update(self, returns: np.ndarray):
+        returns = np.asarray(returns, dtype=np.float64)
+        slot = self._pos
+        if self._count == self.window:
+            old = self._returns[slot]
+            self._sum -= old
+            self._sum_outer -= np.outer(old, old, out=self._outer)
+        else:
+            self._count += 1
+        self._returns[slot] = returns
+        self._sum += returns
+        self._sum_outer += np.outer(returns, returns, out=self._outer)
+        self._pos = (slot + 1) % self.window
+
+        self._updates += 1
+        if self._updates % self.window == 0:
+            data = self._returns[:self._count]
+            self._sum = data.sum(axis=0)
+            self._sum_outer = data.T @ data
+
+    def covariance(self) -> np.ndarray:
+        n = self._count
+        if n < 2:
+            return np.full((self.k, self.k), np.nan)
+        return (self._sum_outer - np.outer(self._sum, self._sum) / n) / (n - 1)
+
+
+class PositionSizer:
+    """
+    Calcula a quantidade a operar de cada símbolo a partir do patrimônio,
+    de trade_percentage e de um alvo de risco.
+    """
+    def __init__(self, symbols, trade_percentage: float = 100.0, risk_per_trade: float = 0.01,
+                 atr_period: int = 14, atr_multiplier: float = 2.0, cov_window: int = 100,
+                 target_portfolio_vol: float = None, step_sizes: dict = None):
+        """
+        :param symbols: Pares dimensionados (a ordem define a ordem da covariância).
+        :param trade_percentage: Máximo do patrimônio, em %, alocado em cada posição.
+        :param risk_per_trade: Fração do patrimônio perdida se o stop (atr_multiplier * ATR) for atingido.
+        :param atr_period: Período do ATR.
+        :param atr_multiplier: Distância do stop em ATRs.
+        :param cov_window: Candles usados na covariância entre símbolos.
+        :param target_portfolio_vol: Volatilidade máxima da carteira por candle (ex: 0.002). None desliga.
+        :param step_sizes: Incremento mínimo de quantidade por símbolo (LOT_SIZE da Binance).
+        """
+        self.symbols = list(symbols)
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.trade_percentage = trade_percentage
+        self.risk_per_trade = risk_per_trade
+        self.atr_multiplier = atr_multiplier
+        self.target_portfolio_vol = target_portfolio_vol
+        self.step_sizes = step_sizes or {}
+        self.atr = {s: IncrementalATR(atr_period) for s in self.symbols}
+        self.covariance = RollingCovariance(len(self.symbols), cov_window)
+        self._last_close = np.full(len(self.symbols), np.nan)
+        self._last_bar_time = None
+        self._pending = {}      # open_time -> [fechamentos, símbolos recebidos] do candle incompleto
+        self.max_pending = 2 * cov_window
+
+    # -------------------------
+    # Atualização por candle
+    # -------------------------
+    def update_symbol(self, symbol: str, high: float, low: float, close: float, open_time=None):
+        """
+        Atualiza o ATR do símbolo com um candle fechado. Com open_time, o
+        candle da carteira é fechado sozinho quando todos os símbolos
+        informarem o mesmo open_time (bots separados podem compartilhar o
+        sizer); sem open_time, chame close_bar() depois de atualizar todos.
+        """
+        self.atr[symbol].update(high, low, close)
+        if open_time is not None and self._last_bar_time is not None and open_time <= self._last_bar_time:
+            return
+        entry = self._pending.get(open_time)
+        if entry is None:
+            if len(self._pending) >= self.max_pending:
+                self._pending.pop(next(iter(self._pending)))
+            entry = self._pending[open_time] = [np.full(len(self.symbols), np.nan), 0]
+        row = entry[0]
+        i = self.index[symbol]
+        if row[i] != row[i]:    # NaN: primeiro fechamento deste símbolo no candle
+            entry[1] += 1
+        row[i] = close
+        if open_time is not None and entry[1] == len(self.symbols):
+            self._close_row(open_time)
+
+    def close_bar(self):
+        """Fecha manualmente o candle atualizado sem open_time."""
+        if None in self._pending:
+            self._close_row(None)
+
+    def _close_row(self, open_time):
+        row, filled = self._pending.pop(open_time)
+        if open_time is not None:
+            # Candles mais antigos que ficaram incompletos não fecham mais
+            for key in [k for k in self._pending if k is not None and k < open_time]:
+                del self._pending[key]
+            self._last_bar_time = open_time
+        if filled < len(self.symbols):
+            return
+        if not np.isnan(self._last_close).any():
+            self.covariance.update(row / self._last_close - 1)
+        self._last_close[:] = row
+
+    def on_candle(self, bars: dict, open_time=None):
+        """Atalho: bars = {símbolo: (high, low, close)} de um mesmo candle."""
+        for symbol, (high, low, close) in bars.items():
+            self.update_symbol(symbol, high, low, close, open_time)
+        if open_time is None:
+            self.close_bar()
+
+    # -------------------------
+    # Dimensionamento
+    # -------------------------
+    def _round(self, symbol: str, quantity: float) -> float:
+        step = self.step_sizes.get(symbol)
+        if step:
+            return math.floor(quantity / step) * step
+        return quantity
+
+    def size_all(self, equity: float, prices: dict) -> dict:
+        """
+        Quantidade de cada símbolo em `prices` ({símbolo: preço}). Símbolos
+        sem ATR suficiente recebem None.
+        """
+        k = len(self.symbols)
+        quantities = np.zeros(k)
+        valid = np.zeros(k, dtype=bool)
+        price_vec = np.zeros(k)
+        cap = equity * self.trade_percentage / 100
+        for symbol, price in prices.items():
+            i = self.index[symbol]
+            atr = self.atr[symbol].value
+            price_vec[i] = price
+            if atr is None or atr <= 0 or price <= 0:
+                continue
+            risk_qty = equity * self.risk_per_trade / (self.atr_multiplier * atr)
+            quantities[i] = min(risk_qty, cap / price)
+            valid[i] = True
+
+        if self.target_portfolio_vol and self.covariance.ready and equity > 0:
+            weights = quantities * price_vec / equity
+            variance = float(weights @ self.covariance.covariance() @ weights)
+            if variance > 0:
+                vol = math.sqrt(variance)
+                if vol > self.target_portfolio_vol:
+                    quantities *= self.target_portfolio_vol / vol
+                    logger.info(f"Volatilidade da carteira {vol:.5f} acima do alvo "
+                                f"{self.target_portfolio_vol:.5f}; quantidades reduzidas.")
+
+        return {s: (self._round(s, float(quantities[self.index[s]])) if valid[self.index[s]] else None)
+                for s in prices}
+
+    def size(self, symbol: str, equity: float, price: float):
+        """Quantidade de um único símbolo (considerando só ele na carteira)."""
+        return self.size_all(equity, {symbol: price})[symbol]
@@ -0,0 +1,265 @@
+import logging
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+logger = logging.getLogger('TradingBot.Profiler')
+
+# =============================================================================
+# Profiling sob demanda do bot em execução
+# -----------------------------------------------------------------------------
+# - Amostragem de pilhas (sampling) em uma thread separada, gravada no formato
+#   "collapsed" (stack;stack;stack contagem), compatível com flamegraph.pl,
+#   speedscope e inferno.
+# - Snapshots do tracemalloc com diff das maiores alocações e crescimento de
+#   memória por etapa (stage) do loop.
+# - Ativação por sinal (SIGUSR1 = sampling, SIGUSR2 = memória) ou por um socket
+#   de controle local (ex: `echo "profile start" | nc 127.0.0.1 8765`).
+# Desligado, o custo é apenas o de `with PROFILER.stage(...)`: uma troca de atributo.
+# =============================================================================
+
+
+class _Stage:
+    """
+    Context manager que marca a etapa atual do loop. Uma instância por uso
+    (stage() cria uma nova): etapas aninhadas ou em outras threads não
+    compartilham estado.
+    """
+    __slots__ = ('profiler', 'name', '_prev', '_mem_start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self._prev = None
+        self._mem_start = None
+
+    def __enter__(self):
+        prof = self.profiler
+        self._prev = prof.current_stage
+        prof.current_stage = self.name
+        self._mem_start = tracemalloc.get_traced_memory()[0] if prof.tracing_memory else None
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        prof = self.profiler
+        prof.current_stage = self._prev
+        # Memória ligada no meio da etapa (SIGUSR2 / socket): sem medição inicial, sem delta
+        if prof.tracing_memory and self._mem_start is not None and tracemalloc.is_tracing():
+            prof.stage_memory[self.name] += tracemalloc.get_traced_memory()[0] - self._mem_start
+        return False
+
+
+class LiveProfiler:
+    """
+    Profiler que pode ser ligado e desligado com o processo rodando.
+    As etapas do loop são marcadas com `with PROFILER.stage('dados'):`; cada
+    amostra de pilha e cada variação de memória é atribuída à etapa corrente.
+    """
+    def __init__(self, interval: float = 0.005, output_dir: str = '.', top: int = 25):
+        """
+        :param interval: Intervalo entre amostras de pilha, em segundos.
+        :param output_dir: Pasta onde os arquivos .folded e .memdiff são gravados.
+        :param top: Quantas linhas de alocação incluir em cada diff de memória.
+        """
+        self.interval = interval
+        self.output_dir = output_dir
+        self.top = top
+
+        self.current_stage = None
+        self.sampling = False
+        self.tracing_memory = False
+        self.stage_memory = Counter()
+
+        self._samples = Counter()
+        self._target_thread = None
+        self._sampler = None
+        self._last_snapshot = None
+        self._lock = threading.Lock()
+        self._server = None
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    # -------------------------
+    # Amostragem de pilhas
+    # -------------------------
+    def start_sampling(self, thread_id: int = None):
+        """Começa a amostrar a thread informada (por padrão, a thread principal)."""
+        with self._lock:
+            if self.sampling:
+                return
+            self._target_thread = thread_id or threading.main_thread().ident
+            self._samples.clear()
+            self.sampling = True
+            self._sampler = threading.Thread(target=self._sample_loop, name='LiveProfiler', daemon=True)
+            self._sampler.start()
+        logger.info(f"Profiling por amostragem iniciado (intervalo {self.interval * 1000:.1f} ms).")
+
+    def stop_sampling(self) -> str:
+        """Para a amostragem e grava as pilhas no formato collapsed. Retorna o caminho."""
+        with self._lock:
+            if not self.sampling:
+                return None
+            self.sampling = False
+            sampler = self._sampler
+        sampler.join()
+
+        path = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Profiling finalizado: {sum(self._samples.values())} amostras gravadas em {path}")
+        return path
+
+    def _sample_loop(self):
+        interval = self.interval
+        target = self._target_thread
+        while self.sampling:
+            frame = sys._current_frames().get(target)
+            if frame is not None:
+                self._samples[self._collapse(frame)] += 1
+            time.sleep(interval)
+
+    def _collapse(self, frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        names.append(f"stage:{self.current_stage or '-'}")
+        names.reverse()
+        return ';'.join(names)
+
+    # -------------------------
+    # Memória (tracemalloc)
+    # -------------------------
+    def start_memory(self, frames: int = 10):
+        """Liga o tracemalloc e guarda um snapshot de referência."""
+        if self.tracing_memory:
+            return
+        tracemalloc.start(frames)
+        self.stage_memory.clear()
+        self._last_snapshot = tracemalloc.take_snapshot()
+        self.tracing_memory = True
+        logger.info("Rastreamento de memória (tracemalloc) iniciado.")
+
+    def memory_snapshot(self) -> str:
+        """
+        Tira um snapshot, compara com o anterior e grava as maiores diferenças,
+        junto com o crescimento de memória acumulado por etapa. Retorna o caminho.
+        """
+        if not self.tracing_memory:
+            self.start_memory()
+            return None
+
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        stats = snapshot.compare_to(self._last_snapshot, 'lineno')
+        self._last_snapshot = snapshot
+
+        current, peak = tracemalloc.get_traced_memory()
+        path = os.path.join(self.output_dir, f"memory-{time.strftime('%Y%m%d-%H%M%S')}.memdiff")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"Memória rastreada: atual={current / 1024:.1f} KiB pico={peak / 1024:.1f} KiB\n\n")
+            f.write("Crescimento por etapa desde o último snapshot:\n")
+            for stage, delta in self.stage_memory.most_common():
+                f.write(f"  {stage}: {delta / 1024:+.1f} KiB\n")
+            f.write(f"\nTop {self.top} diferenças de alocação:\n")
+            for stat in stats[:self.top]:
+                f.write(f"  {stat}\n")
+        self.stage_memory.clear()
+        logger.info(f"Snapshot de memória gravado em {path}")
+        return path
+
+    def stop_memory(self):
+        if not self.tracing_memory:
+            return
+        self.tracing_memory = False
+        self._last_snapshot = None
+        tracemalloc.stop()
+        logger.info("Rastreamento de memória (tracemalloc) finalizado.")
+
+    # -------------------------
+    # Controle externo
+    # -------------------------
+    def toggle_sampling(self):
+        if self.sampling:
+            return self.stop_sampling()
+        self.start_sampling()
+
+    def command(self, line: str) -> str:
+        """
+        Executa um comando de controle e retorna a resposta em texto:
+        profile start|stop, mem start|snapshot|stop, status.
+        """
+        parts = line.strip().lower().split()
+        if parts == ['profile', 'start']:
+            self.start_sampling()
+            return 'ok'
+        if parts == ['profile', 'stop']:
+            return self.stop_sampling() or 'profiling não estava ativo'
+        if parts == ['mem', 'start']:
+            self.start_memory()
+            return 'ok'
+        if parts == ['mem', 'snapshot']:
+            return self.memory_snapshot() or 'tracemalloc iniciado; envie snapshot novamente'
+        if parts == ['mem', 'stop']:
+            self.stop_memory()
+            return 'ok'
+        if parts == ['status']:
+            return (f"sampling={self.sampling} amostras={sum(self._samples.values())} "
+                    f"memory={self.tracing_memory} stage={self.current_stage}")
+        return 'comandos: profile start|stop, mem start|snapshot|stop, status'
+
+    def install_signal_handlers(self):
+        """
+        SIGUSR1 liga/desliga a amostragem e SIGUSR2 tira um snapshot de memória
+        (o primeiro apenas liga o tracemalloc). Indisponível no Windows.
+        Deve ser chamado da thread principal.
+        """
+        if not hasattr(signal, 'SIGUSR1'):
+            logger.warning("Sinais SIGUSR1/SIGUSR2 indisponíveis nesta plataforma; use o socket de controle.")
+            return
+        # O trabalho pesado roda fora do handler, para não interromper o loop no meio
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(
+            target=self.toggle_sampling, daemon=True).start())
+        signal.signal(signal.SIGUSR2, lambda signum, frame: threading.Thread(
+            target=self.memory_snapshot, daemon=True).start())
+        logger.info(f"Profiler controlável por sinal: kill -USR1/-USR2 {os.getpid()}")
+
+    def start_control_server(self, port: int, host: str = '127.0.0.1'):
+        """Abre um socket TCP local que aceita um comando por linha."""
+        profiler = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for raw in self.rfile:
+                    reply = profiler.command(raw.decode('utf-8', 'replace'))
+                    self.wfile.write((reply + '\n').encode('utf-8'))
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='ProfilerControl', daemon=True).start()
+        logger.info(f"Socket de controle do profiler em {host}:{port}")
+
+    def install_from_env(self):
+        """
+        Instala os handlers de sinal e, se BOT_PROFILER_PORT estiver definido,
+        o socket de controle. BOT_PROFILER_DIR muda a pasta de saída.
+        """
+        self.output_dir = os.environ.get('BOT_PROFILER_DIR', self.output_dir)
+        self.install_signal_handlers()
+        port = os.environ.get('BOT_PROFILER_PORT')
+        if port:
+            self.start_control_server(int(port))
+
+
+# Instância única usada pelos bots para marcar as etapas do loop
+PROFILER = LiveProfiler()
@@ -0,0 +1,318 @@
+import json
+import logging
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger('TradingBot.Recorder')
+
+# =============================================================================
+# Formato do log binário (append-only)
+# -----------------------------------------------------------------------------
+# Cabeçalho do arquivo: MAGIC (8 bytes).
+# Cada registro: <kind:u8><timestamp:f64><name_len:u16><payload_len:u32>
+#                <name (utf-8)><payload (JSON comprimido com zlib)>
+# O payload de uma chamada guarda {"kwargs": ..., "result": ...}; o de uma
+# mensagem de stream guarda a própria mensagem.
+# =============================================================================
+MAGIC = b'TBREC\x00\x01\n'
+RECORD_HEADER = struct.Struct('<BdHI')
+
+KIND_CALL = 1    # Resposta de um método do client
+KIND_ERROR = 2   # Exceção levantada por um método do client
+KIND_STREAM = 3  # Mensagem recebida de um websocket
+
+
+# As duas exceções abaixo herdam de BaseException (como KeyboardInterrupt) para
+# não serem engolidas pelos "except Exception" que os bots usam em volta das ordens.
+class ReplayExhausted(BaseException):
+    """O log de replay chegou ao fim."""
+
+
+class ReplayDivergence(BaseException):
+    """O bot fez uma chamada diferente da que foi gravada."""
+
+
+class RecordedAPIError(Exception):
+    """Reproduz, no replay, uma exceção que o client levantou durante a gravação."""
+
+
+def _encode(obj) -> bytes:
+    return zlib.compress(json.dumps(obj, separators=(',', ':'), default=str).encode('utf-8'), 1)
+
+
+def _decode(payload: bytes):
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+def _normalize(obj):
+    """Converte kwargs para a forma que terão após o JSON (ex: tuplas viram listas)."""
+    return json.loads(json.dumps(obj, default=str))
+
+
+class RecordWriter:
+    """Escreve registros no log binário, sempre em modo append."""
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'ab')
+        self._lock = threading.Lock()   # Chamadas concorrentes (ex: data_refresh.py)
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def write(self, kind: int, name: str, obj, timestamp: float = None):
+        name_bytes = name.encode('utf-8')
+        payload = _encode(obj)
+        ts = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self._file.write(RECORD_HEADER.pack(kind, ts, len(name_bytes), len(payload)))
+            self._file.write(name_bytes)
+            self._file.write(payload)
+            # Flush por registro: se o processo cair, o log continua legível até ali
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def read_records(path: str):
+    """
+    Gera os registros do log na ordem em que foram gravados.
+    Cada item é uma tupla (kind, timestamp, name, objeto). Um registro
+    truncado no final (processo interrompido durante a escrita) é ignorado.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} não é um log de gravação do bot.")
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            kind, ts, name_len, payload_len = RECORD_HEADER.unpack(header)
+            name = f.read(name_len)
+            payload = f.read(payload_len)
+            if len(name) < name_len or len(payload) < payload_len:
+                logger.warning(f"Registro truncado no final de {path}; ignorando.")
+                return
+            yield kind, ts, name.decode('utf-8'), _decode(payload)
+
+
+# =============================================================================
+# 1. Gravação
+# =============================================================================
+class RecordingClient:
+    """
+    Envolve um client da Binance e grava toda resposta (ou exceção) de cada
+    método chamado, com timestamp. Qualquer método do client original pode
+    ser usado normalmente: a gravação é transparente para o bot.
+    """
+    def __init__(self, client, path: str):
+        """
+        :param client: Instância de binance.client.Client (ou compatível).
+        :param path: Arquivo do log binário (é aberto em modo append).
+        """
+        self._client = client
+        self._writer = RecordWriter(path)
+        logger.info(f"Gravando respostas do client em {path}")
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+
+        def recorded(*args, **kwargs):
+            if args:
+                raise TypeError(f"{name}: use apenas argumentos nomeados durante a gravação.")
+            try:
+                result = attr(**kwargs)
+            except Exception as e:
+                self._writer.write(KIND_ERROR, name, {'kwargs': kwargs, 'error': repr(e)})
+                raise
+            self._writer.write(KIND_CALL, name, {'kwargs': kwargs, 'result': result})
+            return result
+
+        return recorded
+
+    def record_stream(self, stream: str, msg):
+        """Grava uma mensagem recebida de um websocket."""
+        self._writer.write(KIND_STREAM, stream, msg)
+
+    def wrap_stream_callback(self, stream: str, callback):
+        """
+        Retorna um callback que grava cada mensagem antes de repassá-la.
+        Ex: twm.start_trade_socket(callback=rec.wrap_stream_callback('trade', cb), symbol='BTCUSDT')
+        """
+        def recorded_callback(msg):
+            self.record_stream(stream, msg)
+            return callback(msg)
+        return recorded_callback
+
+    def close(self):
+        self._writer.close()
+
+
+# =============================================================================
+# 2. Replay
+# =============================================================================
+class ReplayClient:
+    """
+    Substituto do client da Binance que devolve, na mesma ordem, as respostas
+    gravadas por RecordingClient. Como o bot recebe exatamente os mesmos dados,
+    suas decisões (e portanto as ordens enviadas) devem ser as mesmas; qualquer
+    chamada fora de ordem levanta ReplayDivergence. Chamadas feitas em paralelo
+    (gravadas na ordem em que terminaram) podem chegar em outra ordem: a
+    chamada é procurada entre as próximas `reorder_window` gravadas seguidas.
+    """
+    reorder_window = 8
+
+    def __init__(self, path: str, strict: bool = True):
+        """
+        :param path: Log gerado por RecordingClient.
+        :param strict: Se True, exige que os argumentos de cada chamada sejam
+                       idênticos aos gravados (além do nome do método).
+        """
+        self.path = path
+        self.strict = strict
+        self._records = list(read_records(path))
+        self._pos = 0
+        self._stream_callbacks = {}
+        self._lock = threading.RLock()
+        self.calls_served = 0
+        self.messages_served = 0
+        self.current_time = self._records[0][1] if self._records else 0.0
+
+    def clock(self) -> float:
+        """Timestamp gravado do último registro consumido (relógio determinístico)."""
+        return self.current_time
+
+    @property
+    def remaining(self) -> int:
+        return len(self._records) - self._pos
+
+    def subscribe(self, stream: str, callback):
+        """Registra um callback para receber as mensagens gravadas do stream."""
+        self._stream_callbacks.setdefault(stream, []).append(callback)
+
+    def _dispatch_streams(self):
+        """Entrega as mensagens de stream gravadas antes da próxima chamada."""
+        while self._pos < len(self._records) and self._records[self._pos][0] == KIND_STREAM:
+            _, ts, stream, msg = self._records[self._pos]
+            self._pos += 1
+            self.current_time = ts
+            self.messages_served += 1
+            for callback in self._stream_callbacks.get(stream, ()):
+                callback(msg)
+
+    def drain_streams(self):
+        """Entrega as mensagens de stream pendentes até a próxima chamada gravada."""
+        self._dispatch_streams()
+
+    def _bring_forward(self, name: str, kwargs: dict):
+        """Se a chamada gravada está um pouco adiante (chamadas paralelas), traz para a posição atual."""
+        records, pos = self._records, self._pos
+        if records[pos][2] == name:
+            return
+        normalized = _normalize(kwargs)
+        end = min(pos + self.reorder_window, len(records))
+        for j in range(pos + 1, end):
+            kind, _, recorded_name, payload = records[j]
+            if kind == KIND_STREAM:
+                return
+            if recorded_name == name and (not self.strict or payload['kwargs'] == normalized):
+                records.insert(pos, records.pop(j))
+                return
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def replayed(*args, **kwargs):
+            if args:
+                raise TypeError(f"{name}: use apenas argumentos nomeados no replay.")
+            with self._lock:
+                self._dispatch_streams()
+                if self._pos >= len(self._records):
+                    raise ReplayExhausted(f"Fim do log {self.path} ao chamar {name}.")
+
+                self._bring_forward(name, kwargs)
+                kind, ts, recorded_name, payload = self._records[self._pos]
+                if recorded_name != name:
+                    raise ReplayDivergence(
+                        f"Registro {self._pos}: bot chamou {name}, mas foi gravado {recorded_name}.")
+                if self.strict and _normalize(kwargs) != payload['kwargs']:
+                    raise ReplayDivergence(
+                        f"Registro {self._pos}: {name} chamado com {kwargs}, "
+                        f"gravado com {payload['kwargs']}.")
+
+                self._pos += 1
+                self.current_time = ts
+                self.calls_served += 1
+            if kind == KIND_ERROR:
+                raise RecordedAPIError(payload['error'])
+            return payload['result']
+
+        return replayed
+
+
+def replay_bot(path: str, make_bot, step, max_steps: int = None) -> dict:
+    """
+    Executa o bot contra o log o mais rápido possível e mede o throughput.
+
+    :param path: Log gerado por RecordingClient.
+    :param make_bot: Função que recebe o ReplayClient e retorna o bot.
+    :param step: Função que recebe o bot e executa uma iteração (ex: execute_trade).
+    :param max_steps: Limite opcional de iterações.
+    :return: Dicionário com iterações, chamadas, mensagens e tempos.
+    """
+    client = ReplayClient(path)
+    start = time.perf_counter()
+    bot = make_bot(client)
+    steps = 0
+    try:
+        while client.remaining and (max_steps is None or steps < max_steps):
+            step(bot)
+            steps += 1
+    except ReplayExhausted:
+        pass
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'steps': steps,
+        'calls': client.calls_served,
+        'messages': client.messages_served,
+        'elapsed_s': elapsed,
+        'steps_per_s': steps / elapsed if elapsed > 0 else float('inf'),
+        'calls_per_s': client.calls_served / elapsed if elapsed > 0 else float('inf'),
+    }
+    logger.info(f"Replay de {path} finalizado: {result}")
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Reexecuta um log gravado contra o bot.')
+    parser.add_argument('log', help='Arquivo gerado com BOT_RECORD_FILE')
+    parser.add_argument('--bot', choices=['tradingbot', 'trader'], default='tradingbot',
+                        help='tradingbot = tradingbot.TradingBot, trader = Trading_Bot.BinanceTraderBot')
+    args = parser.parse_args()
+
+    if args.bot == 'tradingbot':
+        from tradingbot import TradingBot, MovingAverageCrossStrategy
+
+        def make_bot(client):
+            return TradingBot(None, None, MovingAverageCrossStrategy(short_window=3, long_window=5),
+                              client=client)
+        stats = replay_bot(args.log, make_bot, lambda bot: bot.execute_trade())
+    else:
+        from Trading_Bot import BinanceTraderBot, STOCK_CODE, OPERATION_CODE, TRADED_QUANTITY, CANDLE_PERIOD
+
+        def make_bot(client):
+            bot = BinanceTraderBot(STOCK_CODE, OPERATION_CODE, TRADED_QUANTITY, 100, CANDLE_PERIOD,
+                                   client_binance=client)
+            bot.settle_delay = 0  # No replay não há ordem real para esperar
+            return bot
+        stats = replay_bot(args.log, make_bot, lambda bot: bot.execute())
+
+    print(stats)
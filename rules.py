@@ -0,0 +1,529 @@
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+import indicators
+from candle_window import CandleWindow
+from tradingbot import WindowStrategy
+
+logger = logging.getLogger('TradingBot.Rules')
+
+# =============================================================================
+# Regras declarativas compiladas para NumPy
+# -----------------------------------------------------------------------------
+# Uma regra é uma expressão como
+#     sma(close, 5) crosses_above sma(close, 20) and rsi(14) < 70
+# O texto é lido uma única vez e vira um grafo de operações NumPy (DAG):
+#   - cada subexpressão idêntica vira um único nó (sma(close, 20) usado em
+#     duas regras, ou dentro de bb_upper/bb_lower, é calculado uma vez);
+#   - os nós ficam em ordem topológica; avaliar é percorrer a lista de passos,
+#     cada um uma chamada vetorizada sobre o histórico inteiro (sem laço por
+#     candle em Python);
+#   - o mesmo programa roda no histórico completo (signals, backtest) e no
+#     último candle ao vivo: neste caso só os últimos required_history()
+#     candles são processados e fica o último valor.
+# Os indicadores são os de indicators.py, então as regras dão os mesmos
+# valores das estratégias escritas à mão (ex: MovingAverageCrossStrategy).
+#
+# Gramática (da menor para a maior precedência de ligação):
+#   expr     := and ('or' and)*
+#   and      := not ('and' not)*
+#   not      := 'not' not | compare
+#   compare  := sum (op sum)?       op: < <= > >= == != crosses_above crosses_below
+#   sum      := product (('+' | '-') product)*
+#   product  := unary (('*' | '/') unary)*
+#   unary    := '-' unary | número | série | função '(' args ')' | '(' expr ')'
+# Séries: open, high, low, close, volume. Funções: ver FUNCTIONS; o primeiro
+# argumento série pode ser omitido (rsi(14) == rsi(close, 14)).
+# =============================================================================
+SERIES = ('open', 'high', 'low', 'close', 'volume')
+
+_TOKEN = re.compile(r'\s*(?:(?P<number>\d+\.?\d*|\.\d+)|(?P<name>[A-Za-z_]\w*)'
+                    r'|(?P<op><=|>=|==|!=|[-+*/<>(),]))')
+_COMPARISONS = ('<', '<=', '>', '>=', '==', '!=', 'crosses_above', 'crosses_below')
+_COMMUTATIVE = ('add', 'mul', 'eq', 'ne', 'and', 'or')
+_BOOLEAN = ('lt', 'le', 'gt', 'ge', 'eq', 'ne', 'crosses_above', 'crosses_below', 'and', 'or', 'not')
+
+
+class RuleError(ValueError):
+    """Regra inválida; a mensagem indica a posição no texto."""
+
+
+# -------------------------
+# Operações dos nós
+# -------------------------
+def _divide(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.divide(a, b)
+
+
+def _rolling(reduce):
+    def rolling(values: np.ndarray, window: int) -> np.ndarray:
+        out = np.full(values.shape, np.nan)
+        if values.shape[-1] >= window:
+            out[..., window - 1:] = reduce(sliding_window_view(values, window, axis=-1), axis=-1)
+        return out
+    return rolling
+
+
+def _lag(values: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full(values.shape, np.nan)
+    if periods < values.shape[-1]:
+        out[..., periods:] = values[..., :values.shape[-1] - periods]
+    return out
+
+
+def _with_errstate(op):
+    def compare(a, b):
+        with np.errstate(invalid='ignore'):
+            return op(a, b)
+    return compare
+
+
+OPS = {
+    'add': np.add, 'sub': np.subtract, 'mul': np.multiply, 'div': _divide, 'neg': np.negative,
+    'abs': np.abs,
+    'lt': _with_errstate(np.less), 'le': _with_errstate(np.less_equal),
+    'gt': _with_errstate(np.greater), 'ge': _with_errstate(np.greater_equal),
+    'eq': np.equal, 'ne': np.not_equal,
+    'crosses_above': indicators.crosses_above, 'crosses_below': indicators.crosses_below,
+    'and': np.logical_and, 'or': np.logical_or, 'not': np.logical_not,
+    'sma': indicators.sma, 'std': indicators.rolling_std,
+    'ema': lambda values, window: indicators.ema(values, 2.0 / (window + 1)),
+    'rsi': indicators.rsi,
+    'highest': _rolling(np.max), 'lowest': _rolling(np.min), 'lag': _lag,
+}
+_BINARY = {'+': 'add', '-': 'sub', '*': 'mul', '/': 'div', '<': 'lt', '<=': 'le', '>': 'gt',
+           '>=': 'ge', '==': 'eq', '!=': 'ne', 'crosses_above': 'crosses_above',
+           'crosses_below': 'crosses_below'}
+
+# Funções da linguagem: nome -> parâmetros depois da série.
+# Candles extras de histórico que cada uma exige: None = memória infinita (EMA).
+FUNCTIONS = {
+    'sma': ('window',), 'ema': ('window',), 'std': ('window',), 'rsi': ('period',),
+    'highest': ('window',), 'lowest': ('window',), 'lag': ('periods',),
+    'bb_upper': ('window', 'num_std'), 'bb_lower': ('window', 'num_std'), 'abs': (),
+}
+
+
+def _extra_history(op: str, params: tuple):
+    if op in ('sma', 'std', 'highest', 'lowest'):
+        return params[0] - 1
+    if op in ('ema', 'rsi'):
+        return None
+    if op == 'lag':
+        return params[0]
+    if op in ('crosses_above', 'crosses_below'):
+        return 1
+    return 0
+
+
+class _Node:
+    __slots__ = ('op', 'args', 'params', 'kind', 'lookback', 'label')
+
+    def __init__(self, op, args, params, kind, lookback, label):
+        self.op = op
+        self.args = args          # Índices dos nós de entrada
+        self.params = params      # Constantes (janela, nome da série, valor)
+        self.kind = kind          # 'num' ou 'bool'
+        self.lookback = lookback  # Candles para o último valor ser válido (None = todos)
+        self.label = label
+
+
+class RuleProgram:
+    """
+    Grafo de uma ou mais regras compiladas, com subexpressões comuns
+    compartilhadas entre todas elas.
+        program = RuleProgram(buy='sma(close, 5) crosses_above sma(close, 20)',
+                              sell='sma(close, 5) crosses_below sma(close, 20)')
+        program.evaluate(df)['buy']             # array bool por candle
+        program.evaluate(window, last=True)     # {'buy': bool, 'sell': bool}
+    """
+    def __init__(self, **rules):
+        self.nodes = []
+        self.outputs = {}
+        self._index = {}
+        for name, source in rules.items():
+            self.add(name, source)
+
+    # -------------------------
+    # Compilação
+    # -------------------------
+    def add(self, name: str, source: str) -> int:
+        """Compila `source` (expressão booleana) como a saída `name`."""
+        node = _Parser(source, self).parse()
+        if self.nodes[node].kind != 'bool':
+            raise RuleError(f"A regra {name!r} deve ser uma condição (comparação, and/or/not): {source!r}")
+        if not self._uses_series(node):
+            raise RuleError(f"A regra {name!r} não usa nenhuma série (open, close, ...): {source!r}")
+        self.outputs[name] = node
+        return node
+
+    def _uses_series(self, index: int) -> bool:
+        """Se o nó depende de alguma série (regras só com constantes não geram um array)."""
+        node = self.nodes[index]
+        return node.op == 'series' or any(self._uses_series(a) for a in node.args)
+
+    def node(self, op: str, args=(), params=(), label: str = None) -> int:
+        """Nó (op, args, params), reaproveitando um idêntico já existente."""
+        args = tuple(args)
+        if op in _COMMUTATIVE:
+            args = tuple(sorted(args))
+        key = (op, args, params)
+        index = self._index.get(key)
+        if index is not None:
+            return index
+
+        inputs = [self.nodes[a] for a in args]
+        if op in ('series', 'const'):
+            kind, lookback = 'num', 1
+        else:
+            expected = 'bool' if op in ('and', 'or', 'not') else 'num'
+            for node in inputs:
+                if node.kind != expected:
+                    raise RuleError(f"'{op}' espera {'condições' if expected == 'bool' else 'valores'}, "
+                                    f"recebeu {node.label}")
+            kind = 'bool' if op in _BOOLEAN else 'num'
+            extra = _extra_history(op, params)
+            lookbacks = [n.lookback for n in inputs]
+            lookback = None if extra is None or None in lookbacks else max(lookbacks) + extra
+        self.nodes.append(_Node(op, args, params, kind, lookback, label or op))
+        self._index[key] = len(self.nodes) - 1
+        return len(self.nodes) - 1
+
+    def required_history(self):
+        """Candles necessários para todas as saídas no último candle (None = todo o histórico)."""
+        lookbacks = [self.nodes[i].lookback for i in self.outputs.values()]
+        return None if None in lookbacks else max(lookbacks, default=1)
+
+    def describe(self) -> str:
+        """Passos do grafo, um por linha (para inspecionar o compartilhamento)."""
+        lines = []
+        for i, node in enumerate(self.nodes):
+            outputs = [name for name, o in self.outputs.items() if o == i]
+            lines.append(f"%{i} = {node.label}" + (f"    -> {', '.join(outputs)}" if outputs else ''))
+        return '\n'.join(lines)
+
+    # -------------------------
+    # Avaliação
+    # -------------------------
+    @staticmethod
+    def _series(data, name: str) -> np.ndarray:
+        """Coluna de DataFrame (get_historical_data), dict de arrays ou CandleWindow."""
+        if isinstance(data, CandleWindow):
+            return getattr(data, name)
+        values = data[name]
+        return values.to_numpy(dtype=np.float64) if isinstance(values, pd.Series) else \
+            np.asarray(values, dtype=np.float64)
+
+    def evaluate(self, data, last: bool = False) -> dict:
+        """
+        Avalia todas as saídas. Com last=True, só os últimos required_history()
+        candles são processados e o resultado é o valor do último candle.
+        Retorna {nome: array (ou valor)}; indicadores em self.last_values.
+        """
+        lookback = self.required_history() if last else None
+        values = [None] * len(self.nodes)
+        for i, node in enumerate(self.nodes):
+            if node.op == 'series':
+                series = self._series(data, node.params[0])
+                values[i] = series[-lookback:] if lookback else series
+            elif node.op == 'const':
+                values[i] = node.params[0]
+            else:
+                values[i] = OPS[node.op](*(values[a] for a in node.args), *node.params)
+
+        self.last_values = {node.label: float(values[i][..., -1]) for i, node in enumerate(self.nodes)
+                            if node.op in FUNCTIONS and np.ndim(values[i]) == 1 and len(values[i])}
+        if last:
+            return {name: bool(values[i][-1]) if len(values[i]) else False
+                    for name, i in self.outputs.items()}
+        return {name: values[i] for name, i in self.outputs.items()}
+
+
+class _Parser:
+    """Descida recursiva que constrói os nós direto no RuleProgram."""
+    def __init__(self, source: str, program: RuleProgram):
+        self.source = source
+        self.program = program
+        self.tokens = self._tokenize(source)
+        self.pos = 0
+
+    def _tokenize(self, source: str):
+        tokens, pos = [], 0
+        while pos < len(source):
+            match = _TOKEN.match(source, pos)
+            if match is None or match.end() == pos:
+                if source[pos:].strip():
+                    raise RuleError(f"Caractere inesperado na posição {pos}: {source[pos:]!r}")
+                break
+            kind = match.lastgroup
+            tokens.append((kind, match.group(kind), match.start(kind)))
+            pos = match.end()
+        return tokens
+
+    # -------------------------
+    # Tokens
+    # -------------------------
+    def _peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else None
+
+    def _next(self):
+        if self.pos >= len(self.tokens):
+            raise RuleError(f"Regra incompleta: {self.source!r}")
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def _expect(self, value: str):
+        kind, text, at = self._next()
+        if text != value:
+            raise RuleError(f"Esperado {value!r} na posição {at}, encontrado {text!r}: {self.source!r}")
+
+    def _label(self, index: int) -> str:
+        return self.program.nodes[index].label
+
+    # -------------------------
+    # Gramática
+    # -------------------------
+    def parse(self) -> int:
+        node = self._or()
+        if self.pos < len(self.tokens):
+            _, text, at = self.tokens[self.pos]
+            raise RuleError(f"Trecho inesperado na posição {at}: {text!r} em {self.source!r}")
+        return node
+
+    def _or(self):
+        node = self._and()
+        while self._peek() == 'or':
+            self._next()
+            right = self._and()
+            node = self.program.node('or', (node, right), label=f"({self._label(node)} or {self._label(right)})")
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() == 'and':
+            self._next()
+            right = self._not()
+            node = self.program.node('and', (node, right), label=f"({self._label(node)} and {self._label(right)})")
+        return node
+
+    def _not(self):
+        if self._peek() == 'not':
+            self._next()
+            node = self._not()
+            return self.program.node('not', (node,), label=f"not {self._label(node)}")
+        return self._compare()
+
+    def _compare(self):
+        node = self._sum()
+        if self._peek() in _COMPARISONS:
+            op = self._next()[1]
+            right = self._sum()
+            node = self.program.node(_BINARY[op], (node, right),
+                                     label=f"{self._label(node)} {op} {self._label(right)}")
+        return node
+
+    def _sum(self):
+        node = self._product()
+        while self._peek() in ('+', '-'):
+            op = self._next()[1]
+            right = self._product()
+            node = self.program.node(_BINARY[op], (node, right),
+                                     label=f"({self._label(node)} {op} {self._label(right)})")
+        return node
+
+    def _product(self):
+        node = self._unary()
+        while self._peek() in ('*', '/'):
+            op = self._next()[1]
+            right = self._unary()
+            node = self.program.node(_BINARY[op], (node, right),
+                                     label=f"{self._label(node)} {op} {self._label(right)}")
+        return node
+
+    def _unary(self):
+        kind, text, at = self._next()
+        if text == '-':
+            node = self._unary()
+            return self.program.node('neg', (node,), label=f"-{self._label(node)}")
+        if text == '(':
+            node = self._or()
+            self._expect(')')
+            return node
+        if kind == 'number':
+            return self.program.node('const', params=(float(text),), label=text)
+        if kind == 'name' and text in SERIES:
+            return self.program.node('series', params=(text,), label=text)
+        if kind == 'name' and text in FUNCTIONS and self._peek() == '(':
+            return self._call(text, at)
+        raise RuleError(f"Termo inesperado na posição {at}: {text!r} em {self.source!r}")
+
+    def _call(self, name: str, at: int):
+        self._expect('(')
+        args = []
+        while self._peek() != ')':
+            if args:
+                self._expect(',')
+            args.append(self._or())
+        self._expect(')')
+
+        param_names = FUNCTIONS[name]
+        if len(args) == len(param_names) and args and self.program.nodes[args[0]].op == 'const':
+            args.insert(0, self.program.node('series', params=('close',), label='close'))
+        if len(args) != len(param_names) + 1:
+            raise RuleError(f"{name}() recebe (série, {', '.join(param_names)}) na posição {at}: {self.source!r}")
+        params = []
+        for param, index in zip(param_names, args[1:]):
+            node = self.program.nodes[index]
+            if node.op != 'const':
+                raise RuleError(f"{name}(): '{param}' deve ser um número na posição {at}: {self.source!r}")
+            value = node.params[0]
+            params.append(value if param == 'num_std' else int(value))
+            if param != 'num_std' and (value != int(value) or value < (0 if param == 'periods' else 1)):
+                raise RuleError(f"{name}(): '{param}' deve ser um inteiro positivo na posição {at}: {self.source!r}")
+        series = args[0]
+        label = f"{name}({', '.join([self._label(series)] + [f'{p:g}' for p in params])})"
+
+        # Bandas de Bollinger como sma +/- k * std: compartilham os nós com sma()/std()
+        if name in ('bb_upper', 'bb_lower'):
+            window, num_std = params
+            middle = self.program.node('sma', (series,), (window,), label=f"sma({self._label(series)}, {window})")
+            std = self.program.node('std', (series,), (window,), label=f"std({self._label(series)}, {window})")
+            width = self.program.node('mul', (self.program.node('const', params=(float(num_std),), label=f'{num_std:g}'),
+                                              std), label=f"{num_std:g} * {self._label(std)}")
+            return self.program.node('add' if name == 'bb_upper' else 'sub', (middle, width), label=label)
+        return self.program.node(name, (series,), tuple(params), label=label)
+
+
+def compile_rule(source: str) -> RuleProgram:
+    """Compila uma única regra como a saída 'rule'."""
+    return RuleProgram(rule=source)
+
+
+# =============================================================================
+# Estratégia a partir de regras
+# =============================================================================
+class RuleStrategy(WindowStrategy):
+    """
+    Estratégia definida por regras de compra e venda, compiladas uma vez num
+    único grafo (indicadores usados pelas duas regras são calculados uma vez).
+        RuleStrategy(buy='sma(close, 5) crosses_above sma(close, 20) and rsi(14) < 70',
+                     sell='sma(close, 5) crosses_below sma(close, 20)')
+    Funciona com DataFrame (should_buy/signals) e com CandleWindow; pode ser
+    usada em strategy_config.py ({"type": "RuleStrategy", "params": {"buy": ...}}).
+    """
+    def __init__(self, buy: str, sell: str = None):
+        """
+        :param buy: Regra de compra.
+        :param sell: Regra de venda (None = a estratégia nunca vende; a saída fica
+                     com o OCO ou outra estratégia).
+        """
+        self._buy = buy
+        self._sell = sell
+        self._compile()
+
+    def _compile(self):
+        rules = {'buy': self._buy}
+        if self._sell:
+            rules['sell'] = self._sell
+        self.program = RuleProgram(**rules)
+        self._cache_key = None
+        self._cache = None
+
+    # Trocar o texto recompila (recarga por strategy_config.py)
+    @property
+    def buy(self) -> str:
+        return self._buy
+
+    @buy.setter
+    def buy(self, source: str):
+        self._buy = source
+        self._compile()
+
+    @property
+    def sell(self) -> str:
+        return self._sell
+
+    @sell.setter
+    def sell(self, source: str):
+        self._sell = source
+        self._compile()
+
+    def required_history(self):
+        return self.program.required_history()
+
+    # -------------------------
+    # Último candle (ao vivo)
+    # -------------------------
+    def _decide(self, data):
+        """(comprar, vender) no último candle; reaproveitado entre should_buy e should_sell."""
+        close = self.program._series(data, 'close')
+        if not len(close):
+            return False, False
+        key = (id(data), len(close), float(close[-1]),
+               data.last_open_time if isinstance(data, CandleWindow) else len(data))
+        if key != self._cache_key:
+            result = self.program.evaluate(data, last=True)
+            self._cache = (result['buy'], result.get('sell', False))
+            self._cache_key = key
+            self.last_values = self.program.last_values
+        return self._cache
+
+    def should_buy(self, df: pd.DataFrame) -> bool:
+        return self._decide(df)[0]
+
+    def should_sell(self, df: pd.DataFrame) -> bool:
+        return self._decide(df)[1]
+
+    def should_buy_window(self, window: CandleWindow) -> bool:
+        return self._decide(window)[0]
+
+    def should_sell_window(self, window: CandleWindow) -> bool:
+        return self._decide(window)[1]
+
+    # -------------------------
+    # Histórico completo (backtest)
+    # -------------------------
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        result = self.program.evaluate(df)
+        self.last_values = self.program.last_values
+        out = np.zeros(len(df), dtype=np.int8)
+        if 'sell' in result:
+            out[result['sell']] = -1
+        # Como no bot, compra tem prioridade quando as duas regras valem no mesmo candle
+        out[result['buy']] = 1
+        return out
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from strategy_search import synthetic_history
+    from tradingbot import MovingAverageCrossStrategy
+
+    parser = argparse.ArgumentParser(description='Compila uma regra e mede a avaliação no histórico.')
+    parser.add_argument('--buy', default='sma(close, 5) crosses_above sma(close, 20) and rsi(14) < 70')
+    parser.add_argument('--sell', default='sma(close, 5) crosses_below sma(close, 20) or close > bb_upper(close, 20, 2)')
+    parser.add_argument('--candles', type=int, default=500_000)
+    args = parser.parse_args()
+
+    strategy = RuleStrategy(args.buy, args.sell)
+    print(strategy.program.describe())
+    print(f"Histórico necessário ao vivo: {strategy.required_history() or 'todo'}")
+
+    df = synthetic_history(args.candles)
+    t0 = time.perf_counter()
+    signals = strategy.signals(df)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(df)} candles em {elapsed:.3f}s ({len(df) / elapsed:,.0f} candles/s): "
+          f"{(signals == 1).sum()} compras, {(signals == -1).sum()} vendas")
+
+    cross = RuleStrategy('sma(close, 5) crosses_above sma(close, 20)', 'sma(close, 5) crosses_below sma(close, 20)')
+    same = np.array_equal(cross.signals(df), MovingAverageCrossStrategy(5, 20).signals(df))
+    print(f"Regra de cruzamento == MovingAverageCrossStrategy(5, 20): {same}")
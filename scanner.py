@@ -0,0 +1,188 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import indicators
+from candle_window import CandleStore, interval_to_ms
+
+logger = logging.getLogger('TradingBot.Scanner')
+
+# =============================================================================
+# Scanner de sinais em todos os pares de uma vez
+# -----------------------------------------------------------------------------
+# 1. Um único get_ticker() traz preço e volume de todos os pares.
+# 2. Os candles fechados ficam num CandleStore local; a cada scan só os candles
+#    novos de cada par são buscados (em paralelo, limit pequeno).
+# 3. Os fechamentos são empilhados numa matriz (símbolos x tempo), com o preço
+#    atual como última coluna (igual ao candle em andamento do get_klines), e os
+#    indicadores de MovingAverageCrossStrategy, calcular_rsi e Bollinger são
+#    calculados para todos os símbolos numa só passada.
+# =============================================================================
+
+
+class MarketScanner:
+    """
+    Procura cruzamentos de SMA, RSI extremo e rompimentos de Bollinger em
+    centenas de pares ao mesmo tempo e retorna os candidatos ordenados.
+    """
+    def __init__(self, client, quote_asset: str = 'USDT', interval: str = '1m',
+                 lookback: int = 100, max_symbols: int = 300, store: CandleStore = None,
+                 short_window: int = 5, long_window: int = 20, rsi_period: int = 14,
+                 rsi_buy_threshold: float = 30, rsi_sell_threshold: float = 70,
+                 bb_window: int = 20, bb_num_std: float = 2.0, workers: int = 16):
+        """
+        :param client: Client da Binance (ou compatível).
+        :param quote_asset: Moeda de cotação dos pares analisados (ex: USDT).
+        :param interval: Intervalo dos candles.
+        :param lookback: Candles usados no cálculo (incluindo o candle em andamento).
+        :param max_symbols: Analisa apenas os pares de maior volume em 24h.
+        :param store: CandleStore local (ex: CandleStore.load(...)); criado se None.
+        :param workers: Threads usadas para atualizar os candles dos pares.
+        """
+        self.client = client
+        self.quote_asset = quote_asset
+        self.interval = interval
+        self.lookback = lookback
+        self.max_symbols = max_symbols
+        self.store = store or CandleStore(capacity=lookback)
+        self.short_window = short_window
+        self.long_window = long_window
+        self.rsi_period = rsi_period
+        self.rsi_buy_threshold = rsi_buy_threshold
+        self.rsi_sell_threshold = rsi_sell_threshold
+        self.bb_window = bb_window
+        self.bb_num_std = bb_num_std
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='Scanner')
+
+    # -------------------------
+    # Dados
+    # -------------------------
+    def get_universe(self):
+        """
+        Retorna {símbolo: preço atual} dos pares com a moeda de cotação
+        configurada, limitados aos `max_symbols` de maior volume em 24h.
+        """
+        tickers = [t for t in self.client.get_ticker() if t['symbol'].endswith(self.quote_asset)]
+        tickers.sort(key=lambda t: float(t['quoteVolume']), reverse=True)
+        return {t['symbol']: float(t['lastPrice']) for t in tickers[:self.max_symbols]}
+
+    def _refresh_symbol(self, symbol: str):
+        window = self.store.window(symbol)
+        # Histórico completo só na primeira vez; depois, só os candles mais recentes
+        full = len(window) < self.lookback or window.last_open_time is None
+        try:
+            klines = self.client.get_klines(symbol=symbol, interval=self.interval,
+                                            limit=self.lookback + 1 if full else 5)
+            # Buraco entre a janela (ex: candles.npz antigo) e os candles novos: recarrega tudo,
+            # como TradingBot.update_window, para não emendar séries de épocas diferentes
+            if not full and klines and float(klines[0][0]) > window.last_open_time + interval_to_ms(self.interval):
+                logger.info(f"{symbol}: candles faltando na janela; recarregando histórico completo.")
+                window.clear()
+                klines = self.client.get_klines(symbol=symbol, interval=self.interval, limit=self.lookback + 1)
+        except Exception as e:
+            logger.warning(f"Falha ao atualizar {symbol}: {e}")
+            return
+        window.append_klines(klines)
+
+    def refresh(self, symbols):
+        """Atualiza o CandleStore com os candles fechados de cada símbolo, em paralelo."""
+        list(self._pool.map(self._refresh_symbol, symbols))
+
+    # -------------------------
+    # Scan
+    # -------------------------
+    def scan(self, refresh: bool = True, top: int = 20):
+        """
+        Executa o scan completo e retorna os `top` candidatos, do mais forte
+        para o mais fraco. Cada candidato é um dicionário com símbolo, lado
+        ('buy'/'sell'), sinais, indicadores e score.
+        """
+        start = time.perf_counter()
+        prices = self.get_universe()
+        if refresh:
+            self.refresh(list(prices))
+        fetched = time.perf_counter()
+
+        history = self.lookback - 1
+        symbols = [s for s in prices if s in self.store and len(self.store.window(s)) >= history]
+        if not symbols:
+            return []
+
+        closes = np.empty((len(symbols), self.lookback), dtype=np.float64)
+        self.store.closes_matrix(symbols, history, out=closes[:, :-1])
+        closes[:, -1] = [prices[s] for s in symbols]
+
+        candidates = self.evaluate(symbols, closes)[:top]
+        logger.info(f"Scan de {len(symbols)} pares: dados {fetched - start:.3f}s, "
+                    f"cálculo {time.perf_counter() - fetched:.3f}s, {len(candidates)} candidatos.")
+        return candidates
+
+    def evaluate(self, symbols, closes: np.ndarray):
+        """
+        Calcula os indicadores de todos os símbolos de uma vez sobre a matriz
+        `closes` (símbolos x tempo) e retorna os candidatos ordenados por score.
+        """
+        ma_short = indicators.sma(closes, self.short_window)
+        ma_long = indicators.sma(closes, self.long_window)
+        golden = indicators.crosses_above(ma_short[:, -2:], ma_long[:, -2:])[:, -1]
+        death = indicators.crosses_below(ma_short[:, -2:], ma_long[:, -2:])[:, -1]
+
+        rsi_last = indicators.rsi(closes, self.rsi_period)[:, -1]
+        oversold = rsi_last < self.rsi_buy_threshold
+        overbought = rsi_last > self.rsi_sell_threshold
+
+        middle, upper, lower = indicators.bollinger(closes[:, -self.bb_window:], self.bb_window,
+                                                    self.bb_num_std)
+        last = closes[:, -1]
+        band_width = upper[:, -1] - lower[:, -1]
+        # Posição do preço dentro das bandas: 0 = banda inferior, 1 = banda superior
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb_position = np.where(band_width > 0, (last - lower[:, -1]) / band_width, 0.5)
+        below_band = last < lower[:, -1]
+        above_band = last > upper[:, -1]
+
+        # Score: cada sinal vale 1, mais o quanto o RSI/preço passaram do limite
+        buy_score = (golden * 1.0 + oversold + below_band
+                     + np.clip(self.rsi_buy_threshold - rsi_last, 0, None) / 10
+                     + np.clip(-bb_position, 0, None))
+        sell_score = (death * 1.0 + overbought + above_band
+                      + np.clip(rsi_last - self.rsi_sell_threshold, 0, None) / 10
+                      + np.clip(bb_position - 1, 0, None))
+        score = np.maximum(buy_score, sell_score)
+
+        candidates = []
+        for i in np.flatnonzero(score > 0)[np.argsort(-score[score > 0], kind='stable')]:
+            is_buy = buy_score[i] >= sell_score[i]
+            if is_buy:
+                signals = [name for name, hit in (('sma_cross', golden[i]), ('rsi', oversold[i]),
+                                                  ('bollinger', below_band[i])) if hit]
+            else:
+                signals = [name for name, hit in (('sma_cross', death[i]), ('rsi', overbought[i]),
+                                                  ('bollinger', above_band[i])) if hit]
+            candidates.append({
+                'symbol': symbols[i],
+                'side': 'buy' if is_buy else 'sell',
+                'signals': signals,
+                'price': float(last[i]),
+                'rsi': float(rsi_last[i]),
+                'ma_short': float(ma_short[i, -1]),
+                'ma_long': float(ma_long[i, -1]),
+                'bb_position': float(bb_position[i]),
+                'score': float(score[i]),
+            })
+        return candidates
+
+
+if __name__ == '__main__':
+    import os
+    from binance.client import Client
+
+    store_path = os.environ.get('SCANNER_STORE', 'candles.npz')
+    store = CandleStore.load(store_path, capacity=100) if os.path.exists(store_path) else None
+    scanner = MarketScanner(Client(os.environ.get('binance_api'), os.environ.get('binance_secret')),
+                            store=store)
+    for candidate in scanner.scan():
+        print(candidate)
+    scanner.store.save(store_path)
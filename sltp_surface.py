@@ -0,0 +1,140 @@
+import logging
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+logger = logging.getLogger('TradingBot.SLTPSurface')
+
+# =============================================================================
+# Superfície de stop-loss / take-profit
+# -----------------------------------------------------------------------------
+# Para cada entrada (sinal de compra da estratégia, entrada no fechamento do
+# candle) olhamos os `horizon` candles seguintes. Com a mínima acumulada
+# (cummin) e a máxima acumulada (cummax) desde a entrada, o candle em que cada
+# nível de stop/alvo é tocado sai de uma comparação em broadcasting:
+#     candles até o stop s = soma(cummin_low > -s)     -> (entradas x stops)
+#     candles até o alvo t = soma(cummax_high < t)     -> (entradas x alvos)
+# Comparando as duas matrizes em broadcasting obtemos o resultado de todos os
+# pares (stop, alvo) de uma vez, sem laço por par.
+# Convenções: se stop e alvo são tocados no mesmo candle, conta o stop
+# (conservador); o stop executa no preço do stop (sem gap); sem toque até o
+# horizonte, sai no fechamento do último candle.
+# =============================================================================
+
+
+def entry_indices(strategy, df: pd.DataFrame) -> np.ndarray:
+    """Índices dos candles com sinal de compra da estratégia (Strategy.signals)."""
+    return np.flatnonzero(strategy.signals(df) == 1)
+
+
+def _forward_windows(values: np.ndarray, entries: np.ndarray, horizon: int) -> np.ndarray:
+    """(entradas x horizon) com os valores dos candles seguintes a cada entrada (NaN após o fim)."""
+    padded = np.concatenate([values, np.full(horizon, np.nan)])
+    return sliding_window_view(padded[1:], horizon)[entries]
+
+
+def sltp_surface(df: pd.DataFrame, entries, stop_losses, take_profits, horizon: int = 240,
+                 fee: float = 0.001, chunk_size: int = 512) -> dict:
+    """
+    Avalia todos os pares (stop, alvo) para as entradas informadas.
+
+    :param df: Candles com colunas 'high', 'low' e 'close'.
+    :param entries: Índices das entradas (ex: entry_indices(strategy, df)).
+    :param stop_losses: Distâncias de stop em fração (0.02 => stop_loss_multiplier 0.98).
+    :param take_profits: Distâncias de alvo em fração (0.02 => take_profit_multiplier 1.02).
+    :param horizon: Máximo de candles mantendo a posição.
+    :param fee: Taxa por lado (descontada duas vezes por trade).
+    :param chunk_size: Entradas processadas por vez (limita a memória do broadcasting).
+    :return: Dicionário com as grades e matrizes (stops x alvos): expectancy,
+             take_profit_rate, stop_loss_rate, timeout_rate, avg_bars e trades.
+    """
+    stop_losses = np.asarray(stop_losses, dtype=np.float64)
+    take_profits = np.asarray(take_profits, dtype=np.float64)
+    entries = np.asarray(entries, dtype=np.int64)
+    entries = entries[entries < len(df) - 1]    # Precisa de ao menos um candle depois da entrada
+    n_s, n_t = len(stop_losses), len(take_profits)
+
+    shape = (n_s, n_t)
+    sum_ret = np.zeros(shape)
+    tp_hits = np.zeros(shape)
+    sl_hits = np.zeros(shape)
+    bars_held = np.zeros(shape)
+
+    high = df['high'].to_numpy(dtype=np.float64)
+    low = df['low'].to_numpy(dtype=np.float64)
+    close = df['close'].to_numpy(dtype=np.float64)
+
+    for chunk_start in range(0, len(entries), chunk_size):
+        chunk = entries[chunk_start:chunk_start + chunk_size]
+        entry_price = close[chunk][:, None]
+
+        low_rel = _forward_windows(low, chunk, horizon) / entry_price - 1
+        high_rel = _forward_windows(high, chunk, horizon) / entry_price - 1
+        close_w = _forward_windows(close, chunk, horizon)
+
+        # Candles disponíveis após cada entrada (o fim dos dados encurta o horizonte)
+        available = np.minimum(horizon, len(df) - 1 - chunk)
+        worst = np.fmin.accumulate(np.nan_to_num(low_rel, nan=np.inf), axis=1)
+        best = np.fmax.accumulate(np.nan_to_num(high_rel, nan=-np.inf), axis=1)
+
+        # Candle (0-based) do primeiro toque; `available` = não tocou
+        sl_bar = (worst[:, None, :] > -stop_losses[None, :, None]).sum(axis=2)     # (e, s)
+        tp_bar = (best[:, None, :] < take_profits[None, :, None]).sum(axis=2)      # (e, t)
+        sl_bar = np.minimum(sl_bar, available[:, None])
+        tp_bar = np.minimum(tp_bar, available[:, None])
+
+        timeout_ret = close_w[np.arange(len(chunk)), available - 1] / close[chunk] - 1
+
+        sl_b = sl_bar[:, :, None]                                     # (e, s, 1)
+        tp_b = tp_bar[:, None, :]                                     # (e, 1, t)
+        avail = available[:, None, None]
+        stopped = (sl_b < avail) & (sl_b <= tp_b)
+        target = (tp_b < avail) & (tp_b < sl_b)
+        ret = np.where(stopped, -stop_losses[None, :, None],
+                       np.where(target, take_profits[None, None, :], timeout_ret[:, None, None]))
+
+        sum_ret += ret.sum(axis=0) - 2 * fee * len(chunk)
+        sl_hits += stopped.sum(axis=0)
+        tp_hits += target.sum(axis=0)
+        bars_held += (np.minimum(np.minimum(sl_b, tp_b), avail - 1) + 1).sum(axis=0)
+
+    n = max(len(entries), 1)
+    result = {
+        'stop_losses': stop_losses,
+        'take_profits': take_profits,
+        'trades': len(entries),
+        'expectancy': sum_ret / n,
+        'take_profit_rate': tp_hits / n,
+        'stop_loss_rate': sl_hits / n,
+        'timeout_rate': 1 - (tp_hits + sl_hits) / n,
+        'avg_bars': bars_held / n,
+    }
+    if len(entries):
+        i, j = np.unravel_index(np.argmax(result['expectancy']), shape)
+        logger.info(f"Superfície SL/TP: {len(entries)} entradas, melhor par "
+                    f"stop={stop_losses[i]:.4f} (x{1 - stop_losses[i]:.4f}) "
+                    f"alvo={take_profits[j]:.4f} (x{1 + take_profits[j]:.4f}), "
+                    f"expectativa {result['expectancy'][i, j] * 100:.3f}% por trade")
+    return result
+
+
+def surface_frame(result: dict, metric: str = 'expectancy') -> pd.DataFrame:
+    """Matriz da métrica como DataFrame (linhas = stop, colunas = alvo), pronta para heatmap."""
+    return pd.DataFrame(result[metric],
+                        index=pd.Index(result['stop_losses'], name='stop_loss'),
+                        columns=pd.Index(result['take_profits'], name='take_profit'))
+
+
+if __name__ == '__main__':
+    import os
+    from tradingbot import TradingBot, MovingAverageCrossStrategy
+
+    strategy = MovingAverageCrossStrategy(short_window=5, long_window=20)
+    bot = TradingBot(os.environ.get('binance_api'), os.environ.get('binance_secret'), strategy,
+                     testnet=False)
+    df = bot.get_historical_data(lookback=1000)
+    result = sltp_surface(df, entry_indices(strategy, df),
+                          stop_losses=np.arange(0.0025, 0.0501, 0.0025),
+                          take_profits=np.arange(0.0025, 0.1001, 0.0025))
+    print(surface_frame(result).round(5).to_string())
@@ -0,0 +1,313 @@
+import heapq
+import logging
+import math
+import random
+import threading
+import time
+
+logger = logging.getLogger('TradingBot.StopEngine')
+
+# =============================================================================
+# Motor de stops no lado do cliente, acionado por ticks
+# -----------------------------------------------------------------------------
+# Em vez de checar stop/take uma vez por minuto no fechamento do candle
+# (Trading_Bot2.shouldSell), cada trade/bookTicker recebido passa por
+# on_price(). Para cada símbolo guardamos apenas os níveis agregados das
+# posições abertas (maior stop, menor take, máxima desde a entrada, próximo
+# prazo de time-stop): na grande maioria dos ticks a checagem são três
+# comparações. Só quando um nível é tocado as posições são percorridas.
+# =============================================================================
+
+
+class StopRule:
+    """
+    Regras de saída de uma posição comprada.
+    :param stop_loss_pct: Stop fixo abaixo da entrada (0.05 => -5%).
+    :param take_profit_pct: Alvo acima da entrada (0.10 => +10%). None desliga.
+    :param trailing_pct: Stop móvel abaixo da máxima desde a entrada. None desliga.
+    :param break_even_pct: Ao subir essa porcentagem, o stop vai para o preço de entrada.
+    :param max_hold_s: Time-stop: encerra a posição após esse tempo (segundos).
+    """
+    __slots__ = ('stop_loss_pct', 'take_profit_pct', 'trailing_pct', 'break_even_pct', 'max_hold_s')
+
+    def __init__(self, stop_loss_pct: float = 0.05, take_profit_pct: float = 0.10,
+                 trailing_pct: float = None, break_even_pct: float = None, max_hold_s: float = None):
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.trailing_pct = trailing_pct
+        self.break_even_pct = break_even_pct
+        self.max_hold_s = max_hold_s
+
+
+class TrackedPosition:
+    """Posição acompanhada pelo StopEngine, com o stop corrente."""
+    __slots__ = ('symbol', 'quantity', 'entry_price', 'opened_at', 'rule',
+                 'initial_stop', 'stop_price', 'take_price', 'break_even_price', 'deadline',
+                 'high_water', 'open')
+
+    def __init__(self, symbol, quantity, entry_price, opened_at, rule: StopRule):
+        self.symbol = symbol
+        self.quantity = quantity
+        self.entry_price = entry_price
+        self.opened_at = opened_at
+        self.rule = rule
+        self.initial_stop = entry_price * (1 - rule.stop_loss_pct) if rule.stop_loss_pct else -math.inf
+        self.stop_price = self.initial_stop
+        self.take_price = entry_price * (1 + rule.take_profit_pct) if rule.take_profit_pct else math.inf
+        self.break_even_price = (entry_price * (1 + rule.break_even_pct)
+                                 if rule.break_even_pct else math.inf)
+        self.deadline = opened_at + rule.max_hold_s if rule.max_hold_s else math.inf
+        self.high_water = entry_price
+        self.open = True
+
+    def ratchet(self, price: float):
+        """Atualiza trailing e break-even após uma nova máxima."""
+        self.high_water = price
+        if self.rule.trailing_pct:
+            self.stop_price = max(self.stop_price, price * (1 - self.rule.trailing_pct))
+        if price >= self.break_even_price:
+            self.stop_price = max(self.stop_price, self.entry_price)
+
+    @property
+    def stop_reason(self) -> str:
+        """Qual regra definiu o stop corrente."""
+        if self.stop_price == self.entry_price:
+            return 'break_even'
+        if self.stop_price > self.initial_stop:
+            return 'trailing_stop'
+        return 'stop_loss'
+
+
+class _SymbolLevels:
+    """Níveis agregados das posições de um símbolo."""
+    __slots__ = ('positions', 'max_stop', 'min_take', 'min_ratchet', 'next_deadline')
+
+    def __init__(self):
+        self.positions = []
+        self.refresh()
+
+    def refresh(self):
+        positions = self.positions
+        self.max_stop = max((p.stop_price for p in positions), default=-math.inf)
+        self.min_take = min((p.take_price for p in positions), default=math.inf)
+        # Preço a partir do qual algum stop precisa subir (nova máxima com trailing/break-even)
+        self.min_ratchet = min((p.high_water for p in positions
+                                if p.rule.trailing_pct
+                                or (p.break_even_price < math.inf and p.stop_price < p.entry_price)),
+                               default=math.inf)
+        self.next_deadline = min((p.deadline for p in positions), default=math.inf)
+
+
+class StopEngine:
+    """
+    Acompanha posições e dispara uma saída a mercado assim que um tick
+    rompe o stop, o take-profit ou o time-stop.
+    """
+    def __init__(self, client=None, on_exit=None, clock=time.time):
+        """
+        :param client: Client da Binance usado para a venda a mercado (order_market_sell).
+        :param on_exit: Callback alternativo on_exit(position, reason, price); substitui a ordem.
+        :param clock: Função de tempo (segundos) usada quando o tick não traz timestamp.
+        """
+        self.client = client
+        self.on_exit = on_exit
+        self.clock = clock
+        self.exits = []
+        self._levels = {}
+        self._deadlines = []
+        self._lock = threading.RLock()
+
+    # -------------------------
+    # Posições
+    # -------------------------
+    def add_position(self, symbol: str, quantity: float, entry_price: float,
+                     rule: StopRule = None, opened_at: float = None) -> TrackedPosition:
+        position = TrackedPosition(symbol, quantity, entry_price,
+                                   self.clock() if opened_at is None else opened_at,
+                                   rule or StopRule())
+        with self._lock:
+            levels = self._levels.setdefault(symbol, _SymbolLevels())
+            levels.positions.append(position)
+            levels.refresh()
+            if position.deadline < math.inf:
+                heapq.heappush(self._deadlines, (position.deadline, id(position), position))
+        logger.info(f"Stop armado para {symbol}: qtd={quantity} entrada={entry_price} "
+                    f"stop={position.stop_price:.8g} take={position.take_price:.8g}")
+        return position
+
+    def remove_position(self, position: TrackedPosition):
+        with self._lock:
+            levels = self._levels.get(position.symbol)
+            if levels and position in levels.positions:
+                levels.positions.remove(position)
+                levels.refresh()
+                if not levels.positions:
+                    del self._levels[position.symbol]
+            position.open = False
+
+    def remove_symbol(self, symbol: str):
+        """Desarma todas as posições do símbolo (ex: o bot vendeu por outro motivo)."""
+        with self._lock:
+            levels = self._levels.pop(symbol, None)
+            for position in levels.positions if levels else ():
+                position.open = False
+
+    def positions(self, symbol: str = None):
+        with self._lock:
+            if symbol is not None:
+                levels = self._levels.get(symbol)
+                return list(levels.positions) if levels else []
+            return [p for levels in self._levels.values() for p in levels.positions]
+
+    # -------------------------
+    # Ticks
+    # -------------------------
+    def on_price(self, symbol: str, price: float, timestamp: float = None):
+        """Processa um preço do símbolo. Caminho rápido: apenas comparações."""
+        received = time.perf_counter()
+        levels = self._levels.get(symbol)
+        if levels is not None and (price <= levels.max_stop or price >= levels.min_take
+                                   or price > levels.min_ratchet):
+            with self._lock:
+                self._check_levels(symbol, price, received)
+        if self._deadlines:
+            now = self.clock() if timestamp is None else timestamp
+            if now >= self._deadlines[0][0]:
+                self.check_time_stops(now, price_by_symbol={symbol: price})
+
+    def _check_levels(self, symbol: str, price: float, received: float):
+        levels = self._levels.get(symbol)
+        if levels is None:
+            return
+        triggered = []
+        for position in levels.positions:
+            if price > position.high_water:
+                position.ratchet(price)
+            if price <= position.stop_price:
+                triggered.append((position, position.stop_reason))
+            elif price >= position.take_price:
+                triggered.append((position, 'take_profit'))
+        if triggered:
+            for position, _ in triggered:
+                levels.positions.remove(position)
+                position.open = False
+            if not levels.positions:
+                del self._levels[symbol]
+        levels.refresh()
+        for position, reason in triggered:
+            self._fire(position, reason, price, received)
+
+    def check_time_stops(self, now: float = None, price_by_symbol: dict = None):
+        """Encerra as posições cujo time-stop venceu. Pode ser chamado por um timer."""
+        now = self.clock() if now is None else now
+        received = time.perf_counter()
+        expired = []
+        with self._lock:
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, _, position = heapq.heappop(self._deadlines)
+                if position.open:
+                    levels = self._levels.get(position.symbol)
+                    if levels:
+                        levels.positions.remove(position)
+                        levels.refresh()
+                        if not levels.positions:
+                            del self._levels[position.symbol]
+                    position.open = False
+                    expired.append(position)
+        for position in expired:
+            price = (price_by_symbol or {}).get(position.symbol, position.high_water)
+            self._fire(position, 'time_stop', price, received)
+
+    def on_trade_message(self, msg: dict):
+        """Callback para start_trade_socket / start_aggtrade_socket."""
+        msg = msg.get('data', msg)
+        if msg.get('e') == 'error':
+            logger.error(f"Erro no stream de trades: {msg}")
+            return
+        self.on_price(msg['s'], float(msg['p']), msg['T'] / 1000)
+
+    def on_book_ticker_message(self, msg: dict):
+        """Callback para start_symbol_book_ticker_socket. Posições compradas saem pelo bid."""
+        msg = msg.get('data', msg)
+        if msg.get('e') == 'error':
+            logger.error(f"Erro no stream de bookTicker: {msg}")
+            return
+        self.on_price(msg['s'], float(msg['b']))
+
+    def attach(self, twm, symbol: str, stream: str = 'trade'):
+        """
+        Assina o stream do símbolo num ThreadedWebsocketManager já iniciado.
+        :param stream: 'trade' ou 'bookTicker'.
+        """
+        if stream == 'trade':
+            return twm.start_trade_socket(callback=self.on_trade_message, symbol=symbol)
+        if stream == 'bookTicker':
+            return twm.start_symbol_book_ticker_socket(callback=self.on_book_ticker_message,
+                                                       symbol=symbol)
+        raise ValueError(f"Stream desconhecido: {stream}")
+
+    # -------------------------
+    # Saída
+    # -------------------------
+    def _fire(self, position: TrackedPosition, reason: str, price: float, received: float):
+        order = None
+        try:
+            if self.on_exit is not None:
+                order = self.on_exit(position, reason, price)
+            elif self.client is not None:
+                order = self.client.order_market_sell(symbol=position.symbol, quantity=position.quantity)
+        except Exception as e:
+            logger.error(f"Erro ao enviar saída ({reason}) de {position.symbol}: {e}")
+        latency_ms = (time.perf_counter() - received) * 1000
+        self.exits.append({
+            'symbol': position.symbol,
+            'reason': reason,
+            'price': price,
+            'quantity': position.quantity,
+            'entry_price': position.entry_price,
+            'stop_price': position.stop_price,
+            'latency_ms': latency_ms,
+            'order': order,
+        })
+        logger.info(f"Saída {reason} em {position.symbol} a {price} "
+                    f"(entrada {position.entry_price}, {latency_ms:.2f} ms após o tick)")
+
+
+# =============================================================================
+# Stream simulado (testes e benchmarks)
+# =============================================================================
+class SimulatedTickStream:
+    """
+    Gera mensagens no formato do stream de trades da Binance a partir de uma
+    lista de preços ou de um passeio aleatório, para alimentar o StopEngine
+    sem conexão.
+    """
+    def __init__(self, symbol: str, prices, start_ms: int = 1_700_000_000_000, step_ms: int = 100):
+        self.symbol = symbol
+        self.prices = list(prices)
+        self.start_ms = start_ms
+        self.step_ms = step_ms
+
+    @classmethod
+    def random_walk(cls, symbol: str, start_price: float, ticks: int, volatility: float = 0.0005,
+                    seed: int = None, **kwargs) -> 'SimulatedTickStream':
+        rng = random.Random(seed)
+        prices, price = [], start_price
+        for _ in range(ticks):
+            price *= math.exp(rng.gauss(0, volatility))
+            prices.append(price)
+        return cls(symbol, prices, **kwargs)
+
+    def messages(self):
+        for i, price in enumerate(self.prices):
+            ts = self.start_ms + i * self.step_ms
+            yield {'e': 'trade', 'E': ts, 's': self.symbol, 't': i, 'p': f"{price:.8f}",
+                   'q': '0.01', 'T': ts, 'm': False}
+
+    def run(self, engine: StopEngine) -> int:
+        """Entrega todas as mensagens ao engine, em sequência. Retorna quantas foram entregues."""
+        count = 0
+        for msg in self.messages():
+            engine.on_trade_message(msg)
+            count += 1
+        return count
@@ -0,0 +1,275 @@
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from consensus import ConsensusStrategy
+from rules import RuleStrategy
+from tradingbot import Strategy, MovingAverageCrossStrategy, RSIStrategy, BollingerStrategy
+
+logger = logging.getLogger('TradingBot.StrategyConfig')
+
+# =============================================================================
+# Configuração de estratégia em arquivo, com recarga a quente
+# -----------------------------------------------------------------------------
+# O arquivo JSON descreve a estratégia e os parâmetros do bot:
+#   {
+#     "strategy": {"type": "MovingAverageCrossStrategy",
+#                  "params": {"short_window": 5, "long_window": 20}},
+#     "bot": {"stop_loss_multiplier": 0.98, "take_profit_multiplier": 1.02}
+#   }
+# Um ConsensusStrategy lista os membros em "members" (mesmo formato) e indica
+# vetos/opcionais pelo índice do membro ("vetoes": [1]).
+#
+# Uma thread observa o arquivo (mtime e conteúdo); cada versão nova é
+# validada montando a estratégia e fica pendente. O bot aplica a pendente no
+# próximo limite de candle (apply_pending), e a aplicação preserva o estado:
+#   - mesma classe: os parâmetros mudam no próprio objeto (um parâmetro que
+#     saiu do arquivo volta ao padrão do construtor); membros de um consenso
+#     que não mudaram continuam sendo os mesmos objetos;
+#   - a janela de candles em memória é mantida (só cresce, copiando os candles,
+#     se a nova estratégia exigir mais histórico) e nada é buscado de novo;
+#   - posição, livro de fills, watchdog e logs não são tocados.
+# Arquivo inválido não derruba o bot: o erro vai para o log e a configuração
+# anterior continua valendo.
+# =============================================================================
+STRATEGY_TYPES = {cls.__name__: cls for cls in (MovingAverageCrossStrategy, RSIStrategy,
+                                                BollingerStrategy, ConsensusStrategy, RuleStrategy)}
+
+# Atributos do TradingBot que podem ser alterados pelo arquivo
+BOT_PARAMS = ('quantity', 'use_risk_management', 'stop_loss_multiplier', 'take_profit_multiplier')
+
+
+class ConfigError(ValueError):
+    """Configuração inválida (tipo desconhecido, parâmetro inexistente, ...)."""
+
+
+def register_strategy(cls):
+    """Disponibiliza uma classe de Strategy no arquivo de configuração (pode ser usado como decorator)."""
+    STRATEGY_TYPES[cls.__name__] = cls
+    return cls
+
+
+def _strategy_class(spec: dict):
+    try:
+        return STRATEGY_TYPES[spec['type']]
+    except KeyError:
+        raise ConfigError(f"Tipo de estratégia desconhecido: {spec.get('type')!r} "
+                          f"(disponíveis: {', '.join(STRATEGY_TYPES)}).")
+
+
+def _consensus_kwargs(spec: dict, members) -> dict:
+    params = dict(spec.get('params', {}))
+    for key in ('vetoes', 'optional'):
+        try:
+            params[key] = [members[i] for i in params.get(key, ())]
+        except (IndexError, TypeError):
+            raise ConfigError(f"'{key}' deve listar índices de membros (0 a {len(members) - 1}).")
+    return params
+
+
+def build_strategy(spec: dict) -> Strategy:
+    """Monta a estratégia descrita em `spec` ({'type', 'params'[, 'members']})."""
+    cls = _strategy_class(spec)
+    try:
+        if cls is ConsensusStrategy:
+            members = [build_strategy(m) for m in spec.get('members', ())]
+            return ConsensusStrategy(members, **_consensus_kwargs(spec, members))
+        return cls(**spec.get('params', {}))
+    except (TypeError, ValueError) as e:
+        raise ConfigError(f"Parâmetros inválidos para {cls.__name__}: {e}")
+
+
+def reconcile_strategy(current: Strategy, spec: dict):
+    """
+    Aplica `spec` sobre a estratégia atual preservando os objetos que não mudaram.
+    Retorna (estratégia, lista de mudanças). A estratégia retornada pode ser a
+    própria `current` (parâmetros alterados no lugar).
+    """
+    cls = _strategy_class(spec)
+    if type(current) is not cls:
+        return build_strategy(spec), [f"{type(current).__name__} -> {cls.__name__}"]
+
+    if cls is ConsensusStrategy:
+        specs = spec.get('members', ())
+        members, changes = [], []
+        for i, member_spec in enumerate(specs):
+            if i < len(current.members):
+                member, member_changes = reconcile_strategy(current.members[i], member_spec)
+                changes += [f"membro {i}: {c}" for c in member_changes]
+            else:
+                member = build_strategy(member_spec)
+                changes.append(f"membro {i}: novo {type(member).__name__}")
+            members.append(member)
+        if len(specs) < len(current.members):
+            changes.append(f"{len(current.members) - len(specs)} membro(s) removido(s)")
+        rebuilt = ConsensusStrategy(members, **_consensus_kwargs(spec, members))
+        for attr in ('weights', 'veto_mask', 'optional_mask', 'buy_quorum', 'sell_quorum', 'min_votes'):
+            old, new = getattr(current, attr), getattr(rebuilt, attr)
+            if not np.array_equal(old, new):
+                changes.append(f"{attr}: {np.asarray(old).tolist()} -> {np.asarray(new).tolist()}")
+        rebuilt.skip_optional = current.skip_optional
+        return rebuilt, changes
+
+    params = spec.get('params', {})
+    target = _constructor_params(cls, params)
+    if target is None or not all(hasattr(current, key) for key in target):
+        # Parâmetros que não viram atributos de mesmo nome: não dá para alterar no lugar
+        return build_strategy(spec), [f"{cls.__name__} remontada"]
+    changes = []
+    for key, value in target.items():
+        old = getattr(current, key)
+        if old != value:
+            setattr(current, key, value)
+            changes.append(f"{key}: {old} -> {value}" + ('' if key in params else ' (padrão)'))
+    return current, changes
+
+
+def _constructor_params(cls, params: dict):
+    """
+    Valor de cada parâmetro do construtor de `cls`: o do arquivo ou, se omitido,
+    o padrão. None se o construtor aceita **kwargs (não há lista fechada).
+    """
+    signature = inspect.signature(cls)
+    if any(p.kind is p.VAR_KEYWORD for p in signature.parameters.values()):
+        return None
+    unknown = set(params) - set(signature.parameters)
+    if unknown:
+        raise ConfigError(f"{cls.__name__} não tem o(s) parâmetro(s) {', '.join(sorted(unknown))}.")
+    target = {}
+    for name, parameter in signature.parameters.items():
+        if parameter.kind is parameter.VAR_POSITIONAL:
+            continue
+        if name in params:
+            target[name] = params[name]
+        elif parameter.default is not parameter.empty:
+            target[name] = parameter.default
+        else:
+            raise ConfigError(f"{cls.__name__}: parâmetro obrigatório {name!r} ausente.")
+    return target
+
+
+class StrategyConfig:
+    """
+    Observa o arquivo de configuração e guarda a última versão válida até o
+    bot aplicá-la no limite do candle.
+    """
+    def __init__(self, path: str, poll_s: float = 1.0):
+        """
+        :param path: Arquivo JSON da configuração.
+        :param poll_s: Intervalo de verificação do arquivo, em segundos.
+        """
+        self.path = path
+        self.poll_s = poll_s
+        self.current = None          # Última configuração aplicada
+        self.reloads = 0
+        self.errors = 0
+        self._pending = None
+        self._digest = None
+        self._stat = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.check()
+
+    # -------------------------
+    # Leitura do arquivo
+    # -------------------------
+    def load(self) -> dict:
+        """Lê e valida o arquivo (monta a estratégia descartável para validar)."""
+        with open(self.path, encoding='utf-8') as f:
+            config = json.load(f)
+        if 'strategy' in config:
+            build_strategy(config['strategy'])
+        unknown = set(config.get('bot', {})) - set(BOT_PARAMS)
+        if unknown:
+            raise ConfigError(f"Parâmetros de bot desconhecidos: {', '.join(sorted(unknown))} "
+                              f"(permitidos: {', '.join(BOT_PARAMS)}).")
+        return config
+
+    def check(self) -> bool:
+        """Verifica o arquivo agora. Retorna True se há uma versão nova pendente."""
+        try:
+            stat = os.stat(self.path)
+        except OSError as e:
+            logger.error(f"Configuração {self.path} inacessível: {e}")
+            return False
+        key = (stat.st_mtime_ns, stat.st_size)
+        if key == self._stat:
+            return False
+        self._stat = key
+        try:
+            with open(self.path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            if digest == self._digest:
+                return False            # Arquivo salvo sem mudanças
+            config = self.load()
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            logger.error(f"Configuração {self.path} inválida; mantendo a anterior: {e}")
+            return False
+        with self._lock:
+            self._digest = digest
+            self._pending = config
+        logger.info(f"Nova configuração de {self.path} será aplicada no próximo candle.")
+        return True
+
+    def watch(self):
+        """Inicia a thread que verifica o arquivo a cada poll_s segundos."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch_loop, name='StrategyConfig', daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch_loop(self):
+        while not self._stop.wait(self.poll_s):
+            self.check()
+
+    def stop(self):
+        self._stop.set()
+
+    # -------------------------
+    # Aplicação (thread do loop, no limite do candle)
+    # -------------------------
+    @property
+    def has_pending(self) -> bool:
+        return self._pending is not None
+
+    def apply_pending(self, bot) -> list:
+        """
+        Aplica a configuração pendente ao TradingBot. Retorna a lista de mudanças
+        (vazia se não havia nada pendente).
+        """
+        with self._lock:
+            config, self._pending = self._pending, None
+        if config is None:
+            return []
+
+        changes = []
+        if 'strategy' in config:
+            try:
+                strategy, strategy_changes = reconcile_strategy(bot.strategy, config['strategy'])
+            except ValueError as e:
+                self.errors += 1
+                logger.error(f"Configuração não aplicada: {e}")
+                return []
+            if strategy is not bot.strategy:
+                bot.set_strategy(strategy)
+            else:
+                bot.ensure_window()
+            changes += strategy_changes
+        for key, value in config.get('bot', {}).items():
+            old = getattr(bot, key)
+            if old != value:
+                setattr(bot, key, value)
+                changes.append(f"{key}: {old} -> {value}")
+
+        self.current = config
+        self.reloads += 1
+        if changes:
+            logger.info(f"Configuração recarregada ({bot.symbol}): {'; '.join(changes)}")
+        return changes
@@ -0,0 +1,243 @@
+import itertools
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tradingbot import (MovingAverageCrossStrategy, RSIStrategy, BollingerStrategy,
+                        backtest_signals)
+
+logger = logging.getLogger('TradingBot.StrategySearch')
+
+# =============================================================================
+# Busca de parâmetros por successive halving
+# -----------------------------------------------------------------------------
+# Em vez de testar toda a grade no histórico inteiro:
+#   rodada 0: todos os candidatos nos últimos N candles (trecho curto);
+#   rodada r: só os melhores 1/eta da rodada anterior, num trecho eta vezes
+#             maior, até a última rodada usar o histórico completo.
+# A maior parte da grade é descartada olhando pouco histórico, e o custo total
+# fica perto de (rodadas x custo de uma avaliação completa de cada
+# sobrevivente final) em vez de (candidatos x histórico completo).
+# As avaliações rodam num pool de processos; cada worker recebe os candles
+# uma única vez (initializer), e as tarefas levam só classe e parâmetros.
+# O custo é medido em candles avaliados e em CPU dos workers.
+#
+# O descarte olha só o trecho recente, então não há garantia de chegar ao mesmo
+# top-k da grade completa: um candidato bom no histórico inteiro e ruim no
+# começo do trecho pode sair cedo. Para reduzir isso, cada rodada mantém pelo
+# menos min_survivors (padrão top_k * eta) candidatos, e a concordância com a
+# grade completa é uma métrica medida (top_k_agreement, --compare), não uma
+# propriedade da busca.
+# =============================================================================
+DEFAULT_GRIDS = {
+    MovingAverageCrossStrategy: {'short_window': [3, 5, 8, 10, 13, 20],
+                                 'long_window': [20, 30, 50, 80, 100, 150, 200]},
+    RSIStrategy: {'period': [7, 10, 14, 21], 'buy_threshold': [20, 25, 30, 35],
+                  'sell_threshold': [65, 70, 75, 80]},
+    BollingerStrategy: {'window': [10, 15, 20, 30, 50], 'num_std': [1.5, 2.0, 2.5, 3.0]},
+}
+
+
+def grid(strategy_cls, **param_lists):
+    """Candidatos (classe, parâmetros) do produto cartesiano; descarta MA com curta >= longa."""
+    keys = list(param_lists)
+    candidates = []
+    for values in itertools.product(*(param_lists[k] for k in keys)):
+        params = dict(zip(keys, values))
+        if params.get('short_window', 0) >= params.get('long_window', math.inf):
+            continue
+        candidates.append((strategy_cls, params))
+    return candidates
+
+
+def default_candidates():
+    """Grade padrão de MA, RSI e Bollinger."""
+    return [c for cls, params in DEFAULT_GRIDS.items() for c in grid(cls, **params)]
+
+
+def describe(candidate) -> str:
+    cls, params = candidate
+    return f"{cls.__name__}({', '.join(f'{k}={v}' for k, v in params.items())})"
+
+
+# -------------------------
+# Avaliação (processo worker)
+# -------------------------
+_DF = None
+
+
+def _init_worker(df: pd.DataFrame):
+    global _DF
+    _DF = df
+
+
+def _evaluate(task):
+    """Capital final do candidato nos últimos `candles` candles. Retorna (índice, capital, CPU)."""
+    index, cls, params, candles, initial_capital = task
+    start = time.process_time()
+    df = _DF.iloc[-candles:]
+    capital, _ = backtest_signals(cls(**params).signals(df), df, initial_capital)
+    return index, capital, time.process_time() - start
+
+
+class SuccessiveHalvingSearch:
+    """
+    Successive halving sobre uma grade de estratégias.
+        search = SuccessiveHalvingSearch(default_candidates(), df, eta=3)
+        result = search.run()
+        result['ranking'][:5]
+    """
+    def __init__(self, candidates, df: pd.DataFrame, eta: int = 3, min_candles: int = 2000,
+                 top_k: int = 10, initial_capital: float = 1000.0, workers: int = None,
+                 min_survivors: int = None):
+        """
+        :param candidates: Lista de (classe da estratégia, parâmetros).
+        :param df: Histórico completo (colunas de get_historical_data).
+        :param eta: A cada rodada fica 1/eta dos candidatos e o trecho cresce eta vezes.
+        :param min_candles: Tamanho mínimo do trecho da primeira rodada.
+        :param top_k: Tamanho do top devolvido em result['top'].
+        :param initial_capital: Capital inicial de cada backtest.
+        :param workers: Processos do pool (padrão: número de CPUs).
+        :param min_survivors: Candidatos mínimos mantidos em cada rodada (padrão: top_k * eta).
+        """
+        self.candidates = list(candidates)
+        self.df = df
+        self.eta = eta
+        self.top_k = top_k
+        self.min_survivors = top_k * eta if min_survivors is None else min_survivors
+        self.initial_capital = initial_capital
+        self.workers = workers or os.cpu_count() or 1
+        self.budgets = self._budgets(len(df), min_candles)
+
+    def _budgets(self, total: int, min_candles: int):
+        """Trechos de cada rodada (candles), do menor ao histórico completo."""
+        budgets = [total]
+        while budgets[-1] / self.eta >= min_candles:
+            budgets.append(int(budgets[-1] / self.eta))
+        return budgets[::-1]
+
+    def _evaluate_all(self, pool, indices, candles):
+        tasks = [(i, *self.candidates[i], candles, self.initial_capital) for i in indices]
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        scores, cpu = {}, 0.0
+        for index, capital, cpu_s in pool.map(_evaluate, tasks, chunksize=chunksize):
+            scores[index] = capital
+            cpu += cpu_s
+        return scores, cpu
+
+    def run(self) -> dict:
+        """
+        Executa as rodadas. Retorna ranking final (histórico completo), rodadas e custo:
+        candles avaliados e CPU comparados à grade completa estimada.
+        """
+        survivors = list(range(len(self.candidates)))
+        rounds, evaluated_candles, cpu_total = [], 0, 0.0
+        wall_start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.df,)) as pool:
+            for r, candles in enumerate(self.budgets):
+                scores, cpu = self._evaluate_all(pool, survivors, candles)
+                evaluated_candles += candles * len(survivors)
+                cpu_total += cpu
+                ranked = sorted(survivors, key=lambda i: scores[i], reverse=True)
+                rounds.append({'round': r, 'candles': candles, 'candidates': len(survivors),
+                               'cpu_s': cpu, 'best': describe(self.candidates[ranked[0]]),
+                               'best_capital': scores[ranked[0]]})
+                logger.info(f"Rodada {r}: {len(survivors)} candidatos em {candles} candles "
+                            f"({cpu:.2f}s CPU); melhor {rounds[-1]['best']} -> {scores[ranked[0]]:.2f}")
+                if r == len(self.budgets) - 1:
+                    final_scores = scores
+                    break
+                keep = max(self.min_survivors, math.ceil(len(survivors) / self.eta))
+                survivors = ranked[:keep]
+
+        full_candles = len(self.df) * len(self.candidates)
+        # CPU por candle da rodada final (histórico completo) extrapolado para a grade toda
+        final = rounds[-1]
+        full_cpu = final['cpu_s'] / (final['candidates'] * final['candles']) * full_candles
+        return {
+            'ranking': [(describe(self.candidates[i]), final_scores[i]) for i in ranked],
+            'top': [self.candidates[i] for i in ranked[:self.top_k]],
+            'rounds': rounds,
+            'evaluated_candles': evaluated_candles,
+            'full_grid_candles': full_candles,
+            'cpu_s': cpu_total,
+            'full_grid_cpu_s_estimate': full_cpu,
+            'saved_fraction': 1 - evaluated_candles / full_candles,
+            'wall_s': time.perf_counter() - wall_start,
+        }
+
+
+def grid_search(candidates, df: pd.DataFrame, initial_capital: float = 1000.0, workers: int = None) -> dict:
+    """Grade completa no histórico inteiro (referência para comparar com a busca)."""
+    candidates = list(candidates)
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    tasks = [(i, cls, params, len(df), initial_capital) for i, (cls, params) in enumerate(candidates)]
+    scores, cpu_total = {}, 0.0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(df,)) as pool:
+        for index, capital, cpu in pool.map(_evaluate, tasks, chunksize=max(1, len(tasks) // (workers * 4))):
+            scores[index] = capital
+            cpu_total += cpu
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return {'ranking': [(describe(candidates[i]), scores[i]) for i in ranked],
+            'top': [candidates[i] for i in ranked],
+            'cpu_s': cpu_total, 'wall_s': time.perf_counter() - start}
+
+
+def top_k_agreement(result: dict, full: dict, k: int) -> float:
+    """Fração do top k da grade completa que também está no top k da busca."""
+    found = {describe(c) for c in result['top'][:k]}
+    return sum(describe(c) in found for c in full['top'][:k]) / k
+
+
+def synthetic_history(n: int, seed: int = 0) -> pd.DataFrame:
+    """Candles sintéticos com regimes de tendência (para testes e benchmark)."""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.normal(0, 0.00005, n // 20_000 + 1), 20_000)[:n]
+    close = 30_000 * np.exp(np.cumsum(drift + rng.normal(0, 0.001, n)))
+    return pd.DataFrame({'open_time': np.arange(n) * 60_000, 'open': close, 'high': close,
+                         'low': close, 'close': close, 'volume': np.ones(n)})
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Busca de parâmetros por successive halving.')
+    parser.add_argument('klines', nargs='?', help='CSV de klines (padrão: candles sintéticos)')
+    parser.add_argument('--candles', type=int, default=500_000)
+    parser.add_argument('--eta', type=int, default=3)
+    parser.add_argument('--min-candles', type=int, default=5000)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--compare', action='store_true', help='Roda também a grade completa')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    if args.klines:
+        from features import load_klines_csv
+        df = pd.DataFrame(load_klines_csv(args.klines))
+    else:
+        df = synthetic_history(args.candles)
+    candidates = default_candidates()
+    result = SuccessiveHalvingSearch(candidates, df, eta=args.eta, min_candles=args.min_candles,
+                                     top_k=args.top, workers=args.workers).run()
+    print(f"\n{len(candidates)} candidatos, rodadas: {[r['candles'] for r in result['rounds']]}")
+    for name, capital in result['ranking'][:args.top]:
+        print(f"  {capital:12.2f}  {name}")
+    print(f"Candles avaliados: {result['evaluated_candles']:,} de {result['full_grid_candles']:,} "
+          f"({result['saved_fraction']:.1%} economizado); CPU {result['cpu_s']:.1f}s "
+          f"vs ~{result['full_grid_cpu_s_estimate']:.1f}s da grade completa")
+
+    if args.compare:
+        full = grid_search(candidates, df, workers=args.workers)
+        agreement = top_k_agreement(result, full, args.top)
+        print(f"Grade completa: CPU {full['cpu_s']:.1f}s, melhor {full['ranking'][0][0]}; "
+              f"concordância medida do top {args.top}: {agreement:.0%} "
+              f"({round(agreement * args.top)}/{args.top}); "
+              f"CPU economizada: {1 - result['cpu_s'] / full['cpu_s']:.1%}")
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import IncrementalBacktest, cache_key, strategy_params
+from consensus import ConsensusStrategy
+from rules import RuleStrategy
+from tradingbot import MovingAverageCrossStrategy, RSIStrategy
+
+
+def history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({'open_time': np.arange(n) * 60_000, 'open': close, 'high': close,
+                         'low': close, 'close': close, 'volume': np.ones(n)})
+
+
+@pytest.mark.parametrize('make', [
+    lambda: MovingAverageCrossStrategy(5, 20),
+    lambda: RuleStrategy(buy='sma(close, 5) crosses_above sma(close, 20)',
+                         sell='sma(close, 5) crosses_below sma(close, 20)'),
+    lambda: ConsensusStrategy([MovingAverageCrossStrategy(5, 20), RSIStrategy()], weights=[2, 1]),
+])
+def test_same_strategy_object_reuses_cache(tmp_path, make):
+    df = history(600)
+    strategy = make()
+    bt = IncrementalBacktest(strategy, cache_dir=str(tmp_path), dataset='t')
+    first = bt.run(df.iloc[:400])
+    key = cache_key(strategy, 1000.0, df['open_time'].iloc[0], 't')
+    strategy.should_buy(df.iloc[:400])          # Preenche last_values/last_votes
+    assert cache_key(strategy, 1000.0, df['open_time'].iloc[0], 't') == key
+
+    result = bt.run(df)
+    assert bt.processed == 200
+    bt.extend(history(700).iloc[600:], df['open_time'].iloc[0])
+    assert bt.processed == 100
+    assert first[0] > 0 and result[0] > 0
+
+
+def test_params_distinguish_configurations():
+    ma, rsi = MovingAverageCrossStrategy(), RSIStrategy()
+    plain = ConsensusStrategy([ma, rsi])
+    vetoed = ConsensusStrategy([ma, rsi], vetoes=[rsi])
+    assert strategy_params(plain) != strategy_params(vetoed)
+    assert strategy_params(MovingAverageCrossStrategy(5, 20)) != strategy_params(MovingAverageCrossStrategy(5, 30))
+    assert strategy_params(RuleStrategy(buy='close > 1')) != strategy_params(RuleStrategy(buy='close > 2'))
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from consensus import ConsensusStrategy
+from tradingbot import MovingAverageCrossStrategy, RSIStrategy
+
+
+def history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': np.ones(n)})
+
+
+def counting(member, calls):
+    signals = member.signals
+
+    def wrapped(df):
+        calls.append(type(member).__name__)
+        return signals(df)
+    member.signals = wrapped
+    return member
+
+
+def test_members_evaluated_once_per_candle():
+    calls = []
+    consensus = ConsensusStrategy([counting(MovingAverageCrossStrategy(5, 20), calls),
+                                   counting(RSIStrategy(), calls)])
+    df = history(200)
+    decision = consensus.signals(df)[-1]
+    calls.clear()
+
+    assert consensus.should_buy(df) == (decision == 1)
+    assert consensus.should_sell(df) == (decision == -1)
+    assert len(calls) == 2
+
+    # Novo candle (ou novo DataFrame) invalida a decisão guardada
+    consensus.should_buy(history(201))
+    assert len(calls) == 4
+
+
+def test_skip_optional_invalidates_decision():
+    calls = []
+    rsi = counting(RSIStrategy(), calls)
+    consensus = ConsensusStrategy([counting(MovingAverageCrossStrategy(5, 20), calls), rsi],
+                                  optional=[rsi])
+    df = history(200)
+    consensus.should_buy(df)
+    consensus.skip_optional = True
+    consensus.should_sell(df)
+    assert calls == ['MovingAverageCrossStrategy', 'RSIStrategy', 'MovingAverageCrossStrategy']
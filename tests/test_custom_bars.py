@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from candle_window import CandleWindow
+from custom_bars import (BAR_KINDS, DOLLAR_BARS, TICK_BARS, VOLUME_BARS, CustomBarBuilder,
+                         synthetic_trades, window_feeder)
+
+THRESHOLDS = {TICK_BARS: 50, VOLUME_BARS: 1.0, DOLLAR_BARS: 60_000.0}
+
+
+def agg_trade_messages(prices, qtys, times, symbol='BTCUSDT'):
+    """Stream simulado no formato <symbol>@aggTrade."""
+    for i, (p, q, t) in enumerate(zip(prices, qtys, times)):
+        yield {'e': 'aggTrade', 'E': int(t), 's': symbol, 'a': i, 'p': f"{p:.8f}", 'q': f"{q:.8f}",
+               'f': i, 'l': i, 'T': int(t), 'm': bool(i % 2)}
+
+
+def incremental(kind, prices, qtys, times):
+    builder = CustomBarBuilder(kind, THRESHOLDS[kind])
+    rows = [row for row in map(builder.on_trade, prices, qtys, times) if row is not None]
+    return builder, np.array(rows)
+
+
+@pytest.mark.parametrize('kind', BAR_KINDS)
+def test_incremental_matches_vectorized(kind):
+    prices, qtys, times = synthetic_trades(20_000, seed=3)
+    _, rows = incremental(kind, prices.tolist(), qtys.tolist(), times.tolist())
+    bars = CustomBarBuilder(kind, THRESHOLDS[kind]).build(prices, qtys, times)
+    assert len(rows) == len(bars) > 10
+    np.testing.assert_allclose(rows, bars.to_numpy(dtype=np.float64), rtol=1e-12)
+
+
+@pytest.mark.parametrize('kind', BAR_KINDS)
+def test_build_continues_across_batches(kind):
+    prices, qtys, times = synthetic_trades(10_000, seed=5)
+    whole = CustomBarBuilder(kind, THRESHOLDS[kind]).build(prices, qtys, times)
+    builder = CustomBarBuilder(kind, THRESHOLDS[kind])
+    first = builder.build(prices[:4_000], qtys[:4_000], times[:4_000])
+    # O lote seguinte recomeça no trade após a última barra fechada
+    used = int(first['trades'].sum())
+    second = builder.build(prices[used:], qtys[used:], times[used:])
+    assert len(first) + len(second) == len(whole)
+    np.testing.assert_allclose(np.concatenate([first.to_numpy(dtype=np.float64),
+                                               second.to_numpy(dtype=np.float64)]),
+                               whole.to_numpy(dtype=np.float64))
+
+
+def test_tick_bars_close_every_n_trades():
+    builder = CustomBarBuilder(TICK_BARS, 3)
+    rows = [builder.on_trade(100.0 + i, 1.0, 1_000 + i) for i in range(7)]
+    closed = [row for row in rows if row is not None]
+    assert [row[8] for row in closed] == [3, 3]
+    assert closed[0][:7] == [1_000, 100.0, 102.0, 100.0, 102.0, 3.0, 1_002]
+    assert builder.partial()[8] == 1
+
+
+def test_large_trade_closes_a_single_bar():
+    builder = CustomBarBuilder(VOLUME_BARS, 1.0)
+    assert builder.on_trade(100.0, 0.4, 1) is None
+    row = builder.on_trade(101.0, 3.5, 2)         # Cruza 1, 2 e 3 de uma vez
+    assert row[5] == pytest.approx(3.9)
+    assert builder.bars_emitted == 1
+    assert builder.on_trade(102.0, 0.05, 3) is None   # Próximo múltiplo é 4
+    assert builder.on_trade(102.0, 0.1, 4)[5] == pytest.approx(0.15)
+
+
+def test_bars_in_the_same_ms_get_increasing_open_time():
+    builder = CustomBarBuilder(TICK_BARS, 1)
+    rows = [builder.on_trade(100.0, 1.0, 5_000) for _ in range(3)]
+    open_times = [row[0] for row in rows]
+    assert open_times == sorted(set(open_times))
+    bars = CustomBarBuilder(TICK_BARS, 1).build([100.0] * 3, [1.0] * 3, [5_000] * 3)
+    np.testing.assert_allclose(bars['open_time'], open_times)
+
+
+def test_agg_trade_stream_feeds_window():
+    prices, qtys, times = synthetic_trades(5_000, seed=11)
+    window = CandleWindow(1000)
+    builder = CustomBarBuilder(DOLLAR_BARS, THRESHOLDS[DOLLAR_BARS], on_bar=window_feeder(window))
+    for msg in agg_trade_messages(prices, qtys, times):
+        builder.on_agg_trade_message({'stream': 'btcusdt@aggTrade', 'data': msg})
+    builder.on_agg_trade_message({'e': 'error', 'm': 'desconectado'})
+    assert builder.trades_seen == len(prices)
+    assert len(window) == builder.bars_emitted > 0
+    assert np.all(np.diff(window.open_time) > 0)
+
+
+def test_invalid_kind():
+    with pytest.raises(ValueError):
+        CustomBarBuilder('time', 60)
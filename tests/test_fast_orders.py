@@ -0,0 +1,115 @@
+import pytest
+
+from fast_orders import BinanceAPIError, FastOrderClient, MockExchange
+
+
+@pytest.fixture
+def exchange():
+    exchange = MockExchange(tick_size='0.50000000').start()
+    yield exchange
+    exchange.stop()
+
+
+def make_client(exchange, **kwargs):
+    kwargs.setdefault('api_key', exchange.api_key)
+    kwargs.setdefault('api_secret', exchange.api_secret.decode())
+    return FastOrderClient(base_url=exchange.url, pool_size=2, **kwargs)
+
+
+def test_signed_order_is_accepted_and_timed(exchange):
+    fast = make_client(exchange).warm(symbols=['BTCUSDT'])
+    order = fast.market_order('BTCUSDT', 'BUY', 0.001)
+    assert order['status'] == 'FILLED' and order['executedQty'] == '0.001'
+    report = fast.latency_report()
+    assert report['market_buy']['count'] == 1 and report['market_buy']['errors'] == 0
+    assert report['market_buy']['p50_ms'] > 0
+    fast.close()
+
+
+@pytest.mark.parametrize('kwargs, code', [({'api_secret': 'outro-segredo'}, -1022),
+                                          ({'api_key': 'outra-chave'}, -2014)])
+def test_bad_credentials_are_rejected(exchange, kwargs, code):
+    fast = make_client(exchange, **kwargs)
+    with pytest.raises(BinanceAPIError) as error:
+        fast.market_order('BTCUSDT', 'BUY', 0.001)
+    assert error.value.code == code
+    assert exchange.orders == []
+    fast.close()
+
+
+def test_clock_skew_resyncs_once_and_resends(exchange):
+    exchange.clock_skew_ms = 20_000       # Cliente nunca sincronizou: offset 0
+    fast = make_client(exchange)
+    order = fast.market_order('BTCUSDT', 'BUY', 0.001)
+    assert order['status'] == 'FILLED'
+    assert [a['status'] for a in fast.acks] == [-1021, 'ok']
+    assert fast.time_offset_ms == pytest.approx(20_000, abs=1_000)
+    assert len(exchange.orders) == 1
+    fast.close()
+
+
+def test_cancel_without_open_orders_returns_empty(exchange):
+    fast = make_client(exchange).warm()
+    assert fast.cancel_open_orders('BTCUSDT') == []
+    fast.buy('BTCUSDT', 0.001, reference_price=exchange.price, protect=True)
+    cancelled = fast.cancel_open_orders('BTCUSDT')
+    assert sorted(o['type'] for o in cancelled) == ['LIMIT_MAKER', 'STOP_LOSS_LIMIT']
+    assert fast.cancel_open_orders('BTCUSDT') == []
+    fast.close()
+
+
+@pytest.mark.parametrize('mode', ['otoco', 'sequential'])
+def test_protection_prices_follow_exchange_tick(exchange, mode):
+    fast = make_client(exchange, mode=mode).warm(symbols=['BTCUSDT'])
+    assert fast.tick_size('BTCUSDT') == 0.5
+    result = fast.buy('BTCUSDT', 0.001, reference_price=exchange.price - 0.3)
+    assert float(result['order']['executedQty']) == 0.001
+    prices = [float(o['price']) for o in result['protection']['orderReports'] if o['side'] == 'SELL']
+    assert all(price % 0.5 == 0 for price in prices)
+    fast.close()
+
+
+def test_fok_buy_expires_when_price_moved(exchange):
+    fast = make_client(exchange).warm()
+    result = fast.buy('BTCUSDT', 0.001, reference_price=exchange.price * 0.99)
+    assert float(result['order']['executedQty']) == 0.0
+    assert result['protection']['listOrderStatus'] == 'ALL_DONE'
+    fast.close()
+
+
+def test_non_json_error_body_raises_api_error(exchange):
+    fast = make_client(exchange)
+    exchange.outage = (502, '<html><body>502 Bad Gateway</body></html>')
+    with pytest.raises(BinanceAPIError) as error:
+        fast.market_order('BTCUSDT', 'BUY', 0.001)
+    assert error.value.status == 502 and error.value.code is None
+    assert 'Bad Gateway' in error.value.message
+    exchange.outage = None
+    assert fast.market_order('BTCUSDT', 'BUY', 0.001)['status'] == 'FILLED'
+    fast.close()
+
+
+def test_failed_protection_keeps_the_filled_buy(exchange):
+    exchange.reject_oco = (400, -2010, 'Account has insufficient balance for requested action.')
+    fast = make_client(exchange, mode='sequential').warm(symbols=['BTCUSDT'])
+    result = fast.buy('BTCUSDT', 0.001, reference_price=exchange.price)
+    assert result['order']['status'] == 'FILLED'
+    assert result['protection'] is None
+    assert isinstance(result['protection_error'], BinanceAPIError)
+    assert result['protection_error'].code == -2010
+    fast.close()
+
+
+def test_bot_records_buy_when_protection_fails(exchange):
+    from tradingbot import MovingAverageCrossStrategy, TradingBot
+
+    exchange.reject_oco = (400, -2010, 'Account has insufficient balance for requested action.')
+    fast = make_client(exchange, mode='sequential').warm(symbols=['BTCUSDT'])
+    bot = TradingBot(None, None, MovingAverageCrossStrategy(), client=object(), fast_orders=fast,
+                     quantity=0.001)
+    bot._execute_signals(True, False, exchange.price)
+    assert bot.in_position
+    assert bot.buy_price == pytest.approx(exchange.price)
+    assert bot.ledger.quantity('BTCUSDT') == pytest.approx(0.001)
+    assert [o['side'] for o in exchange.orders] == ['BUY']
+    fast.close()
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+
+from market_bus import BusReader, MarketDataIngestor
+
+MINUTE = 60_000
+
+
+class KlineFeed:
+    """Client simulado: get_klines devolve os últimos `limit` candles até `now` (o último em aberto)."""
+    def __init__(self, now: int):
+        self.now = now
+        self.limits = []
+
+    def get_klines(self, symbol, interval, limit=500):
+        self.limits.append(limit)
+        return [[t * MINUTE, 1.0, 1.0, 1.0, 1.0, 1.0, t * MINUTE + MINUTE - 1]
+                for t in range(max(0, self.now - limit + 1), self.now + 1)]
+
+
+def test_poll_refetches_history_after_stall():
+    symbol = f"T{os.getpid()}"
+    feed = KlineFeed(now=100)
+    ingestor = MarketDataIngestor(feed, [symbol], capacity=50)
+    reader = BusReader(symbol)
+    try:
+        ingestor.poll_once()
+        assert len(reader.read_new()) == 50
+
+        # Parada de 20 intervalos: a janela curta de 5 candles deixaria um buraco
+        feed.now = 120
+        ingestor.poll_once()
+        assert feed.limits == [51, 5, 51]
+        times = reader.column(reader.read_new(), 'open_time') / MINUTE
+        np.testing.assert_array_equal(times, np.arange(100, 120))
+    finally:
+        reader.close()
+        ingestor.close()
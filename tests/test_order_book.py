@@ -0,0 +1,157 @@
+import pytest
+
+from order_book import LocalOrderBook, OrderBookOutOfSync, ReplayDepthFeed
+
+
+def snapshot(last_update_id, bids=(('100.0', '1.0'),), asks=(('101.0', '1.0'),)):
+    return {'lastUpdateId': last_update_id, 'bids': [list(b) for b in bids],
+            'asks': [list(a) for a in asks]}
+
+
+def event(first, last, bids=(), asks=()):
+    return {'e': 'depthUpdate', 's': 'BTCUSDT', 'U': first, 'u': last,
+            'b': [list(b) for b in bids], 'a': [list(a) for a in asks]}
+
+
+class SnapshotSequence:
+    """Client que devolve um snapshot diferente a cada get_order_book."""
+    def __init__(self, *snapshots):
+        self.snapshots = list(snapshots)
+        self.calls = 0
+
+    def get_order_book(self, symbol, limit=1000):
+        self.calls += 1
+        return self.snapshots[min(self.calls, len(self.snapshots)) - 1]
+
+
+def test_first_event_straddling_snapshot_is_applied():
+    feed = ReplayDepthFeed(snapshot(100), [
+        event(95, 105, bids=[('100.5', '2.0')]),
+        event(106, 110, asks=[('101.0', '0')]),
+        event(111, 111, asks=[('102.0', '3.0')]),
+    ])
+    book = feed.run(LocalOrderBook('BTCUSDT'))
+    assert book.synced
+    assert book.last_update_id == 111
+    assert book.best_bid() == 100.5
+    assert book.best_ask() == 102.0
+    assert book.resyncs == 0
+
+
+def test_straddling_event_buffered_before_snapshot():
+    feed = ReplayDepthFeed(snapshot(100), [
+        event(90, 94),
+        event(95, 105, bids=[('100.5', '2.0')]),
+        event(106, 110, bids=[('100.0', '0')]),
+    ])
+    book = feed.run(LocalOrderBook('BTCUSDT'), events_before_snapshot=2)
+    assert book.synced
+    assert book.last_update_id == 110
+    assert book.bids.prices().tolist() == [100.5]
+
+
+def test_events_already_in_snapshot_are_dropped():
+    feed = ReplayDepthFeed(snapshot(100), [event(80, 90, bids=[('99.0', '5.0')]), event(101, 102)])
+    book = feed.run(LocalOrderBook('BTCUSDT'))
+    assert book.synced and book.last_update_id == 102
+    assert book.bids.prices().tolist() == [100.0]
+
+
+def test_gap_after_first_event_desyncs_and_buffers_without_client():
+    feed = ReplayDepthFeed(snapshot(100), [event(95, 105), event(107, 110), event(111, 112)])
+    book = feed.run(LocalOrderBook('BTCUSDT'))
+    assert not book.synced
+    assert book.resyncs == 1
+    with pytest.raises(OrderBookOutOfSync):
+        book.estimate_market_order('BUY', 0.5)
+    # Um snapshot novo fecha com os eventos em espera
+    book.load_snapshot(snapshot(108))
+    assert book.synced and book.last_update_id == 112
+
+
+def test_gap_resyncs_from_client():
+    client = SnapshotSequence(snapshot(110, bids=[('99.0', '1.0')]))
+    book = LocalOrderBook('BTCUSDT', client=client)
+    book.load_snapshot(snapshot(100))
+    for msg in (event(95, 105), event(108, 112), event(113, 114, bids=[('99.5', '1.0')])):
+        book.on_depth_message(msg)
+    assert client.calls == 1
+    assert book.synced and book.last_update_id == 114
+    assert book.bids.prices().tolist() == [99.5, 99.0]
+
+
+def test_stale_snapshot_is_retried():
+    # O primeiro snapshot (90) é anterior ao primeiro evento em buffer (U=95)
+    client = SnapshotSequence(snapshot(90), snapshot(100))
+    book = LocalOrderBook('BTCUSDT', client=client)
+    for msg in (event(95, 105), event(106, 110)):
+        book.on_depth_message(msg)
+    book.sync()
+    assert client.calls == 2
+    assert book.synced and book.last_update_id == 110
+    assert book.resyncs == 1
+
+
+def test_snapshot_retries_are_bounded():
+    client = SnapshotSequence(snapshot(90))
+    book = LocalOrderBook('BTCUSDT', client=client, max_snapshot_retries=2, retry_delay_s=0.0)
+    book.on_depth_message(event(95, 105))
+    book.sync()
+    assert client.calls == 3
+    assert not book.synced
+    # Depois do intervalo, a próxima mensagem dispara uma nova rodada
+    client.snapshots = [snapshot(100)]
+    book.on_depth_message(event(106, 110))
+    assert book.synced and book.last_update_id == 110
+
+
+def test_market_order_estimate_after_replay():
+    feed = ReplayDepthFeed(snapshot(100, asks=[('101.0', '1.0'), ('102.0', '1.0')]),
+                           [event(99, 101, asks=[('103.0', '2.0')])])
+    book = feed.run(LocalOrderBook('BTCUSDT'))
+    estimate = book.estimate_market_order('BUY', 2.5)
+    assert estimate['complete']
+    assert estimate['levels'] == 3
+    assert estimate['avg_price'] == pytest.approx((101.0 + 102.0 + 103.0 * 0.5) / 2.5)
+
+
+def test_stream_error_triggers_resync_on_next_event():
+    client = SnapshotSequence(snapshot(100), snapshot(120, bids=[('98.0', '1.0')]))
+    book = LocalOrderBook('BTCUSDT', client=client)
+    book.sync()
+    book.on_depth_message(event(101, 105))
+    book.on_depth_message({'e': 'error', 'm': 'conexão perdida'})
+    assert not book.synced
+    for msg in (event(118, 121), event(122, 123, bids=[('98.5', '1.0')])):
+        book.on_depth_message(msg)
+    assert client.calls == 2
+    assert book.synced and book.last_update_id == 123
+    assert book.bids.prices().tolist() == [98.5, 98.0]
+
+
+def test_market_order_estimate_rejects_non_positive_quantity():
+    book = ReplayDepthFeed(snapshot(100), []).run(LocalOrderBook('BTCUSDT'))
+    with pytest.raises(ValueError):
+        book.estimate_market_order('BUY', 0)
+
+
+def test_failed_estimate_does_not_block_the_order():
+    from tradingbot import MovingAverageCrossStrategy, TradingBot
+
+    class Client:
+        def __init__(self):
+            self.orders = []
+
+        def order_market_buy(self, symbol, quantity):
+            order = {'symbol': symbol, 'side': 'BUY', 'executedQty': str(quantity),
+                     'cummulativeQuoteQty': str(quantity * 101.0)}
+            self.orders.append(order)
+            return order
+
+    book = ReplayDepthFeed(snapshot(100, asks=()), []).run(LocalOrderBook('BTCUSDT'))  # Sem asks
+    client = Client()
+    bot = TradingBot(None, None, MovingAverageCrossStrategy(), client=client, order_book=book,
+                     use_risk_management=False, quantity=0.5)
+    bot._execute_signals(True, False, 101.0)
+    assert len(client.orders) == 1
+    assert bot.in_position
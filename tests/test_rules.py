@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from candle_window import CandleWindow
+from rules import RuleError, RuleStrategy
+
+
+@pytest.mark.parametrize('source', ['1 < 2', 'not (3 > 4)', '1 < 2 and 2 < 3'])
+def test_rule_without_series_is_rejected(source):
+    with pytest.raises(RuleError):
+        RuleStrategy(buy=source)
+    with pytest.raises(RuleError):
+        RuleStrategy(buy='close > 1', sell=source)
+
+
+def test_rule_mixing_series_and_constants_evaluates_on_window():
+    window = CandleWindow(capacity=10)
+    for i, close in enumerate(np.linspace(1.0, 3.0, 10)):
+        window.append(i * 60_000.0, close, close, close, close, 1.0)
+    strategy = RuleStrategy(buy='close > 2 or 1 > 2', sell='close < 2 and 1 < 2')
+    assert strategy.should_buy_window(window)
+    assert not strategy.should_sell_window(window)
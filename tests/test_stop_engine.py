@@ -0,0 +1,123 @@
+import pytest
+
+import Trading_Bot2
+from ledger import PositionLedger
+from stop_engine import SimulatedTickStream, StopEngine, StopRule
+
+
+class FakeClient:
+    """Client da Binance em memória: preenche ordens a mercado ao último preço."""
+    def __init__(self, *args, **kwargs):
+        self.price = 100.0
+        self.base_balance = 0.0
+        self.orders = []
+
+    def get_account(self):
+        return {'balances': [{'asset': 'BTC', 'free': str(self.base_balance)}]}
+
+    def get_klines(self, symbol, interval, limit):
+        return [[i * 60_000, '100', '100', '100', '100', '1', i * 60_000 + 59_999,
+                 '100', 1, '0', '0', '0'] for i in range(limit)]
+
+    def create_order(self, symbol, side, type, quantity):
+        self.base_balance += quantity if side == 'BUY' else -quantity
+        order = {'symbol': symbol, 'side': side, 'type': type, 'executedQty': str(quantity),
+                 'cummulativeQuoteQty': str(quantity * self.price), 'transactTime': 1_700_000_000_000,
+                 'fills': [{'price': str(self.price), 'qty': str(quantity), 'commission': '0',
+                            'commissionAsset': 'BRL', 'tradeId': len(self.orders)}]}
+        self.orders.append(order)
+        return order
+
+
+def run_prices(engine, prices, symbol='BTCUSDT'):
+    return SimulatedTickStream(symbol, prices).run(engine)
+
+
+def test_stop_loss_fires_on_first_tick_below_stop():
+    engine = StopEngine(on_exit=lambda position, reason, price: None)
+    engine.add_position('BTCUSDT', 1.0, 100.0, StopRule(stop_loss_pct=0.05, take_profit_pct=None),
+                        opened_at=0)
+    run_prices(engine, [99.0, 97.0, 95.5, 94.9, 90.0])
+    assert [(e['reason'], e['price']) for e in engine.exits] == [('stop_loss', pytest.approx(94.9))]
+    assert engine.positions() == []
+
+
+def test_trailing_stop_follows_high_water():
+    engine = StopEngine(on_exit=lambda position, reason, price: None)
+    engine.add_position('BTCUSDT', 1.0, 100.0,
+                        StopRule(stop_loss_pct=0.05, take_profit_pct=None, trailing_pct=0.02),
+                        opened_at=0)
+    run_prices(engine, [101.0, 105.0, 110.0, 108.5, 107.7, 100.0])
+    assert len(engine.exits) == 1
+    exit_ = engine.exits[0]
+    assert exit_['reason'] == 'trailing_stop'
+    assert exit_['price'] == pytest.approx(107.7)
+    assert exit_['stop_price'] == pytest.approx(110.0 * 0.98)
+
+
+def test_take_profit_fires_once():
+    engine = StopEngine(on_exit=lambda position, reason, price: None)
+    engine.add_position('BTCUSDT', 1.0, 100.0, StopRule(stop_loss_pct=0.05, take_profit_pct=0.10),
+                        opened_at=0)
+    run_prices(engine, [102.0, 109.9, 110.5, 111.0])
+    assert [(e['reason'], e['price']) for e in engine.exits] == [('take_profit', pytest.approx(110.5))]
+
+
+def test_time_stop_uses_tick_timestamp():
+    engine = StopEngine(on_exit=lambda position, reason, price: None)
+    stream = SimulatedTickStream('BTCUSDT', [100.0] * 30, step_ms=1000)
+    engine.add_position('BTCUSDT', 1.0, 100.0, StopRule(max_hold_s=10),
+                        opened_at=stream.start_ms / 1000)
+    stream.run(engine)
+    assert [e['reason'] for e in engine.exits] == ['time_stop']
+
+
+def test_random_walk_exits_at_most_once_per_position():
+    engine = StopEngine(on_exit=lambda position, reason, price: None)
+    for _ in range(5):
+        engine.add_position('BTCUSDT', 1.0, 100.0,
+                            StopRule(stop_loss_pct=0.01, take_profit_pct=0.01), opened_at=0)
+    SimulatedTickStream.random_walk('BTCUSDT', 100.0, 5000, volatility=0.001, seed=7).run(engine)
+    assert len(engine.exits) == 5
+    for exit_ in engine.exits:
+        assert exit_['price'] <= 99.0 or exit_['price'] >= 101.0
+
+
+@pytest.fixture
+def bot(monkeypatch, tmp_path):
+    monkeypatch.setattr(Trading_Bot2, 'Client', FakeClient)
+    monkeypatch.setattr(Trading_Bot2, 'createLogOrder', lambda order: None)
+    engine = StopEngine()
+    return Trading_Bot2.BinanceTraderBot('BTC', 'BTCBRL', 0.5, '1m', stop_engine=engine,
+                                         ledger=PositionLedger())
+
+
+@pytest.mark.parametrize('prices, reason', [
+    ([99.0, 94.0], 'stop_loss'),
+    ([105.0, 112.0], 'take_profit'),
+])
+def test_bot_exit_updates_position_and_ledger(bot, prices, reason):
+    assert bot.stop_engine.on_exit == bot.onStopExit
+    bot.buyStock()
+    assert bot.actual_trade_position and bot.last_buy_price == pytest.approx(100.0)
+    assert bot.ledger.quantity('BTCBRL') == pytest.approx(0.5)
+
+    bot.client_binance.price = prices[-1]
+    run_prices(bot.stop_engine, prices, symbol='BTCBRL')
+
+    assert [e['reason'] for e in bot.stop_engine.exits] == [reason]
+    assert [o['side'] for o in bot.client_binance.orders] == ['BUY', 'SELL']
+    assert bot.actual_trade_position is False
+    assert bot.last_buy_price is None
+    assert bot.ledger.quantity('BTCBRL') == 0.0
+    assert bot.ledger.position('BTCBRL').realized_pnl == pytest.approx((prices[-1] - 100.0) * 0.5)
+    assert bot.shouldSell(prices[-1]) is False
+
+
+def test_bot_ignores_stop_after_manual_sell(bot):
+    bot.buyStock()
+    position = bot.stop_engine.positions('BTCBRL')[0]
+    bot.updateAllData()
+    bot.sellStock()
+    assert bot.onStopExit(position, 'stop_loss', 90.0) is None
+    assert [o['side'] for o in bot.client_binance.orders] == ['BUY', 'SELL']
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from rules import RuleStrategy
+from strategy_config import ConfigError, StrategyConfig, build_strategy, reconcile_strategy
+from tradingbot import MovingAverageCrossStrategy, RSIStrategy
+
+
+def test_omitted_param_returns_to_default():
+    current = MovingAverageCrossStrategy(short_window=3, long_window=50)
+    strategy, changes = reconcile_strategy(
+        current, {'type': 'MovingAverageCrossStrategy', 'params': {'long_window': 30}})
+    assert strategy is current
+    assert (current.short_window, current.long_window) == (5, 30)
+    assert changes == ['short_window: 3 -> 5 (padrão)', 'long_window: 50 -> 30']
+
+
+def test_removed_sell_rule_is_cleared():
+    current = RuleStrategy(buy='close > sma(close, 5)', sell='close < sma(close, 5)')
+    strategy, changes = reconcile_strategy(
+        current, {'type': 'RuleStrategy', 'params': {'buy': 'close > sma(close, 5)'}})
+    assert strategy is current
+    assert current.sell is None
+    assert changes == ['sell: close < sma(close, 5) -> None (padrão)']
+
+
+def test_unchanged_params_report_nothing():
+    current = RSIStrategy(period=10)
+    strategy, changes = reconcile_strategy(current, {'type': 'RSIStrategy', 'params': {'period': 10}})
+    assert strategy is current and changes == []
+
+
+def test_unknown_and_missing_params_are_rejected():
+    with pytest.raises(ConfigError):
+        reconcile_strategy(MovingAverageCrossStrategy(), {'type': 'MovingAverageCrossStrategy',
+                                                          'params': {'fast': 3}})
+    with pytest.raises(ConfigError):
+        reconcile_strategy(RuleStrategy(buy='close > 1'), {'type': 'RuleStrategy', 'params': {}})
+
+
+def test_type_change_rebuilds():
+    strategy, changes = reconcile_strategy(MovingAverageCrossStrategy(), {'type': 'RSIStrategy'})
+    assert isinstance(strategy, RSIStrategy)
+    assert changes == ['MovingAverageCrossStrategy -> RSIStrategy']
+
+
+def test_consensus_members_are_reused():
+    spec = {'type': 'ConsensusStrategy',
+            'members': [{'type': 'MovingAverageCrossStrategy', 'params': {'short_window': 3}},
+                        {'type': 'RSIStrategy'}]}
+    current = build_strategy(spec)
+    members = list(current.members)
+    spec['members'][0]['params'] = {}
+    strategy, changes = reconcile_strategy(current, spec)
+    assert strategy.members == members
+    assert members[0].short_window == 5
+    assert changes == ['membro 0: short_window: 3 -> 5 (padrão)']
+
+
+def test_config_file_reload(tmp_path):
+    path = tmp_path / 'strategy.json'
+    path.write_text(json.dumps({'strategy': {'type': 'MovingAverageCrossStrategy',
+                                             'params': {'short_window': 3, 'long_window': 20}}}))
+    config = StrategyConfig(str(path))
+    assert config.has_pending
+    path.write_text(json.dumps({'strategy': {'type': 'Nope'}}) + ' ')
+    assert not config.check()
+    assert config.errors == 1
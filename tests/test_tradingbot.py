@@ -0,0 +1,31 @@
+import pytest
+
+from tradingbot import MovingAverageCrossStrategy, TradingBot
+
+
+class RecordingAudit:
+    def __init__(self):
+        self.rows = []
+
+    def record(self, symbol, strategy, decision, votes=None, indicators=None, latency_ms=None):
+        self.rows.append((decision, votes))
+
+
+@pytest.mark.parametrize('in_position, buy, sell, decision, vote', [
+    (True, True, False, 0, 1),       # compra ignorada: já posicionado
+    (False, False, True, 0, -1),     # venda ignorada: fora de posição
+    (False, True, False, 1, 1),
+    (True, False, True, -1, -1),
+    (False, False, False, 0, 0),
+])
+def test_audit_records_raw_vote_and_gated_decision(in_position, buy, sell, decision, vote):
+    strategy = MovingAverageCrossStrategy()
+    strategy.should_buy = lambda df: buy
+    strategy.should_sell = lambda df: sell
+    audit = RecordingAudit()
+    bot = TradingBot(None, None, strategy, client=object(), audit_log=audit)
+    bot.in_position = in_position
+
+    buy_signal, sell_signal = bot._signals(strategy.should_buy, strategy.should_sell, None)
+    bot._audit(buy_signal, sell_signal, 100.0, 0.0)
+    assert audit.rows == [(decision, {'MovingAverageCrossStrategy': vote})]
@@ -8,6 +8,13 @@ from binance.enums import *
 import logging
 import sys
 
+import indicators
+from candle_window import CandleWindow, interval_to_ms
+from event_queue import CANDLE_CLOSE, MarketEvent
+from profiler import PROFILER
+from loop_watchdog import LoopWatchdog
+from ledger import PositionLedger
+
 # =============================================================================
 # CONFIGURAÇÃO DE LOGGING
 # =============================================================================
@@ -41,6 +48,9 @@ logger.info("Iniciando configuração do Trading Bot...")
 # =============================================================================
 class Strategy:
     """Classe base para estratégias de trading."""
+    # Indicadores da última avaliação ({nome: valor}); vão para o log de auditoria
+    last_values = {}
+
     def should_buy(self, df: pd.DataFrame) -> bool:
         """Retorna True se a estratégia indicar sinal de COMPRA."""
         raise NotImplementedError
@@ -49,8 +59,46 @@ class Strategy:
         """Retorna True se a estratégia indicar sinal de VENDA."""
         raise NotImplementedError
 
+    def required_history(self):
+        """
+        Quantos candles (os mais recentes) a estratégia precisa para decidir.
+        None = todo o histórico. Usado pelo backtest para não reprocessar o passado.
+        """
+        return None
 
-class MovingAverageCrossStrategy(Strategy):
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Sinal de cada candle do histórico: 1 = COMPRA, -1 = VENDA, 0 = nada.
+        Esta implementação chama should_buy/should_sell candle a candle (lenta);
+        estratégias vetorizadas devem sobrescrevê-la.
+        """
+        lookback = self.required_history()
+        out = np.zeros(len(df), dtype=np.int8)
+        for i in range(len(df)):
+            sub_df = df.iloc[max(0, i + 1 - lookback) if lookback else 0:i + 1]
+            if self.should_buy(sub_df):
+                out[i] = 1
+            elif self.should_sell(sub_df):
+                out[i] = -1
+        return out
+
+
+class WindowStrategy(Strategy):
+    """
+    Variante de Strategy que decide a partir das views NumPy de um CandleWindow
+    (window.close, window.high, ...), sem montar DataFrame a cada tick.
+    O TradingBot usa estes métodos automaticamente quando a estratégia os implementa.
+    """
+    def should_buy_window(self, window: CandleWindow) -> bool:
+        """Retorna True se a estratégia indicar sinal de COMPRA."""
+        raise NotImplementedError
+
+    def should_sell_window(self, window: CandleWindow) -> bool:
+        """Retorna True se a estratégia indicar sinal de VENDA."""
+        raise NotImplementedError
+
+
+class MovingAverageCrossStrategy(WindowStrategy):
     """
     Estratégia de cruzamento de médias móveis:
     - Compra quando a SMA de curto prazo cruza a de longo prazo de baixo para cima.
@@ -67,6 +115,7 @@ class MovingAverageCrossStrategy(Strategy):
         df['SMA_short'] = df['close'].rolling(window=self.short_window).mean()
         df['SMA_long'] = df['close'].rolling(window=self.long_window).mean()
 
+        self.last_values = {'sma_short': df['SMA_short'].iloc[-1], 'sma_long': df['SMA_long'].iloc[-1]}
         # Cruzamento de SMA curta abaixo -> acima da SMA longa
         return (df['SMA_short'].iloc[-2] < df['SMA_long'].iloc[-2] and
                 df['SMA_short'].iloc[-1] > df['SMA_long'].iloc[-1])
@@ -78,10 +127,120 @@ class MovingAverageCrossStrategy(Strategy):
         df['SMA_short'] = df['close'].rolling(window=self.short_window).mean()
         df['SMA_long'] = df['close'].rolling(window=self.long_window).mean()
 
+        self.last_values = {'sma_short': df['SMA_short'].iloc[-1], 'sma_long': df['SMA_long'].iloc[-1]}
         # Cruzamento de SMA curta acima -> abaixo da SMA longa
         return (df['SMA_short'].iloc[-2] > df['SMA_long'].iloc[-2] and
                 df['SMA_short'].iloc[-1] < df['SMA_long'].iloc[-1])
 
+    def required_history(self):
+        # SMA longa no penúltimo e no último candle
+        return self.long_window + 1
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        close = df['close'].to_numpy(dtype=np.float64)
+        sma_short = indicators.sma(close, self.short_window)
+        sma_long = indicators.sma(close, self.long_window)
+        out = np.zeros(len(close), dtype=np.int8)
+        out[indicators.crosses_above(sma_short, sma_long)] = 1
+        out[indicators.crosses_below(sma_short, sma_long)] = -1
+        self.last_values = {'sma_short': sma_short[-1], 'sma_long': sma_long[-1]}
+        return out
+
+    def _window_smas(self, close: np.ndarray):
+        """SMAs curta/longa no penúltimo e no último candle, direto sobre a view."""
+        s, l = self.short_window, self.long_window
+        n = len(close)
+        short_prev = close[n - s - 1:n - 1].sum() / s
+        short_last = close[n - s:].sum() / s
+        long_prev = close[n - l - 1:n - 1].sum() / l
+        long_last = close[n - l:].sum() / l
+        self.last_values = {'sma_short': short_last, 'sma_long': long_last}
+        return short_prev, short_last, long_prev, long_last
+
+    def should_buy_window(self, window: CandleWindow) -> bool:
+        close = window.close
+        if len(close) <= self.long_window:
+            return False
+        short_prev, short_last, long_prev, long_last = self._window_smas(close)
+        return short_prev < long_prev and short_last > long_last
+
+    def should_sell_window(self, window: CandleWindow) -> bool:
+        close = window.close
+        if len(close) <= self.long_window:
+            return False
+        short_prev, short_last, long_prev, long_last = self._window_smas(close)
+        return short_prev > long_prev and short_last < long_last
+
+
+class RSIStrategy(Strategy):
+    """
+    Estratégia de RSI (mesmo cálculo de calcular_rsi em Trading_Bot.py):
+    - Compra quando o RSI fica abaixo de buy_threshold (sobrevendido).
+    - Vende quando o RSI fica acima de sell_threshold (sobrecomprado).
+    """
+    def __init__(self, period: int = 14, buy_threshold: float = 30, sell_threshold: float = 70):
+        self.period = period
+        self.buy_threshold = buy_threshold
+        self.sell_threshold = sell_threshold
+
+    def _rsi(self, df: pd.DataFrame) -> np.ndarray:
+        return indicators.rsi(df['close'].to_numpy(dtype=np.float64), self.period)
+
+    def should_buy(self, df: pd.DataFrame) -> bool:
+        last_rsi = self._rsi(df)[-1]
+        self.last_values = {'rsi': last_rsi}
+        return bool(last_rsi < self.buy_threshold)
+
+    def should_sell(self, df: pd.DataFrame) -> bool:
+        last_rsi = self._rsi(df)[-1]
+        self.last_values = {'rsi': last_rsi}
+        return bool(last_rsi > self.sell_threshold)
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        rsi = self._rsi(df)
+        self.last_values = {'rsi': rsi[-1]}
+        out = np.zeros(len(rsi), dtype=np.int8)
+        out[rsi < self.buy_threshold] = 1
+        out[rsi > self.sell_threshold] = -1
+        return out
+
+
+class BollingerStrategy(Strategy):
+    """
+    Estratégia de bandas de Bollinger:
+    - Compra quando o candle fecha abaixo da banda inferior.
+    - Vende quando o candle fecha acima da banda superior.
+    """
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        self.window = window
+        self.num_std = num_std
+
+    def _bands(self, df: pd.DataFrame):
+        close = df['close'].to_numpy(dtype=np.float64)
+        _, upper, lower = indicators.bollinger(close, self.window, self.num_std)
+        return close, upper, lower
+
+    def should_buy(self, df: pd.DataFrame) -> bool:
+        close, upper, lower = self._bands(df)
+        self.last_values = {'bb_upper': upper[-1], 'bb_lower': lower[-1]}
+        return bool(close[-1] < lower[-1])
+
+    def should_sell(self, df: pd.DataFrame) -> bool:
+        close, upper, lower = self._bands(df)
+        self.last_values = {'bb_upper': upper[-1], 'bb_lower': lower[-1]}
+        return bool(close[-1] > upper[-1])
+
+    def required_history(self):
+        return self.window
+
+    def signals(self, df: pd.DataFrame) -> np.ndarray:
+        close, upper, lower = self._bands(df)
+        self.last_values = {'bb_upper': upper[-1], 'bb_lower': lower[-1]}
+        out = np.zeros(len(close), dtype=np.int8)
+        out[close < lower] = 1
+        out[close > upper] = -1
+        return out
+
 
 # =============================================================================
 # 2. Bot de Trading com Gestão de Risco e Ordens OCO
@@ -93,10 +252,16 @@ class TradingBot:
     - Executar a estratégia para detectar sinais de compra/venda.
     - Enviar ordens de compra/venda (e OCO, se habilitado).
     """
+    metrics_every = 60   # Iterações entre logs das métricas do watchdog
+    min_window = 100     # Capacidade mínima da janela de candles (WindowStrategy)
+    max_klines = 1000    # Limite de candles por chamada de get_klines na Binance
+
     def __init__(self, api_key: str, api_secret: str, strategy: Strategy,
                  symbol: str = 'BTCUSDT', interval: str = '1m', quantity: float = 0.001,
                  testnet: bool = True, use_risk_management: bool = True,
-                 stop_loss_multiplier: float = 0.98, take_profit_multiplier: float = 1.02):
+                 stop_loss_multiplier: float = 0.98, take_profit_multiplier: float = 1.02,
+                 client=None, order_book=None, audit_log=None, watchdog=None, dashboard=None,
+                 ledger=None, config=None, fast_orders=None):
         """
         :param api_key: Chave de API da Binance.
         :param api_secret: Chave secreta de API da Binance.
@@ -108,9 +273,30 @@ class TradingBot:
         :param use_risk_management: Se True, após comprar, cria ordem OCO (stop loss e take profit).
         :param stop_loss_multiplier: Multiplicador para stop loss (ex: 0.98 => -2%).
         :param take_profit_multiplier: Multiplicador para take profit (ex: 1.02 => +2%).
+        :param client: Client já criado (ex: RecordingClient/ReplayClient de recorder.py).
+                       Se informado, as chaves e o testnet são ignorados.
+        :param order_book: LocalOrderBook do símbolo (order_book.py). Se informado, o
+                           preço médio e o slippage esperados são registrados antes
+                           de cada ordem a mercado.
+        :param audit_log: DecisionAuditLog (audit_log.py). Se informado, cada
+                          avaliação da estratégia é registrada com indicadores e latência.
+        :param watchdog: LoopWatchdog (loop_watchdog.py). Padrão: um watchdog com o
+                         intervalo do candle; sob sobrecarga o bot degrada por etapas.
+        :param dashboard: DashboardState (dashboard.py). Se informado, preço, indicadores,
+                          resultado, posição e ordens são publicados a cada avaliação.
+        :param ledger: PositionLedger (ledger.py) que recebe os fills das ordens; pode ser
+                       compartilhado entre bots. Padrão: um livro só deste bot.
+        :param config: StrategyConfig (strategy_config.py). Se informado, novas versões do
+                       arquivo de configuração são aplicadas no início do próximo candle.
+        :param fast_orders: FastOrderClient (fast_orders.py). Se informado, compras, OCO e
+                            vendas saem pelo caminho rápido (conexões aquecidas; compra e
+                            proteção numa única requisição no modo 'otoco').
         """
         # Conexão com a Binance
-        if testnet:
+        if client is not None:
+            self.client = client
+            logger.info(f"Usando client fornecido: {type(client).__name__}.")
+        elif testnet:
             self.client = Client(api_key, api_secret, testnet=True)
             self.client.API_URL = 'https://testnet.binance.vision/api'
             logger.info("Conectado à Testnet da Binance.")
@@ -124,6 +310,19 @@ class TradingBot:
         self.quantity = quantity
         self.in_position = False
         self.buy_price = None
+        self.ledger = ledger or PositionLedger()
+
+        self.order_book = order_book
+        self.last_price = None
+        self.audit_log = audit_log
+        self.last_vote = 0              # Sinal cru da estratégia, antes do filtro de posição
+        self.watchdog = watchdog or LoopWatchdog(interval_to_ms(interval) / 1000)
+        self.dashboard = dashboard
+        self.config = config
+        self.fast_orders = fast_orders
+
+        # Estratégias baseadas em views NumPy usam uma janela fixa de candles fechados
+        self.window = self._new_window() if isinstance(strategy, WindowStrategy) else None
 
         # Gestão de risco
         self.use_risk_management = use_risk_management
@@ -149,6 +348,44 @@ class TradingBot:
         df = pd.DataFrame(data)
         return df
 
+    def update_window(self) -> float:
+        """
+        Atualiza self.window apenas com os candles fechados desde a última chamada
+        e retorna o último preço (candle em andamento). Busca o histórico completo
+        só na primeira vez ou se houver um buraco maior que o pedido.
+        """
+        window = self.window
+        if window.last_open_time is None:
+            klines = self.client.get_klines(symbol=self.symbol, interval=self.interval,
+                                            limit=min(window.capacity + 1, self.max_klines))
+        else:
+            klines = self.client.get_klines(symbol=self.symbol, interval=self.interval, limit=5)
+            if float(klines[0][0]) > window.last_open_time + interval_to_ms(self.interval):
+                logger.warning("Candles faltando na janela; recarregando histórico completo.")
+                window.clear()
+                klines = self.client.get_klines(symbol=self.symbol, interval=self.interval,
+                                                limit=min(window.capacity + 1, self.max_klines))
+        window.append_klines(klines)
+        return float(klines[-1][4])
+
+    def log_expected_fill(self, side: str):
+        """
+        Registra o preço médio e o slippage esperados de uma ordem a mercado
+        de self.quantity, segundo o livro local (se houver um sincronizado).
+        Só diagnóstico: qualquer falha da estimativa vai para o log e a ordem segue.
+        """
+        if self.order_book is None or not self.order_book.synced:
+            return None
+        try:
+            estimate = self.order_book.estimate_market_order(side, self.quantity)
+        except Exception as e:
+            logger.warning(f"Estimativa de preenchimento indisponível ({side} {self.symbol}): {e}")
+            return None
+        logger.info(f"Estimativa {side} {self.quantity} {self.symbol}: preço médio "
+                    f"{estimate['avg_price']:.2f}, slippage {estimate['slippage_bps']:.1f} bps, "
+                    f"{estimate['levels']} níveis{'' if estimate['complete'] else ' (livro insuficiente)'}")
+        return estimate
+
     def place_risk_management_order(self, current_price: float):
         """
         Coloca uma ordem OCO para gestão de risco: stop loss + take profit.
@@ -183,35 +420,243 @@ class TradingBot:
         except Exception as e:
             logger.error(f"Erro ao cancelar ordens: {e}")
 
-    def execute_trade(self):
+    def execute_trade(self, scheduled_at: float = None):
         """
         - Obtém dados de mercado.
         - Verifica sinais de compra/venda via estratégia.
         - Executa ordens de mercado e, se ativado, cria OCO.
+        :param scheduled_at: Horário (time.monotonic) agendado para a iteração; o
+                             watchdog mede o atraso em relação a ele.
         """
-        df = self.get_historical_data()
-        current_price = df.iloc[-1]['close']
+        self.watchdog.iteration_started(scheduled_at)
+        try:
+            self._trade_step()
+        finally:
+            self.watchdog.iteration_finished()
+
+    def _trade_step(self):
+        self._reload_config()
+        self._apply_degradation()
+        if self.window is not None:
+            # Caminho sem DataFrame: janela de candles fechados + views NumPy
+            with self._stage('dados'):
+                current_price = self.update_window()
+
+            evaluation_start = time.perf_counter()
+            with self._stage('estrategia'):
+                buy_signal, sell_signal = self._window_signals()
+        else:
+            with self._stage('dados'):
+                df = self.get_historical_data(lookback=self._lookback())
+                current_price = df.iloc[-1]['close']
+
+            evaluation_start = time.perf_counter()
+            with self._stage('estrategia'):
+                buy_signal, sell_signal = self._signals(self.strategy.should_buy,
+                                                        self.strategy.should_sell, df)
+
+        self._audit(buy_signal, sell_signal, current_price, evaluation_start)
+        self._publish(current_price)
+
+        with self._stage('ordens'):
+            self._execute_signals(buy_signal, sell_signal, current_price)
+
+    def _reload_config(self):
+        """Aplica a configuração pendente (se houver) no limite do candle."""
+        if self.config is not None and self.config.has_pending:
+            self.config.apply_pending(self)
+
+    def set_strategy(self, strategy: Strategy):
+        """
+        Troca a estratégia mantendo a janela de candles em memória: nada é buscado
+        de novo, salvo se a estratégia anterior não usava janela.
+        """
+        self.strategy = strategy
+        if not isinstance(strategy, WindowStrategy):
+            self.window = None
+        elif self.window is None:
+            self.window = self._new_window()
+        self.ensure_window()
+
+    def _new_window(self) -> CandleWindow:
+        """Janela vazia com espaço para o histórico que a estratégia exige."""
+        needed = self.strategy.required_history()
+        return CandleWindow(capacity=max(self.min_window, (needed or 0) + 1))
+
+    def ensure_window(self):
+        """Aumenta a janela (copiando os candles) se a estratégia exige mais histórico."""
+        needed = self.strategy.required_history()
+        if self.window is None or needed is None or needed + 1 <= self.window.capacity:
+            return
+        available = len(self.window)
+        self.window = self.window.resized(needed + 1)
+        if available and available < needed + 1:
+            logger.warning(f"Janela ampliada para {needed + 1} candles com {available} em memória; "
+                           f"a estratégia completa o histórico com os próximos candles.")
+
+    def _apply_degradation(self):
+        """Repassa à estratégia o nível de degradação atual do watchdog."""
+        if hasattr(self.strategy, 'skip_optional'):
+            self.strategy.skip_optional = self.watchdog.skip_optional
+
+    def _stage(self, name: str):
+        """Etapa do loop medida pelo watchdog (e marcada no PROFILER)."""
+        return self.watchdog.stage(name)
+
+    def _lookback(self, normal: int = 100) -> int:
+        """Candles buscados no caminho com DataFrame; só o mínimo da estratégia sob sobrecarga."""
+        return self.watchdog.lookback(normal, self.strategy.required_history())
+
+    def _window_signals(self):
+        """Avalia a WindowStrategy sobre self.window. Retorna (comprar, vender)."""
+        return self._signals(self.strategy.should_buy_window, self.strategy.should_sell_window,
+                             self.window)
+
+    def _signals(self, should_buy, should_sell, data):
+        """
+        Avalia a estratégia e aplica o filtro de posição. Retorna (comprar, vender).
+        O sinal cru (1 compra, -1 venda, 0 neutro) fica em self.last_vote para a
+        auditoria; com auditoria ativa, should_sell é avaliado mesmo fora de posição.
+        """
+        raw_buy = should_buy(data)
+        buy_signal = raw_buy and not self.in_position
+        raw_sell = False
+        if (not buy_signal and self.in_position) or (self.audit_log is not None and not raw_buy):
+            raw_sell = should_sell(data)
+        self.last_vote = 1 if raw_buy else -1 if raw_sell else 0
+        return buy_signal, bool(raw_sell) and not buy_signal and self.in_position
+
+    def on_market_event(self, event: MarketEvent):
+        """
+        Alternativa ao polling de execute_trade: consome eventos de uma
+        CoalescingEventQueue alimentada pelo stream de klines (event_queue.py).
+        Ticks apenas atualizam o último preço; a estratégia é avaliada a cada
+        candle fechado. Requer uma WindowStrategy.
+        """
+        if self.window is None:
+            raise TypeError("on_market_event requer uma WindowStrategy.")
+        row = event.payload
+        if event.kind != CANDLE_CLOSE:
+            self.last_price = float(row[4])
+            self.ledger.on_price(self.symbol, self.last_price)
+            return
+
+        self.watchdog.iteration_started()
+        try:
+            self._candle_step(row)
+        finally:
+            self.watchdog.iteration_finished()
+
+    def _candle_step(self, row):
+        self._reload_config()
+        if self.window is None:
+            raise TypeError("on_market_event requer uma WindowStrategy.")
+        self._apply_degradation()
+        with self._stage('dados'):
+            self.window.append(float(row[0]), float(row[1]), float(row[2]), float(row[3]),
+                               float(row[4]), float(row[5]))
+            self.last_price = float(row[4])
+
+        evaluation_start = time.perf_counter()
+        with self._stage('estrategia'):
+            buy_signal, sell_signal = self._window_signals()
+        self._audit(buy_signal, sell_signal, self.last_price, evaluation_start)
+        self._publish(self.last_price)
+
+        with self._stage('ordens'):
+            self._execute_signals(buy_signal, sell_signal, self.last_price)
+
+    def _audit(self, buy_signal: bool, sell_signal: bool, current_price: float, evaluation_start: float):
+        """Registra a avaliação da estratégia no log de auditoria (se houver)."""
+        if self.audit_log is None:
+            return
+        decision = 1 if buy_signal else -1 if sell_signal else 0
+        name = type(self.strategy).__name__
+        self.audit_log.record(self.symbol, name, decision,
+                              votes=getattr(self.strategy, 'last_votes', None) or {name: self.last_vote},
+                              indicators={'close': current_price, 'in_position': self.in_position,
+                                          **self.strategy.last_values},
+                              latency_ms=(time.perf_counter() - evaluation_start) * 1000)
+
+    def _publish(self, current_price: float):
+        """Publica preço, indicadores, resultado e posição no dashboard (se houver)."""
+        if self.dashboard is None:
+            return
+        now = time.time()
+        self.dashboard.record('price', current_price, now)
+        self.dashboard.record('equity', self.ledger.position(self.symbol).total_pnl, now)
+        for name, value in self.strategy.last_values.items():
+            self.dashboard.record(f'ind_{name}', value, now)
+        self.dashboard.update_position(self.symbol, in_position=self.in_position, buy_price=self.buy_price,
+                                       quantity=self.quantity, last_price=current_price,
+                                       realized_pnl=self.realized_pnl, degradation=self.watchdog.level)
+
+    @property
+    def realized_pnl(self) -> float:
+        """PnL realizado do símbolo, pelos fills registrados no livro."""
+        return self.ledger.position(self.symbol).realized_pnl
+
+    def _record_fills(self, side: str, order: dict, current_price: float):
+        """Registra no livro todos os fills da ordem (ou a quantidade pedida ao preço atual)."""
+        self.ledger.apply_order({'symbol': self.symbol, 'side': side, 'executedQty': self.quantity, **order},
+                                fallback_price=current_price)
+
+    def _execute_signals(self, buy_signal: bool, sell_signal: bool, current_price: float):
+        """
+        Envia as ordens correspondentes aos sinais já avaliados pela estratégia.
+        """
+        self.ledger.on_price(self.symbol, current_price)
+        if buy_signal and self.watchdog.pause_entries:
+            logger.warning("Loop sobrecarregado: entradas pausadas, sinal de COMPRA ignorado.")
+            buy_signal = False
 
         # Verifica sinal de COMPRA
-        if self.strategy.should_buy(df) and not self.in_position:
+        if buy_signal:
             try:
-                order = self.client.order_market_buy(symbol=self.symbol, quantity=self.quantity)
+                self.log_expected_fill('BUY')
+                if self.fast_orders is not None:
+                    result = self.fast_orders.buy(self.symbol, self.quantity, current_price,
+                                                  protect=self.use_risk_management,
+                                                  take_profit_multiplier=self.take_profit_multiplier,
+                                                  stop_loss_multiplier=self.stop_loss_multiplier)
+                    order = result['order']
+                    if not float(order.get('executedQty') or 0.0):
+                        logger.warning(f"COMPRA não executada (preço além do limite): {order}")
+                        return
+                    if result['protection'] is not None:
+                        logger.info(f"Proteção criada junto com a compra: {result['protection']}")
+                    elif result.get('protection_error') is not None:
+                        logger.error(f"Posição aberta SEM proteção (OCO recusada): {result['protection_error']}")
+                else:
+                    order = self.client.order_market_buy(symbol=self.symbol, quantity=self.quantity)
                 logger.info(f"Ordem de COMPRA executada: {order}")
+                self._record_fills('BUY', order, current_price)
                 self.in_position = True
-                self.buy_price = current_price
+                self.buy_price = self.ledger.position(self.symbol).avg_price   # Preço médio dos fills
+                if self.dashboard is not None:
+                    self.dashboard.add_order(self.symbol, 'BUY', current_price, self.quantity)
 
                 # Se gestão de risco estiver ativa, coloca a ordem OCO
-                if self.use_risk_management:
-                    self.place_risk_management_order(current_price)
+                if self.use_risk_management and self.fast_orders is None:
+                    self.place_risk_management_order(self.buy_price)
             except Exception as e:
                 logger.error(f"Erro na ordem de compra: {e}")
 
         # Verifica sinal de VENDA
-        elif self.strategy.should_sell(df) and self.in_position:
+        elif sell_signal:
             try:
-                self.cancel_open_orders()  # Cancelar OCO pendentes
-                order = self.client.order_market_sell(symbol=self.symbol, quantity=self.quantity)
+                self.log_expected_fill('SELL')
+                if self.fast_orders is not None:
+                    self.fast_orders.cancel_open_orders(self.symbol)   # Uma requisição para todas
+                    order = self.fast_orders.market_order(self.symbol, 'SELL', self.quantity)
+                else:
+                    self.cancel_open_orders()  # Cancelar OCO pendentes
+                    order = self.client.order_market_sell(symbol=self.symbol, quantity=self.quantity)
                 logger.info(f"Ordem de VENDA executada: {order}")
+                self._record_fills('SELL', order, current_price)
+                logger.info(f"PnL realizado em {self.symbol}: {self.realized_pnl:.4f}")
+                if self.dashboard is not None:
+                    self.dashboard.add_order(self.symbol, 'SELL', current_price, self.quantity)
                 self.in_position = False
                 self.buy_price = None
             except Exception as e:
@@ -219,19 +664,46 @@ class TradingBot:
         else:
             logger.info("Nenhum sinal de negociação identificado.")
 
+    def get_state(self) -> dict:
+        """Estado necessário para retomar o bot em outro processo (ver fleet.py)."""
+        return {'in_position': self.in_position, 'buy_price': self.buy_price,
+                'last_price': self.last_price, 'ledger': self.ledger, 'window': self.window}
+
+    def set_state(self, state: dict):
+        """Restaura o estado salvo por get_state."""
+        self.in_position = state.get('in_position', False)
+        self.buy_price = state.get('buy_price')
+        self.last_price = state.get('last_price')
+        if state.get('ledger') is not None:
+            self.ledger = state['ledger']
+        if self.window is not None and state.get('window') is not None:
+            self.window = state['window']
+
     def run(self):
         """
         Loop principal que mantém o bot rodando até ser interrompido manualmente.
         """
         logger.info("Iniciando o Trading Bot...")
+        period = interval_to_ms(self.interval) / 1000
+        next_run = time.monotonic()
         while True:
             try:
-                self.execute_trade()
+                self.execute_trade(scheduled_at=next_run)
             except Exception as e:
                 logger.exception(f"Erro inesperado no loop principal: {e}")
 
-            # Intervalo entre cada iteração (60s para intervalos de 1m).
-            time.sleep(60)
+            # Próxima iteração agendada em múltiplos do intervalo (60s para 1m).
+            # Se o loop atrasou mais de um intervalo, as iterações perdidas são
+            # puladas em vez de enfileiradas: nenhuma ordem sai com dados antigos.
+            next_run += period
+            now = time.monotonic()
+            if now >= next_run + period:
+                missed = int((now - next_run) // period)
+                next_run += missed * period
+                self.watchdog.iterations_skipped(missed)
+            if self.watchdog.iterations % self.metrics_every == 0:
+                logger.info(f"Watchdog: {self.watchdog.metrics()}")
+            time.sleep(max(0.0, next_run - time.monotonic()))
 
 
 # =============================================================================
@@ -243,13 +715,32 @@ def backtest_strategy(strategy: Strategy, df: pd.DataFrame, initial_capital: flo
     - Assume que toda a posição é comprada/vendida de uma vez (100% do capital).
     - Retorna o capital final e a lista de trades.
     """
-    capital = initial_capital
-    position = 0.0
-    trades = []
+    state = {'capital': initial_capital, 'position': 0.0, 'trades': []}
+    backtest_steps(strategy, df, state)
+    capital, trades = close_backtest(state, df)
+
+    logger.info(f"Backtest finalizado. Capital final: {capital:.2f} (Inicial: {initial_capital})")
+    return capital, trades
 
-    for i in range(len(df)):
-        sub_df = df.iloc[:i+1]
-        current_price = sub_df.iloc[-1]['close']
+
+def backtest_steps(strategy: Strategy, df: pd.DataFrame, state: dict, start: int = 0,
+                   index_offset: int = 0):
+    """
+    Avança o backtest do candle `start` até o fim de `df`, alterando `state`
+    (capital, position, trades) no lugar. Cada decisão recebe só os últimos
+    strategy.required_history() candles, então o resultado não depende de
+    quanto histórico anterior existe em `df` (base do backtest incremental).
+    :param index_offset: Somado ao índice dos trades quando `df` é só um trecho do histórico.
+    """
+    lookback = strategy.required_history()
+    closes = df['close'].to_numpy()
+    capital = state['capital']
+    position = state['position']
+    trades = state['trades']
+
+    for i in range(start, len(df)):
+        sub_df = df.iloc[max(0, i + 1 - lookback) if lookback else 0:i + 1]
+        current_price = closes[i]
 
         # Compra
         if strategy.should_buy(sub_df) and position == 0:
@@ -259,7 +750,7 @@ def backtest_strategy(strategy: Strategy, df: pd.DataFrame, initial_capital: flo
                 'type': 'buy',
                 'price': current_price,
                 'quantity': position,
-                'index': i
+                'index': i + index_offset
             })
 
         # Venda
@@ -269,23 +760,69 @@ def backtest_strategy(strategy: Strategy, df: pd.DataFrame, initial_capital: flo
                 'type': 'sell',
                 'price': current_price,
                 'quantity': position,
-                'index': i
+                'index': i + index_offset
             })
             position = 0.0
 
+    state['capital'] = capital
+    state['position'] = position
+    return state
+
+
+def close_backtest(state: dict, df: pd.DataFrame, index_offset: int = 0):
+    """
+    Encerra a posição aberta (se houver) no último fechamento de `df`, sem
+    alterar `state`. Retorna (capital final, trades).
+    """
+    capital = state['capital']
+    position = state['position']
+    trades = list(state['trades'])
+
     # Se ainda tiver posição aberta no final
     if position > 0:
-        sell_price = df.iloc[-1]['close']
+        sell_price = df['close'].iloc[-1]
         capital = position * sell_price
         trades.append({
             'type': 'sell',
             'price': sell_price,
             'quantity': position,
-            'index': len(df)-1
+            'index': len(df) - 1 + index_offset
         })
-        position = 0.0
 
-    logger.info(f"Backtest finalizado. Capital final: {capital:.2f} (Inicial: {initial_capital})")
+    return capital, trades
+
+
+def backtest_signals(signals: np.ndarray, df: pd.DataFrame, initial_capital: float = 1000.0):
+    """
+    Mesmo resultado de backtest_strategy, mas a partir do array de sinais
+    (Strategy.signals), sem laço por candle: como compras com posição aberta
+    e vendas sem posição são ignoradas, os trades são o primeiro sinal de
+    cada sequência de sinais iguais (descartando uma venda inicial).
+    Retorna (capital final, trades).
+    """
+    closes = df['close'].to_numpy(dtype=np.float64)
+    idx = np.flatnonzero(signals)
+    side = signals[idx]
+    keep = np.ones(len(idx), dtype=bool)
+    keep[1:] = side[1:] != side[:-1]
+    idx, side = idx[keep], side[keep]
+    if len(side) and side[0] == -1:
+        idx, side = idx[1:], side[1:]
+
+    buys = idx[::2]
+    sells = idx[1::2]
+    if len(sells) < len(buys):
+        sells = np.append(sells, len(df) - 1)   # Encerra a posição aberta no último candle
+    ratios = closes[sells] / closes[buys]
+    growth = np.cumprod(ratios)
+    capital_before = initial_capital * np.concatenate(([1.0], growth[:-1]))
+    quantities = capital_before / closes[buys]
+
+    trades = []
+    for b, s, q in zip(buys.tolist(), sells.tolist(), quantities.tolist()):
+        trades.append({'type': 'buy', 'price': closes[b], 'quantity': q, 'index': b})
+        trades.append({'type': 'sell', 'price': closes[s], 'quantity': q, 'index': s})
+    capital = float(initial_capital * growth[-1]) if len(growth) else initial_capital
     return capital, trades
 
 
@@ -315,6 +852,32 @@ if __name__ == '__main__':
             take_profit_multiplier=1.02
         )
 
+        # Grava todas as respostas da API para replay posterior (ver recorder.py)
+        if os.environ.get('BOT_RECORD_FILE'):
+            from recorder import RecordingClient
+            bot.client = RecordingClient(bot.client, os.environ['BOT_RECORD_FILE'])
+
+        # Profiling sob demanda: kill -USR1/-USR2 <pid> ou BOT_PROFILER_PORT (ver profiler.py)
+        PROFILER.install_from_env()
+
+        # Dashboard local: BOT_DASHBOARD_PORT=8050 -> http://127.0.0.1:8050/ (ver dashboard.py)
+        if os.environ.get('BOT_DASHBOARD_PORT'):
+            from dashboard import Dashboard, DashboardState
+            bot.dashboard = DashboardState()
+            Dashboard(bot.dashboard, port=int(os.environ['BOT_DASHBOARD_PORT'])).start()
+
+        # Caminho rápido de ordens: BOT_FAST_ORDERS=otoco ou sequential (ver fast_orders.py)
+        if os.environ.get('BOT_FAST_ORDERS'):
+            from fast_orders import FastOrderClient
+            bot.fast_orders = FastOrderClient(API_KEY, API_SECRET, testnet=True,
+                                              mode=os.environ['BOT_FAST_ORDERS'])
+            bot.fast_orders.warm(symbols=[bot.symbol])
+
+        # Parâmetros em arquivo, recarregados a quente: BOT_STRATEGY_CONFIG=estrategia.json
+        if os.environ.get('BOT_STRATEGY_CONFIG'):
+            from strategy_config import StrategyConfig
+            bot.config = StrategyConfig(os.environ['BOT_STRATEGY_CONFIG']).watch()
+
         # EXEMPLO: Executar o bot em tempo real
         logger.info("Iniciando Trading Bot para operação em tempo real...")
         bot.run()